@@ -2,157 +2,236 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-import time
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
-from sklearn.metrics import silhouette_score
+from clustering import sweep_k, select_k, stream_cluster, K_SELECTION_METHODS
+from cluster_model import ClusterModel, CLUSTER_MODEL_FILE
+from features import FeatureMatrix, load_features
+from cluster_labels import align_clusters, name_clusters, previous_centroids_in, relabel, role_prototypes
 from datetime import datetime
 import sys
 import os
+import argparse
+
+
+def load_previous_model():
+    """Cluster model of the previous run (None if missing or unreadable)"""
+    if not os.path.exists(CLUSTER_MODEL_FILE):
+        return None
+    try:
+        return ClusterModel.load(CLUSTER_MODEL_FILE)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Warning: Ignoring previous cluster model: {e}")
+        return None
+
+
+# Các giá trị k được thử khi chọn số cụm
+K_RANGE = range(2, 11)
+
+
+def cluster_players(df, features=None, k=None, k_method='silhouette', jobs=None,
+                    exact_silhouette=False, previous_model=None, full_sweep=False):
+    """
+    Cluster players in memory
+
+    Args:
+        df: Player DataFrame (results.csv layout)
+        features: Prepared FeatureMatrix of df (default: built from df, not cached)
+        k: Number of clusters (default: selected from the sweep with k_method)
+        k_method: Selection method (see clustering.select_k())
+        jobs: Worker processes for the k sweep
+        exact_silhouette: Exact O(n²) silhouette instead of a sampled estimate
+        previous_model: ClusterModel whose cluster ids are kept stable
+        full_sweep: Sweep all of K_RANGE even when k is given (for the elbow chart)
+
+    Returns:
+        tuple: (copy of df with 'Cluster' and 'Tên Nhóm', ClusterModel,
+                sweep_k() result, (n x 2) PCA coordinates); when k is given
+                without full_sweep the sweep only holds that k
+
+    Raises:
+        ValueError: No numeric data or k outside K_RANGE
+    """
+    if features is None:
+        features = FeatureMatrix.from_frame(df)
+    if not features.columns:
+        raise ValueError("No numeric data available after processing.")
+    if k is not None and k not in K_RANGE:
+        raise ValueError(f"--k must be between {K_RANGE.start} and {K_RANGE.stop - 1}")
+
+    X_scaled = np.asarray(features.scaled, dtype=np.float64)
+
+    # Thử các giá trị k song song (mỗi k một tiến trình, ma trận dùng chung bộ nhớ);
+    # k chỉ định sẵn thì chỉ huấn luyện k đó
+    k_values = K_RANGE if k is None or full_sweep else [k]
+    sweep = sweep_k(X_scaled, k_values, n_jobs=jobs, exact=exact_silhouette)
+
+    # Chọn số lượng nhóm tối ưu tự động từ kết quả sweep
+    if k is not None:
+        optimal_k = k
+        print(f"Number of clusters set manually: {optimal_k}")
+    else:
+        optimal_k = select_k(sweep, k_method, X_scaled)
+        print(f"Optimal number of clusters based on {k_method}: {optimal_k}")
+
+    # Phân cụm: dùng lại mô hình đã huấn luyện cho k được chọn (không huấn luyện lại)
+    kmeans = sweep['models'][optimal_k]
+
+    # Giữ id cụm của lần chạy trước (nếu cùng bộ cột) để nhãn không bị đảo giữa các lần chạy
+    previous = previous_centroids_in(previous_model, features.columns, features.mean, features.scale)
+    if previous is not None:
+        order = align_clusters(kmeans.cluster_centers_, previous)
+        print("Cluster ids aligned with the previous model")
+    else:
+        order = np.arange(optimal_k)
+    centroids = kmeans.cluster_centers_[order]
+    clusters = relabel(kmeans.labels_, order)
+
+    # PCA để trực quan hóa
+    pca = PCA(n_components=2)
+    X_pca = pca.fit_transform(X_scaled)
+
+    # Đặt tên nhóm từ dữ liệu: ghép tâm cụm với hồ sơ trung bình của từng vị trí
+    names = name_clusters(centroids, *role_prototypes(X_scaled, df['Pos']))
+    df = df.copy()
+    df['Cluster'] = clusters
+    df['Tên Nhóm'] = [names[c] for c in clusters]
+
+    model = ClusterModel(features.columns, features.impute_values, features.mean, features.scale,
+                         centroids, pca.mean_, pca.components_, names)
+    return df, model, sweep, X_pca
+
+
+def plot_sweep(sweep, path):
+    """Vẽ biểu đồ Elbow & Silhouette của kết quả sweep_k()"""
+    plt.figure(figsize=(14, 5))
+
+    plt.subplot(1, 2, 1)
+    plt.plot(sweep['k'], sweep['inertia'], marker='o')
+    plt.xlabel('Number of clusters (k)')
+    plt.ylabel('Inertia')
+    plt.title('Elbow Method')
+    plt.grid(True)
+
+    plt.subplot(1, 2, 2)
+    plt.plot(sweep['k'], sweep['silhouette'], marker='o', color='orange')
+    plt.xlabel('Number of clusters (K)')
+    plt.ylabel('Silhouette Score')
+    plt.title('Silhouette Score')
+    plt.grid(True)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def plot_clusters(X_pca, names, path):
+    """Biểu đồ phân cụm trên 2 thành phần chính, tô màu theo tên nhóm"""
+    plt.figure(figsize=(12, 8))
+    sns.scatterplot(
+        x=X_pca[:, 0],
+        y=X_pca[:, 1],
+        hue=names,
+        palette='Set2',
+        s=80
+    )
+
+    plt.title("Biểu đồ Phân cụm Cầu thủ (PCA - 2 chiều)", fontsize=16)
+    plt.xlabel("Thành phần chính 1")
+    plt.ylabel("Thành phần chính 2")
+    plt.legend(title='Nhóm Vị trí', loc='best')
+    plt.savefig(path, dpi=300)
+    plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Phân cụm cầu thủ bằng KMeans')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Worker processes for the k sweep (default: one per CPU)')
+    parser.add_argument('--exact-silhouette', action='store_true',
+                        help='Compute the exact O(n^2) silhouette instead of a sampled estimate')
+    parser.add_argument('--k-method', choices=K_SELECTION_METHODS, default='silhouette',
+                        help='How to choose the number of clusters from the sweep')
+    parser.add_argument('--k', type=int, default=None,
+                        help='Force the number of clusters (must be within 2..10)')
+    parser.add_argument('--plot-sweep', action='store_true',
+                        help='With --k, still run the full k sweep to draw the elbow/silhouette chart')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read results.csv in chunks with MiniBatchKMeans/IncrementalPCA (bounded memory)')
+    parser.add_argument('--chunksize', type=int, default=10000,
+                        help='Rows per chunk in --stream mode')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Rebuild the prepared feature matrix instead of loading it from the cache')
+    args = parser.parse_args()
 
-# Đọc dữ liệu với xử lý lỗi
-try:
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    input_path = os.path.join(script_dir, "results.csv")
-
-    if not os.path.exists(input_path):
-        raise FileNotFoundError(f"Input file not found: {input_path}")
-
-    df = pd.read_csv(input_path)
-    print(f"Successfully loaded data from {input_path}")
-except FileNotFoundError as e:
-    print(f"Error: {e}")
-    exit(1)
-except pd.errors.EmptyDataError:
-    print("Error: The CSV file is empty")
-    exit(1)
-except pd.errors.ParserError:
-    print("Error: Failed to parse the CSV file")
-    exit(1)
-except Exception as e:
-    print(f"Unexpected error while reading file: {e}")
-    exit(1)
-
-# Chọn các cột số và xử lý dữ liệu
-df_numeric = df.select_dtypes(include=[np.number])
-
-# Ghi lại số lượng cột trước khi xử lý
-original_columns = len(df_numeric.columns)
-print(f"Original numeric columns: {original_columns}")
-
-# Xóa các cột trống hoàn toàn
-empty_cols = df_numeric.columns[df_numeric.isna().all()].tolist()
-if empty_cols:
-    print(f"Warning: Dropping completely empty columns: {empty_cols}")
-    df_numeric.dropna(axis=1, how='all', inplace=True)
-
-# Xử lý missing values – phiên bản FIX FutureWarning
-if df_numeric.isna().any().any():
-    print("Missing values found. Using median imputation...")
-
-    missing_count = df_numeric.isna().sum().sum()
-    print(f"Total missing values: {missing_count}")
-
-    for column in df_numeric.columns:
-        if df_numeric[column].isna().any():
-            median_value = df_numeric[column].median()
-
-            if pd.isna(median_value):
-                median_value = 0
-                print(f"Column '{column}': Using 0 (median was also NaN)")
-            else:
-                print(f"Column '{column}': Imputing with median {median_value:.3f}")
-
-            # FIX: Không dùng inplace trên slice
-            df_numeric[column] = df_numeric[column].fillna(median_value)
-
-else:
-    print("No missing values found.")
-
-# Kiểm tra lại dữ liệu sau khi xử lý
-print(f"Final numeric columns: {len(df_numeric.columns)}")
-print(f"Data shape after processing: {df_numeric.shape}")
-
-if df_numeric.empty:
-    print("Error: No numeric data available after processing.")
-    sys.exit(1)
-
-# Xử lý infinite values
-if np.isinf(df_numeric.values).any():
-    print("Warning: Infinite values found. Replacing with 0...")
-    df_numeric.replace([np.inf, -np.inf], 0, inplace=True)
-
-# Chuẩn hóa dữ liệu
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(df_numeric)
-
-inertia = []
-silhouette_scores = []
-K_range = range(2, 11)
-
-for k in K_range:
-    kmeans = KMeans(n_clusters=k, random_state=42, n_init='auto')
-    kmeans.fit(X_scaled)
-    inertia.append(kmeans.inertia_)
-    silhouette_scores.append(silhouette_score(X_scaled, kmeans.labels_))
-
-# Vẽ biểu đồ Elbow & Silhouette
-plt.figure(figsize=(14, 5))
-
-plt.subplot(1, 2, 1)
-plt.plot(K_range, inertia, marker='o')
-plt.xlabel('Number of clusters (k)')
-plt.ylabel('Inertia')
-plt.title('Elbow Method')
-plt.grid(True)
-
-plt.subplot(1, 2, 2)
-plt.plot(K_range, silhouette_scores, marker='o', color='orange')
-plt.xlabel('Number of clusters (K)')
-plt.ylabel('Silhouette Score')
-plt.title('Silhouette Score')
-plt.grid(True)
-
-plt.tight_layout()
-elbow_silhouette_file = f"elbow_silhouette_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-plt.savefig(elbow_silhouette_file, dpi=300, bbox_inches='tight')
-plt.close()
-
-# Chọn số lượng nhóm tối ưu (giữ nguyên logic của bạn)
-optimal_k = 4
-print(f"Optimal number of clusters based on silhouette score: {optimal_k}")
-
-# Phân cụm
-kmeans = KMeans(n_clusters=optimal_k, random_state=42, n_init='auto')
-clusters = kmeans.fit_predict(X_scaled)
-df['Cluster'] = clusters
-
-# PCA để trực quan hóa
-pca = PCA(n_components=2)
-X_pca = pca.fit_transform(X_scaled)
-
-cluster_names = {
-    0: "Hậu vệ/Phòng ngự",
-    1: "Tiền vệ trung tâm",
-    2: "Tiền đạo/Tấn công",
-    3: "Tiền vệ cánh/Công"
-}
-
-# Mapping tên nhóm
-df['Tên Nhóm'] = df['Cluster'].map(cluster_names)
-
-plt.figure(figsize=(12, 8))
-sns.scatterplot(
-    x=X_pca[:, 0],
-    y=X_pca[:, 1],
-    hue=df['Tên Nhóm'],
-    palette='Set2',
-    s=80
-)
-
-plt.title("Biểu đồ Phân cụm Cầu thủ (PCA - 2 chiều)", fontsize=16)
-plt.xlabel("Thành phần chính 1")
-plt.ylabel("Thành phần chính 2")
-plt.legend(title='Nhóm Vị trí', loc='best')
-plt.savefig("bieu_do_phan_cum_co_chu_thich.png", dpi=300)
+
+    # Chế độ streaming: đọc từng chunk, bộ nhớ không phụ thuộc kích thước file
+    if args.stream:
+        input_path = os.path.join(script_dir, "results.csv")
+        output_path = "cluster_assignments.csv"
+        summary = stream_cluster(input_path, output_path, k=args.k, k_method=args.k_method,
+                                 chunksize=args.chunksize, previous_model=load_previous_model())
+        print(f"Clustered {summary['rows']} players into {summary['k']} clusters -> {output_path}")
+        for cluster, size in enumerate(summary['cluster_sizes']):
+            print(f"  Cluster {cluster} ({summary['names'][cluster]}): {size} players")
+
+        # Lưu mô hình (giá trị thiếu được thay bằng trung bình cột trong chế độ này)
+        model = ClusterModel(summary['columns'], summary['mean'], summary['mean'], summary['scale'],
+                             summary['centroids'], summary['pca'].mean_,
+                             summary['pca'].components_, summary['names'])
+        model.save()
+        print(f"Cluster model saved to {CLUSTER_MODEL_FILE}")
+        return
+
+    # Đọc dữ liệu với xử lý lỗi
+    try:
+        input_path = os.path.join(script_dir, "results.csv")
+
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        df = pd.read_csv(input_path)
+        print(f"Successfully loaded data from {input_path}")
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        exit(1)
+    except pd.errors.EmptyDataError:
+        print("Error: The CSV file is empty")
+        exit(1)
+    except pd.errors.ParserError:
+        print("Error: Failed to parse the CSV file")
+        exit(1)
+    except Exception as e:
+        print(f"Unexpected error while reading file: {e}")
+        exit(1)
+
+    # Đặc trưng dùng chung: ép kiểu, điền trung vị và chuẩn hóa một lần cho mỗi phiên bản dữ liệu
+    features = load_features(input_path, df, use_cache=not args.no_cache)
+    missing_count = int(np.isnan(features.values).sum())
+    print(f"Numeric feature columns: {len(features.columns)} "
+          f"({missing_count} missing values imputed with the column median)")
+    print(f"Data shape after processing: {features.scaled.shape} (feature cache {features.key[:12]})")
+
+    try:
+        df, model, sweep, X_pca = cluster_players(df, features, k=args.k, k_method=args.k_method,
+                                                  jobs=args.jobs, exact_silhouette=args.exact_silhouette,
+                                                  previous_model=load_previous_model(),
+                                                  full_sweep=args.plot_sweep)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    for cluster, name in enumerate(model.names):
+        print(f"  Cluster {cluster}: {name} ({int((df['Cluster'] == cluster).sum())} players)")
+
+    # Lưu scaler, tâm cụm, PCA và tên nhóm để gán cụm cho cầu thủ mới không cần huấn luyện lại
+    model.save()
+    print(f"Cluster model saved to {CLUSTER_MODEL_FILE}")
+
+    if len(sweep['k']) > 1:
+        plot_sweep(sweep, f"elbow_silhouette_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+    plot_clusters(X_pca, df['Tên Nhóm'], "bieu_do_phan_cum_co_chu_thich.png")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Request metrics for the Flask API
+Records, per endpoint, the request latency and response size histograms,
+status codes and how player/club names were matched (exact, partial or
+not found), and serves them on /metrics in the Prometheus text format.
+With phase timing on (API_PHASE_TIMING=1) the time spent in each phase of
+a request (filter, merge, nan_scrub, serialize) is also recorded and
+returned in a Server-Timing header.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+# Ngưỡng (giây / byte) của các histogram
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PHASE_TIMING = os.environ.get('API_PHASE_TIMING', '0') == '1'
+
+logger = logging.getLogger('api')
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class _Phase:
+    """Context manager timing one phase of the current request"""
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.metrics.phase_timing:
+            phases = g.setdefault('phases', {})
+            phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class Metrics:
+    """
+    Metric registry of one Flask app
+
+    Usage:
+        metrics = Metrics()
+        metrics.init_app(app)
+        with metrics.phase('filter'):
+            ...
+        metrics.record_match('exact')
+    """
+
+    def __init__(self, phase_timing=PHASE_TIMING):
+        self.phase_timing = phase_timing
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.latency = {}
+        self.sizes = {}
+        self.matches = {}
+        self.phases = {}
+
+    def init_app(self, app):
+        """Time every request of app and add the /metrics endpoint"""
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view, methods=['GET'])
+
+    @staticmethod
+    def endpoint():
+        """Route pattern of the current request (bounded label values)"""
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def record_match(self, path):
+        """How the name of the current request was matched: exact, partial or not_found"""
+        key = (self.endpoint(), path)
+        with self._lock:
+            self.matches[key] = self.matches.get(key, 0) + 1
+
+    def _start(self):
+        g.request_start = time.perf_counter()
+
+    def _finish(self, response):
+        elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+        endpoint = self.endpoint()
+        size = response.calculate_content_length() or 0
+        phases = g.get('phases', {})
+
+        with self._lock:
+            key = (endpoint, request.method, response.status_code)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            self.sizes.setdefault(endpoint, Histogram(SIZE_BUCKETS)).observe(size)
+            for name, seconds in phases.items():
+                self.phases.setdefault((endpoint, name), Histogram(LATENCY_BUCKETS)).observe(seconds)
+
+        if phases:
+            response.headers['Server-Timing'] = ', '.join(
+                f"{name};dur={seconds * 1000:.3f}" for name, seconds in phases.items())
+        logger.debug("%s %s %s %.1fms %dB %s", request.method, request.path, response.status_code,
+                     elapsed * 1000, size,
+                     ' '.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in phases.items()))
+        return response
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines += ['# HELP api_requests_total Requests by endpoint, method and status',
+                      '# TYPE api_requests_total counter']
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'api_requests_total{{{_labels(endpoint=endpoint, method=method, status=status)}}} {count}')
+
+            lines += ['# HELP api_request_duration_seconds Request latency',
+                      '# TYPE api_request_duration_seconds histogram']
+            for endpoint, histogram in sorted(self.latency.items()):
+                lines += histogram.lines('api_request_duration_seconds', _labels(endpoint=endpoint))
+
+            lines += ['# HELP api_response_size_bytes Response body size',
+                      '# TYPE api_response_size_bytes histogram']
+            for endpoint, histogram in sorted(self.sizes.items()):
+                lines += histogram.lines('api_response_size_bytes', _labels(endpoint=endpoint))
+
+            lines += ['# HELP api_name_matches_total Name lookups by match path (exact, partial, not_found)',
+                      '# TYPE api_name_matches_total counter']
+            for (endpoint, path), count in sorted(self.matches.items()):
+                lines.append(f'api_name_matches_total{{{_labels(endpoint=endpoint, path=path)}}} {count}')
+
+            if self.phase_timing:
+                lines += ['# HELP api_phase_duration_seconds Time spent per request phase',
+                          '# TYPE api_phase_duration_seconds histogram']
+                for (endpoint, name), histogram in sorted(self.phases.items()):
+                    lines += histogram.lines('api_phase_duration_seconds', _labels(endpoint=endpoint, phase=name))
+        return '\n'.join(lines) + '\n'
+
+    def _metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,382 @@
+"""
+Reproducible benchmark suite
+Times the hot paths of the project on fixed inputs and writes the timings to
+JSON so that two commits can be compared:
+
+  - parse_fbref           problem_I.1.parse_stats_table() on fbref pages
+  - parse_transfer_pages  problem_I.2.extract_value_from_page() on player pages
+  - api_get_player        /api/player/<name> through the Flask test client
+  - api_get_club          /api/club/<club> through the Flask test client
+  - aggregation           problem3_1_copy.aggregate()
+  - valuation             problem3_2.value_players()
+  - k_sweep               clustering.sweep_k() over Problem_4.K_RANGE
+
+The HTML fixtures are read from --fixtures (fbref/<stat_type>.html and
+footballtransfers/*.html, e.g. pages saved from the browser); missing ones
+are rendered once from results.csv in the sites' table markup. The dataset
+benchmarks run on synthetic datasets (synthetic.py) of each --sizes row
+count, fitted on results.csv with a fixed seed.
+
+Usage:
+    python benchmark.py                                # all benchmarks, 500 / 10k / 100k rows
+    python benchmark.py --sizes 500 10000 --only api_get_player valuation
+    python benchmark.py --compare .benchmark/results/<commit>.json
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from html import escape
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from identity import ID_COLUMN, join_players
+from market_values import VALUE_COLUMN
+from synthetic import SyntheticModel, iter_chunks
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_DIR = os.path.join(SCRIPT_DIR, ".benchmark")
+FIXTURE_DIR = os.path.join(BENCHMARK_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+
+DEFAULT_SIZES = [500, 10_000, 100_000]
+FIXTURE_BENCHMARKS = ['parse_fbref', 'parse_transfer_pages']
+DATASET_BENCHMARKS = ['api_get_player', 'api_get_club', 'aggregation', 'valuation', 'k_sweep']
+
+# Bảng fbref của từng trang và tiền tố cột tương ứng trong COLUMN_MAP
+FBREF_TABLES = {
+    'standard': 'Standard_', 'shooting': 'Shooting_', 'passing': 'Passing_', 'gca': None,
+    'defense': 'Defense_', 'possession': 'Possession_', 'misc': 'Misc_', 'keeper': 'Goalkeeping_'
+}
+IDENTITY_STATS = ['player', 'nationality', 'position', 'team', 'age']
+TRANSFER_PAGES = 50
+API_REQUESTS = 50
+
+
+def load_script(filename):
+    """Import a script of this folder by file name (names such as problem_I.1.py are not importable)"""
+    name = os.path.splitext(filename)[0].replace('.', '_')
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(fn, repeat=5, warmup=1, operations=1):
+    """
+    Time fn() several times
+
+    Args:
+        fn: Callable to time
+        repeat: Timed runs
+        warmup: Untimed runs before (imports, caches, first-request setup)
+        operations: Operations done by one call (requests, pages...), for per-operation times
+
+    Returns:
+        dict: seconds per call (min / median / mean / max) and median seconds per operation
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    return {
+        'repeat': repeat, 'operations': operations,
+        'min': min(times), 'median': median, 'mean': statistics.fmean(times), 'max': max(times),
+        'per_operation': median / max(operations, 1)
+    }
+
+
+#
+# Trang HTML mẫu
+#
+def _player_id(row):
+    if ID_COLUMN in row and isinstance(row[ID_COLUMN], str) and len(row[ID_COLUMN]) == 8:
+        return row[ID_COLUMN]
+    return hashlib.blake2b(f"{row['Player']}|{row['Team']}".encode(), digest_size=4).hexdigest()
+
+
+def _cell(value, dtype):
+    if pd.isna(value) or value == 'N/A':
+        return ''
+    if dtype is int:
+        return f"{int(float(value)):,}"
+    return str(value)
+
+
+def render_fbref_page(players, stat_type, column_map):
+    """One fbref stats page (table#stats_<stat_type>) in fbref's data-stat markup"""
+    prefix = FBREF_TABLES[stat_type]
+    stats = IDENTITY_STATS + [stat for stat, (col, _) in column_map.items()
+                              if prefix and col.startswith(prefix)]
+    if stat_type == 'keeper':
+        players = players[players['Pos'].astype(str).str.contains('GK')]
+
+    header = ''.join(f'<th data-stat="{stat}" scope="col">{escape(column_map[stat][0])}</th>' for stat in stats)
+    body = []
+    for _, row in players.iterrows():
+        player_id = _player_id(row)
+        cells = [f'<th scope="row" class="left" data-stat="player" data-append-csv="{player_id}">'
+                 f'<a href="/en/players/{player_id}/{quote(str(row["Player"]))}">{escape(str(row["Player"]))}</a></th>']
+        for stat in stats[1:]:
+            column, dtype = column_map[stat]
+            value = row.get(column)
+            if stat == 'nationality':
+                text = f"{str(value)[:2].lower()} {value}"
+            elif stat == 'age':
+                text = f"{_cell(value, int)}-120"
+            else:
+                text = _cell(value, dtype)
+            cells.append(f'<td data-stat="{stat}">{escape(text)}</td>')
+        body.append(f"<tr>{''.join(cells)}</tr>")
+
+    return (f'<html><head><title>2024-2025 Premier League {stat_type} Stats | FBref.com</title></head>'
+            f'<body><div id="all_stats_{stat_type}"><div class="table_container">'
+            f'<table class="min_width sortable stats_table" id="stats_{stat_type}">'
+            f'<thead><tr>{header}</tr></thead><tbody>{"".join(body)}</tbody></table>'
+            f'</div></div></body></html>')
+
+
+def render_transfer_page(row):
+    """One footballtransfers.com player page with its estimated value"""
+    value = row.get(VALUE_COLUMN)
+    value = value if isinstance(value, str) and value != 'N/A' else '€1.0M'
+    name, team = escape(str(row['Player'])), escape(str(row['Team']))
+    filler = ''.join(f'<p class="news-item">{name} news item {i}</p>' for i in range(20))
+    return (f'<html><head><title>{name} - Player profile | FootballTransfers</title></head><body>'
+            f'<div class="player-header"><h1>{name}</h1><span class="club">{team}</span></div>'
+            f'<div class="player-market-value"><span class="label">Estimated transfer value</span> {escape(value)}</div>'
+            f'<section class="news">{filler}</section></body></html>')
+
+
+def make_fixtures(players, values, directory, column_map):
+    """
+    Write the HTML fixtures that are not in directory yet (saved pages are kept)
+
+    Returns:
+        tuple: ({stat_type: fbref html}, [footballtransfers html])
+    """
+    fbref_dir = os.path.join(directory, 'fbref')
+    transfer_dir = os.path.join(directory, 'footballtransfers')
+    os.makedirs(fbref_dir, exist_ok=True)
+    os.makedirs(transfer_dir, exist_ok=True)
+
+    fbref_pages = {}
+    for stat_type in FBREF_TABLES:
+        path = os.path.join(fbref_dir, f"{stat_type}.html")
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(render_fbref_page(players, stat_type, column_map))
+        with open(path, encoding='utf-8') as f:
+            fbref_pages[stat_type] = f.read()
+
+    if not any(name.endswith('.html') for name in os.listdir(transfer_dir)):
+        rows = join_players(players, values, [VALUE_COLUMN]).head(TRANSFER_PAGES)
+        for i, (_, row) in enumerate(rows.iterrows()):
+            with open(os.path.join(transfer_dir, f"{i:03d}.html"), 'w', encoding='utf-8') as f:
+                f.write(render_transfer_page(row))
+    transfer_pages = []
+    for name in sorted(os.listdir(transfer_dir)):
+        if name.endswith('.html'):
+            with open(os.path.join(transfer_dir, name), encoding='utf-8') as f:
+                transfer_pages.append(f.read())
+    return fbref_pages, transfer_pages
+
+
+#
+# Các phép đo
+#
+def bench_fixtures(fixture_dir, players, values, selected, repeat):
+    """Scraper parsing benchmarks (skipped with the reason when the scraper cannot be imported)"""
+    results = {}
+    try:
+        scraper = load_script('problem_I.1.py')
+        transfers = load_script('problem_I.2.py')
+    except ImportError as e:
+        return {name: {'skipped': str(e)} for name in FIXTURE_BENCHMARKS if name in selected}
+    from bs4 import BeautifulSoup
+
+    fbref_pages, transfer_pages = make_fixtures(players, values, fixture_dir, scraper.COLUMN_MAP)
+
+    if 'parse_fbref' in selected:
+        def parse_fbref():
+            players_data = {}
+            for stat_type, html in fbref_pages.items():
+                scraper.parse_stats_table(html, stat_type, players_data, {})
+            return scraper.build_results(players_data)
+        results['parse_fbref'] = measure(parse_fbref, repeat, operations=len(fbref_pages))
+
+    if 'parse_transfer_pages' in selected:
+        def parse_transfer_pages():
+            return [transfers.extract_value_from_page(BeautifulSoup(html, 'html.parser'))
+                    for html in transfer_pages]
+        results['parse_transfer_pages'] = measure(parse_transfer_pages, repeat, operations=len(transfer_pages))
+    return results
+
+
+def bench_dataset(players, values, data_dir, selected, repeat, seed, jobs):
+    """Benchmarks of one scaled dataset (written to data_dir for the API)"""
+    results = {}
+    rng = np.random.default_rng(seed)
+
+    if {'api_get_player', 'api_get_club'} & set(selected):
+        os.makedirs(data_dir, exist_ok=True)
+        stats_file = os.path.join(data_dir, "results.csv")
+        values_file = os.path.join(data_dir, "transfer_values.csv")
+        players.to_csv(stats_file, index=False)
+        values.to_csv(values_file, index=False)
+
+        api = load_script('problem_II.1.py')
+        api.load_data(stats_file, values_file, database=None)
+        client = api.app.test_client()
+
+        def requests_of(paths):
+            def run():
+                for path in paths:
+                    client.get(path)
+            return run
+
+        if 'api_get_player' in selected:
+            names = rng.choice(players['Player'].to_numpy(), min(API_REQUESTS, len(players)), replace=False)
+            paths = [f"/api/player/{quote(str(name))}" for name in names]
+            results['api_get_player'] = measure(requests_of(paths), repeat, operations=len(paths))
+        if 'api_get_club' in selected:
+            teams = players['Team'].dropna().unique()
+            teams = rng.choice(teams, min(API_REQUESTS, len(teams)), replace=False)
+            paths = [f"/api/club/{quote(str(team))}" for team in teams]
+            results['api_get_club'] = measure(requests_of(paths), repeat, operations=len(paths))
+
+    if 'aggregation' in selected:
+        aggregation = load_script('problem3_1_copy.py')
+        results['aggregation'] = measure(lambda: aggregation.aggregate(players), repeat)
+
+    if 'valuation' in selected:
+        valuation = load_script('problem3_2.py')
+        results['valuation'] = measure(lambda: valuation.value_players(players), repeat)
+
+    if 'k_sweep' in selected:
+        from clustering import sweep_k
+        from features import FeatureMatrix
+        k_range = load_script('Problem_4.py').K_RANGE
+        X = np.asarray(FeatureMatrix.from_frame(players).scaled, dtype=np.float64)
+        results['k_sweep'] = measure(lambda: sweep_k(X, k_range, n_jobs=jobs), repeat, warmup=0,
+                                     operations=len(k_range))
+    return results
+
+
+#
+# Kết quả
+#
+def git_revision():
+    """(short commit hash, working tree has changes) or (None, None) outside git"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        return commit, bool(status)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(base, current, threshold=0.1):
+    """
+    Print the median time of every benchmark in both runs
+
+    Returns:
+        list: Names of the benchmarks more than `threshold` slower than base
+    """
+    regressions = []
+    print(f"\n{'Benchmark':<32}{'Base (ms)':>12}{'Now (ms)':>12}{'Ratio':>8}")
+    for name, result in current['benchmarks'].items():
+        before = base['benchmarks'].get(name, {})
+        if 'median' not in result or 'median' not in before:
+            continue
+        ratio = result['median'] / before['median'] if before['median'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  ▲ slower'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = '  ▼ faster'
+        print(f"{name:<32}{before['median'] * 1000:>12.2f}{result['median'] * 1000:>12.2f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scraper parsing, API and analytics')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Row counts of the scaled datasets')
+    parser.add_argument('--only', nargs='+', choices=FIXTURE_BENCHMARKS + DATASET_BENCHMARKS,
+                        help='Run only these benchmarks')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the scaled datasets')
+    parser.add_argument('--jobs', type=int, default=1, help='Worker processes of the k sweep')
+    parser.add_argument('--fixtures', default=FIXTURE_DIR, help='HTML fixture folder')
+    parser.add_argument('--output', help='JSON result file (default: .benchmark/results/<commit>.json)')
+    parser.add_argument('--compare', help='Earlier JSON result to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative slowdown reported as a regression')
+    args = parser.parse_args()
+    selected = args.only or FIXTURE_BENCHMARKS + DATASET_BENCHMARKS
+
+    players = pd.read_csv(os.path.join(SCRIPT_DIR, "results.csv"))
+    values = pd.read_csv(os.path.join(SCRIPT_DIR, "transfer_values.csv"))
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit, 'dirty': dirty, 'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'repeat': args.repeat, 'seed': args.seed, 'sizes': args.sizes, 'benchmarks': {}
+    }
+
+    if set(FIXTURE_BENCHMARKS) & set(selected):
+        print(f"Benchmarking scraper parsing ({args.fixtures})...")
+        report['benchmarks'].update(bench_fixtures(args.fixtures, players, values, selected, args.repeat))
+
+    if set(DATASET_BENCHMARKS) & set(selected):
+        model = SyntheticModel.fit(players, values)
+        for rows in args.sizes:
+            print(f"Benchmarking {rows} rows...")
+            chunks = list(iter_chunks(model, rows, seed=args.seed))
+            scaled_players = pd.concat([chunk for chunk, _ in chunks], ignore_index=True)
+            scaled_values = pd.concat([chunk for _, chunk in chunks], ignore_index=True)
+            data_dir = os.path.join(BENCHMARK_DIR, "data", str(rows))
+            timings = bench_dataset(scaled_players, scaled_values, data_dir, selected,
+                                    args.repeat, args.seed, args.jobs)
+            report['benchmarks'].update({f"{name}[{rows}]": result for name, result in timings.items()})
+
+    print(f"\n{'Benchmark':<32}{'Median (ms)':>14}{'Per op (ms)':>14}")
+    for name, result in report['benchmarks'].items():
+        if 'skipped' in result:
+            print(f"{name:<32}  skipped: {result['skipped']}")
+        else:
+            print(f"{name:<32}{result['median'] * 1000:>14.2f}{result['per_operation'] * 1000:>14.3f}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'local'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than {args.compare}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
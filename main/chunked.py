@@ -0,0 +1,349 @@
+"""
+Chunked, memory-bounded processing of large results files
+Reads a results.csv-layout file in fixed-size row batches with compact
+dtypes (float32 statistics, int16 Age, categorical Team / Pos / Nation) and
+combines the partial results of every batch, so peak memory depends on the
+chunk size and not on the number of rows.
+
+Team statistics are built in one read of the file: the league mean,
+standard deviation and weighted sums are merged from per-batch partial
+results (count / mean / M2, combined with Chan's formula), while the rows are
+spilled by team into partition files that are aggregated one at a time with
+the team_stats engine. The exact league median and quantiles are found from
+those partitions: a fixed-size histogram per column locates the bin of every
+wanted rank, and only the values of those bins are then collected.
+"""
+
+import math
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from identity import ID_COLUMN
+from incremental_stats import GroupState
+from team_stats import (STATISTICS, LEAGUE_LABEL, DEFAULT_QUANTILES, MINUTES_COL, numeric_columns,
+                        count_columns, compute_team_stats, compute_distribution_stats, split_league)
+
+DEFAULT_CHUNKSIZE = 100_000
+# Số dòng đọc trước (kiểu mặc định) để xác định các cột số
+SAMPLE_ROWS = 1000
+# Số khoảng của histogram dùng để định vị các phân vị toàn giải (mỗi cột)
+QUANTILE_BINS = 1024
+
+# Các cột văn bản lặp lại nhiều lần được đọc dưới dạng category
+CATEGORY_COLUMNS = ['Team', 'Pos', 'Nation']
+# Các cột số nguyên nhỏ (kiểu nullable để giữ giá trị thiếu)
+SMALL_INT_COLUMNS = {'Age': 'Int16'}
+
+
+def read_sample(path, rows=SAMPLE_ROWS):
+    """First rows of a file with the default dtypes"""
+    return pd.read_csv(path, nrows=rows)
+
+
+def compact_dtypes(sample):
+    """
+    Compact dtype of every column of a results.csv-layout file
+
+    Args:
+        sample: First rows of the file, read with the default dtypes
+
+    Returns:
+        dict: {column: dtype} -- float32 for the statistics, Int16 for Age,
+              category for Team / Pos / Nation; names and IDs stay strings
+    """
+    dtypes = {}
+    for column in sample.columns:
+        if column in SMALL_INT_COLUMNS:
+            dtypes[column] = SMALL_INT_COLUMNS[column]
+        elif column in CATEGORY_COLUMNS:
+            dtypes[column] = 'category'
+        elif column != ID_COLUMN and pd.api.types.is_numeric_dtype(sample[column]):
+            dtypes[column] = 'float32'
+    return dtypes
+
+
+def read_chunks(path, chunksize=DEFAULT_CHUNKSIZE, usecols=None, sample=None):
+    """
+    Iterate over a file in row batches with compact dtypes
+
+    Args:
+        path: CSV in results.csv layout
+        chunksize: Rows per batch
+        usecols: Columns to read (default: all)
+        sample: First rows of the file (read when not given)
+
+    Yields:
+        DataFrame of at most chunksize rows
+    """
+    dtypes = compact_dtypes(sample if sample is not None else read_sample(path))
+    if usecols is not None:
+        dtypes = {column: dtype for column, dtype in dtypes.items() if column in usecols}
+    yield from pd.read_csv(path, chunksize=chunksize, usecols=usecols, dtype=dtypes)
+
+
+def partition_count(path, chunksize, sample):
+    """Number of team partitions so that one partition holds about chunksize rows"""
+    row_bytes = len(sample.to_csv(index=False).encode('utf-8')) / max(len(sample), 1)
+    return max(1, math.ceil(os.path.getsize(path) / row_bytes / chunksize))
+
+
+class ChunkedTeamStats:
+    """
+    Team statistics of results2.csv / results2_distribution.csv, one batch at a time
+
+    The league moments are merged from the partial results of every batch.
+    The rows are also appended by team to one of n_partitions files in
+    workdir (pickled batches, which keep the compact dtypes); finish()
+    aggregates every partition exactly with compute_team_stats() /
+    compute_distribution_stats(), so a team never spans two partitions and
+    only one partition is in memory at a time. The league quantiles take a
+    second read of the partitions (see _league_quantiles()).
+
+    Usage:
+        stats = ChunkedTeamStats(columns, per90_columns, workdir, n_partitions)
+        for chunk in read_chunks(path):
+            stats.update(chunk)
+        results_df, distribution_df = stats.finish()
+    """
+
+    def __init__(self, columns, per90_columns, workdir, n_partitions=1, quantiles=DEFAULT_QUANTILES,
+                 weight_col=MINUTES_COL, group_col='Team'):
+        self.columns = list(columns)
+        self.per90_columns = [c for c in self.columns if c in set(per90_columns)]
+        self.per90_mask = np.isin(self.columns, self.per90_columns)
+        self.workdir = workdir
+        self.n_partitions = n_partitions
+        self.quantiles = tuple(quantiles)
+        self.weight_col = weight_col
+        self.group_col = group_col
+        self.has_weights = None
+        self.rows = 0
+
+        # Trạng thái toàn giải (count / mean / M2, tổng có trọng số), không giữ giá trị
+        n_cols = len(self.columns)
+        self.league = GroupState(n_cols)
+        # Khoảng giá trị của mỗi cột, làm biên cho histogram phân vị
+        self.minimum = np.full(n_cols, np.inf)
+        self.maximum = np.full(n_cols, -np.inf)
+
+    def partition_path(self, partition):
+        return os.path.join(self.workdir, f"partition_{partition}.pkl")
+
+    def update(self, chunk):
+        """Add one batch of players to the league state and spill it by team"""
+        if self.has_weights is None:
+            self.has_weights = self.weight_col in chunk.columns
+        chunk = chunk[chunk[self.group_col].notna()]
+        if chunk.empty:
+            return self
+        self.rows += len(chunk)
+
+        values = chunk[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        weights = (chunk[self.weight_col].to_numpy(dtype=np.float64, na_value=np.nan)
+                   if self.has_weights else None)
+        self.league.merge(GroupState.from_values(values, weights, sketch=False))
+        # fmin / fmax bỏ qua NaN (cột toàn NaN giữ nguyên ±inf)
+        self.minimum = np.fmin(self.minimum, np.fmin.reduce(values, axis=0))
+        self.maximum = np.fmax(self.maximum, np.fmax.reduce(values, axis=0))
+
+        # Mỗi đội luôn rơi vào cùng một partition (băm theo tên đội)
+        teams = chunk[self.group_col].astype('category')
+        hashes = pd.util.hash_array(teams.cat.categories.to_numpy(dtype=object))
+        partitions = (hashes % np.uint64(self.n_partitions)).astype(np.int64)[teams.cat.codes.to_numpy()]
+        keep = [self.group_col] + self.columns + [self.weight_col] * (
+            self.has_weights and self.weight_col not in self.columns)
+        for partition in np.unique(partitions):
+            with open(self.partition_path(partition), 'ab') as f:
+                pickle.dump(chunk.loc[partitions == partition, keep], f, protocol=pickle.HIGHEST_PROTOCOL)
+        return self
+
+    def read_partition(self, partition):
+        """All spilled rows of one partition (None if no team fell into it)"""
+        path = self.partition_path(partition)
+        if not os.path.exists(path):
+            return None
+        parts = []
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    parts.append(pickle.load(f))
+                except EOFError:
+                    break
+        data = pd.concat(parts, ignore_index=True)
+        # Tính toán trên float64 như chế độ đọc toàn bộ file
+        numeric = [c for c in data.columns if c != self.group_col]
+        data[numeric] = data[numeric].astype(np.float64)
+        data[self.group_col] = data[self.group_col].astype(str)
+        return data
+
+    def _values(self, data):
+        """Float64 (players x columns) matrix of a partition read by read_partition()"""
+        return data[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def _bins(self, values):
+        """Histogram bin of every value, per column (-1 for NaN)"""
+        width = np.where(self.maximum > self.minimum, self.maximum - self.minimum, 1.0)
+        with np.errstate(invalid='ignore'):
+            bins = np.floor((values - self.minimum) / width * QUANTILE_BINS)
+        bins = np.clip(np.nan_to_num(bins), 0, QUANTILE_BINS - 1)
+        return np.where(np.isnan(values), -1, bins).astype(np.int64)
+
+    def _histogram(self, values):
+        """(columns x QUANTILE_BINS) counts of the non-NaN values of one partition"""
+        bins = self._bins(values)
+        rows, columns = np.nonzero(bins >= 0)
+        n_cols = len(self.columns)
+        counts = np.bincount(columns * QUANTILE_BINS + bins[rows, columns], minlength=n_cols * QUANTILE_BINS)
+        return counts.reshape(n_cols, QUANTILE_BINS)
+
+    def _league_quantiles(self, quantiles, histogram):
+        """
+        Exact linear-interpolated league quantiles
+
+        The histogram (summed over all partitions) gives the bin holding each
+        wanted rank; the partitions are then read once more, keeping only the
+        values of those bins, so memory stays bounded by the bin count plus
+        the few values that fall in the selected bins.
+
+        Args:
+            quantiles: Quantiles to compute (0-1)
+            histogram: (columns x QUANTILE_BINS) counts from _histogram()
+
+        Returns:
+            ndarray of shape (columns, quantiles)
+        """
+        n_cols = len(self.columns)
+        result = np.full((n_cols, len(quantiles)), np.nan)
+        totals = histogram.sum(axis=1)
+        cumulative = np.cumsum(histogram, axis=1)
+        position = np.asarray(quantiles, dtype=float)[None, :] * np.maximum(totals - 1, 0)[:, None]
+        ranks = np.stack([np.floor(position), np.ceil(position)]).astype(np.int64)
+        bins = np.stack([np.searchsorted(cumulative[j], ranks[:, j], side='right')
+                         for j in range(n_cols)], axis=1)
+        bins = np.minimum(bins, QUANTILE_BINS - 1)
+        present = totals > 0
+        if not present.any():
+            return result
+
+        # Chỉ giữ các giá trị thuộc những bin chứa hạng cần tìm
+        target = np.zeros((n_cols, QUANTILE_BINS), dtype=bool)
+        for j in np.flatnonzero(present):
+            target[j, bins[:, j].ravel()] = True
+        parts = []
+        for partition in range(self.n_partitions):
+            data = self.read_partition(partition)
+            if data is None:
+                continue
+            values = self._values(data)
+            value_bins = self._bins(values)
+            rows, columns = np.nonzero(value_bins >= 0)
+            keep = target[columns, value_bins[rows, columns]]
+            rows, columns = rows[keep], columns[keep]
+            parts.append(pd.DataFrame({'column': columns, 'bin': value_bins[rows, columns],
+                                       'value': values[rows, columns]}).value_counts())
+        counts = pd.concat(parts).groupby(level=[0, 1, 2]).sum().sort_index()
+        selected = {
+            key: (group.index.get_level_values(2).to_numpy(dtype=np.float64), np.cumsum(group.to_numpy()))
+            for key, group in counts.groupby(level=[0, 1])
+        }
+
+        # Hạng trong bin = hạng toàn cột - số giá trị của các bin trước đó
+        resolved = np.full(ranks.shape, np.nan)
+        for j in np.flatnonzero(present):
+            for side in range(2):
+                for k in range(len(quantiles)):
+                    b = bins[side, j, k]
+                    candidates, candidate_counts = selected[j, b]
+                    within = ranks[side, j, k] - (cumulative[j, b] - histogram[j, b])
+                    resolved[side, j, k] = candidates[np.searchsorted(candidate_counts, within, side='right')]
+        low_values, high_values = resolved
+        result[present] = (low_values + (position - ranks[0]) * (high_values - low_values))[present]
+        return result
+
+    def league_stats(self, histogram):
+        """
+        League rows of the team and distribution statistics
+
+        Args:
+            histogram: (columns x QUANTILE_BINS) counts of all partitions
+
+        Returns:
+            tuple: (dict of the results2.csv row, dict of the
+                    results2_distribution.csv row)
+        """
+        quantile_values = self._league_quantiles((0.5,) + self.quantiles, histogram)
+        stats = self.league.statistics()
+        stats['median'] = quantile_values[:, 0]
+        weighted_means, per90_values = self.league.weighted()
+
+        team_row = {self.group_col: LEAGUE_LABEL}
+        distribution_row = {self.group_col: LEAGUE_LABEL}
+        for j, column in enumerate(self.columns):
+            for stat, label in STATISTICS.items():
+                team_row[f"{label} of {column}"] = stats[stat][j]
+            for k, q in enumerate(self.quantiles):
+                distribution_row[f"Q{q * 100:g} of {column}"] = quantile_values[j, k + 1]
+            if self.has_weights:
+                distribution_row[f"Weighted mean of {column}"] = weighted_means[j]
+            if self.has_weights and self.per90_mask[j]:
+                distribution_row[f"Per90 of {column}"] = per90_values[j]
+        return team_row, distribution_row
+
+    def finish(self):
+        """
+        Aggregate the partitions and prepend the league row
+
+        Returns:
+            tuple: (team stats DataFrame, distribution stats DataFrame), in the
+                   layouts of compute_team_stats() / compute_distribution_stats()
+        """
+        team_parts, distribution_parts = [], []
+        histogram = np.zeros((len(self.columns), QUANTILE_BINS), dtype=np.int64)
+        for partition in range(self.n_partitions):
+            data = self.read_partition(partition)
+            if data is None:
+                continue
+            histogram += self._histogram(self._values(data))
+            team_parts.append(split_league(compute_team_stats(data, self.columns, self.group_col),
+                                           self.group_col)[1])
+            distribution_parts.append(split_league(compute_distribution_stats(
+                data, self.columns, self.quantiles, self.weight_col, self.group_col, self.per90_columns),
+                self.group_col)[1])
+        team_row, distribution_row = self.league_stats(histogram)
+
+        def combine(row, parts):
+            teams = pd.concat(parts) if parts else pd.DataFrame(columns=list(row))
+            teams = teams.sort_values(self.group_col, kind='stable')
+            return pd.concat([pd.DataFrame([row]), teams[list(row)]], ignore_index=True)
+
+        return combine(team_row, team_parts), combine(distribution_row, distribution_parts)
+
+
+def aggregate_file(path, chunksize=DEFAULT_CHUNKSIZE, group_col='Team'):
+    """
+    Team statistics of a results.csv-layout file in one chunked read
+
+    Per-90 rates are given for the columns that are integer counts in the
+    first rows of the file (the compact batches are all float32).
+
+    Returns:
+        tuple: (team stats DataFrame, distribution stats DataFrame), in the
+               layouts of compute_team_stats() / compute_distribution_stats()
+    """
+    sample = read_sample(path)
+    columns = numeric_columns(sample)
+    per90 = count_columns(sample, columns) if MINUTES_COL in sample.columns else []
+    usecols = [group_col] + columns
+
+    with tempfile.TemporaryDirectory(prefix='chunked_') as workdir:
+        stats = ChunkedTeamStats(columns, per90, workdir, partition_count(path, chunksize, sample),
+                                 group_col=group_col)
+        for chunk in read_chunks(path, chunksize, usecols=usecols, sample=sample):
+            stats.update(chunk)
+        print(f"Aggregated {stats.rows} players in chunks of {chunksize} "
+              f"({stats.n_partitions} team partition(s))")
+        return stats.finish()
@@ -0,0 +1,112 @@
+"""
+Part IV: Data-driven cluster labelling
+KMeans cluster ids are arbitrary, so role names are derived from the data:
+each centroid is matched (Hungarian algorithm) to position-profile
+prototypes built from the players' Pos and stats. Cluster ids are also
+aligned with the previous model so that a rerun does not flip them.
+"""
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# Vai trò và các giá trị Pos tương ứng dùng để xây dựng prototype
+ROLE_POSITIONS = {
+    "Thủ môn": ['GK'],
+    "Hậu vệ/Phòng ngự": ['DF', 'DF,MF'],
+    "Tiền vệ trung tâm": ['MF', 'MF,DF'],
+    "Tiền vệ cánh/Công": ['MF,FW', 'FW,MF', 'DF,FW', 'FW,DF'],
+    "Tiền đạo/Tấn công": ['FW']
+}
+
+
+def _squared_distances(A, B):
+    """(len(A) x len(B)) matrix of squared Euclidean distances"""
+    return (A ** 2).sum(axis=1)[:, None] - 2 * A @ B.T + (B ** 2).sum(axis=1)[None, :]
+
+
+def role_prototypes(X_scaled, positions):
+    """
+    Mean standardized profile of the players of every role
+
+    Args:
+        X_scaled: (players x features) standardized matrix
+        positions: Pos value of every player (e.g. 'DF', 'FW,MF')
+
+    Returns:
+        tuple: (role names, (roles x features) prototype matrix); roles
+               without any player are left out
+    """
+    positions = np.asarray(positions, dtype=object)
+    names, prototypes = [], []
+    for role, codes in ROLE_POSITIONS.items():
+        members = np.isin(positions, codes)
+        if members.any():
+            names.append(role)
+            prototypes.append(X_scaled[members].mean(axis=0))
+    return names, np.array(prototypes)
+
+
+def name_clusters(centroids, role_names, prototypes):
+    """
+    Role name of every cluster
+
+    Clusters and roles are paired one-to-one by minimum total distance.
+    When there are more clusters than roles, the remaining clusters take
+    the name of their nearest role with a number ("Tiền đạo/Tấn công 2").
+    Without any prototype the clusters are simply numbered ("Nhóm 0").
+    """
+    if len(role_names) == 0:
+        return [f"Nhóm {c}" for c in range(len(centroids))]
+    distances = _squared_distances(centroids, prototypes)
+    names = [None] * len(centroids)
+    rows, cols = linear_sum_assignment(distances)
+    for row, col in zip(rows, cols):
+        names[row] = role_names[col]
+
+    used = {name: 1 for name in names if name}
+    for row in range(len(centroids)):
+        if names[row] is None:
+            role = role_names[int(np.argmin(distances[row]))]
+            used[role] = used.get(role, 0) + 1
+            names[row] = f"{role} {used[role]}"
+    return names
+
+
+def align_clusters(centroids, previous_centroids):
+    """
+    Reorder new clusters so that they keep the ids of the previous model
+
+    Both centroid sets must be expressed in the same feature space. Each new
+    cluster is matched to a previous one (Hungarian algorithm); with the same
+    k the matched ids are reused as-is, otherwise the order of the matched
+    ids is kept and unmatched clusters come last.
+
+    Returns:
+        ndarray: order such that new id i is the cluster at index order[i]
+                 (aligned centroids = centroids[order])
+    """
+    k = len(centroids)
+    rows, cols = linear_sum_assignment(_squared_distances(centroids, previous_centroids))
+    key = len(previous_centroids) + np.arange(k, dtype=float)
+    key[rows] = cols
+    return np.argsort(key, kind='stable')
+
+
+def relabel(labels, order):
+    """Cluster labels after reordering the clusters with align_clusters()"""
+    new_id = np.empty(len(order), dtype=int)
+    new_id[order] = np.arange(len(order))
+    return new_id[np.asarray(labels)]
+
+
+def previous_centroids_in(model, columns, mean, scale):
+    """
+    Centroids of a previously saved ClusterModel in the current scaled space
+
+    Returns:
+        ndarray or None when the feature columns differ
+    """
+    if model is None or list(model.columns) != list(columns):
+        return None
+    raw = model.centroids * model.scale + model.mean
+    return (raw - mean) / scale
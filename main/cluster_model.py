@@ -0,0 +1,102 @@
+"""
+Part IV: Persisted clustering model
+Stores the fitted scaler, imputation values, KMeans centroids, PCA
+components and cluster names in one versioned .npz artifact, and assigns
+new or updated players to the existing clusters without retraining.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CLUSTER_MODEL_FILE = os.path.join(SCRIPT_DIR, "cluster_model.npz")
+
+# Tăng khi định dạng file thay đổi
+FORMAT_VERSION = 1
+
+
+class ClusterModel:
+    """
+    Everything needed to place a player into an existing cluster
+
+    Attributes:
+        columns: Feature columns, in training order
+        impute_values: Value used for a missing feature (training median)
+        mean, scale: StandardScaler parameters
+        centroids: (k x features) KMeans centroids in scaled space
+        pca_mean, pca_components: PCA parameters for 2D coordinates
+        names: Role label of every cluster id
+        version: Model version (creation timestamp)
+    """
+
+    def __init__(self, columns, impute_values, mean, scale, centroids,
+                 pca_mean, pca_components, names, version=None):
+        self.columns = list(columns)
+        self.impute_values = np.asarray(impute_values, dtype=float)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.centroids = np.asarray(centroids, dtype=float)
+        self.pca_mean = np.asarray(pca_mean, dtype=float)
+        self.pca_components = np.asarray(pca_components, dtype=float)
+        self.names = list(names)
+        self.version = version or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self._centroid_norms = (self.centroids ** 2).sum(axis=1)
+
+    def transform(self, players):
+        """Standardized feature matrix of a player DataFrame"""
+        values = players.reindex(columns=self.columns).apply(pd.to_numeric, errors='coerce')
+        X = values.to_numpy(dtype=float)
+        missing = np.isnan(X)
+        X[missing] = np.broadcast_to(self.impute_values, X.shape)[missing]
+        X[np.isinf(X)] = 0
+        return (X - self.mean) / self.scale
+
+    def assign(self, players):
+        """
+        Place players into the existing clusters
+
+        Distances to all centroids come from one matrix multiply:
+        |x - c|² = |x|² - 2 x·c + |c|²
+
+        Returns:
+            tuple: (cluster ids, role names, (n x 2) PCA coordinates)
+        """
+        X = self.transform(players)
+        distances = (X ** 2).sum(axis=1)[:, None] - 2 * X @ self.centroids.T + self._centroid_norms
+        labels = distances.argmin(axis=1)
+        coords = (X - self.pca_mean) @ self.pca_components.T
+        return labels, [self.names[label] for label in labels], coords
+
+    def save(self, path=CLUSTER_MODEL_FILE):
+        """Write the artifact as a compressed .npz file (no pickled objects)"""
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'version': self.version,
+            'columns': self.columns,
+            'names': self.names
+        }
+        np.savez_compressed(
+            path,
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+            impute_values=self.impute_values,
+            mean=self.mean,
+            scale=self.scale,
+            centroids=self.centroids,
+            pca_mean=self.pca_mean,
+            pca_components=self.pca_components
+        )
+
+    @classmethod
+    def load(cls, path=CLUSTER_MODEL_FILE):
+        """Load an artifact written by save()"""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta['format_version'] != FORMAT_VERSION:
+                raise ValueError(f"Unsupported cluster model format: {meta['format_version']}")
+            return cls(meta['columns'], data['impute_values'], data['mean'], data['scale'],
+                       data['centroids'], data['pca_mean'], data['pca_components'],
+                       meta['names'], meta['version'])
@@ -0,0 +1,310 @@
+"""
+Part IV: Player clustering helpers
+K sweep for KMeans: every k is fitted in its own worker process, and the
+scaled feature matrix is shared with the workers through shared memory
+instead of being pickled once per task. The number of clusters is then
+chosen from the sweep (silhouette, elbow/knee or gap statistic).
+A streaming mode clusters files too large for memory chunk by chunk.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import silhouette_score
+from threadpoolctl import threadpool_limits
+
+from chunked import read_chunks, read_sample
+from cluster_labels import align_clusters, name_clusters, previous_centroids_in, relabel, role_prototypes
+from identity import ID_COLUMN
+
+# Số điểm lấy mẫu để ước lượng silhouette (chính xác khi n <= giá trị này)
+SILHOUETTE_SAMPLE_SIZE = 2000
+
+
+def _silhouette(X, labels, sample_size, exact, random_state):
+    """Exact silhouette (O(n²)) or an estimate on a random sample of rows"""
+    if exact or len(X) <= sample_size:
+        return silhouette_score(X, labels)
+    return silhouette_score(X, labels, sample_size=sample_size, random_state=random_state)
+
+
+def fit_k(X, k, random_state=42, sample_size=SILHOUETTE_SAMPLE_SIZE, exact=False):
+    """
+    Fit KMeans for one k
+
+    Returns:
+        tuple: (k, inertia, silhouette score, fitted KMeans model)
+    """
+    model = KMeans(n_clusters=k, random_state=random_state, n_init='auto').fit(X)
+    score = _silhouette(X, model.labels_, sample_size, exact, random_state)
+    return k, model.inertia_, score, model
+
+
+def _fit_k_shared(shm_name, shape, dtype, k, random_state, sample_size, exact):
+    """Worker: attach to the shared scaled matrix and fit one k single-threaded"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        X = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        with threadpool_limits(limits=1):
+            result = fit_k(X, k, random_state, sample_size, exact)
+        del X
+        return result
+    finally:
+        shm.close()
+
+
+def sweep_k(X, k_range=range(2, 11), n_jobs=None, random_state=42,
+            sample_size=SILHOUETTE_SAMPLE_SIZE, exact=False):
+    """
+    Fit KMeans for every k and score it with inertia and silhouette
+
+    Args:
+        X: Scaled feature matrix
+        k_range: Values of k to try
+        n_jobs: Worker processes (default: one per CPU, capped at len(k_range));
+                1 runs everything in this process
+        random_state: Seed for KMeans and silhouette sampling
+        sample_size: Rows used to estimate silhouette on large inputs
+        exact: Compute the exact O(n²) silhouette regardless of size
+
+    Returns:
+        dict: 'k', 'inertia', 'silhouette' lists (in k order) and 'models' {k: KMeans}
+    """
+    k_values = list(k_range)
+    n_jobs = n_jobs or min(len(k_values), os.cpu_count() or 1)
+    X = np.ascontiguousarray(X, dtype=np.float64)
+
+    if n_jobs <= 1:
+        results = [fit_k(X, k, random_state, sample_size, exact) for k in k_values]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+        try:
+            shared = np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)
+            shared[:] = X
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                futures = [
+                    pool.submit(_fit_k_shared, shm.name, X.shape, X.dtype, k,
+                                random_state, sample_size, exact)
+                    for k in k_values
+                ]
+                results = [future.result() for future in futures]
+            del shared
+        finally:
+            shm.close()
+            shm.unlink()
+
+    return {
+        'k': [k for k, _, _, _ in results],
+        'inertia': [inertia for _, inertia, _, _ in results],
+        'silhouette': [score for _, _, score, _ in results],
+        'models': {k: model for k, _, _, model in results}
+    }
+
+
+def elbow_k(k_values, inertia):
+    """
+    Knee of the inertia curve (Kneedle)
+
+    Both axes are normalised to [0, 1]; the knee is the k whose point lies
+    furthest below the straight line joining the first and last points.
+    """
+    k = np.asarray(k_values, dtype=float)
+    w = np.asarray(inertia, dtype=float)
+    if len(k) < 3 or w[0] == w[-1]:
+        return int(k[0])
+    x = (k - k[0]) / (k[-1] - k[0])
+    y = (w - w[-1]) / (w[0] - w[-1])
+    return int(k[np.argmax((1 - x) - y)])
+
+
+def gap_k(X, k_values, inertia, n_refs=5, random_state=42):
+    """
+    Smallest k with Gap(k) >= Gap(k+1) - s(k+1) (Tibshirani et al.)
+
+    Reference datasets are drawn uniformly inside the bounding box of X;
+    the inertia of X itself is reused from the sweep.
+    """
+    rng = np.random.RandomState(random_state)
+    low, high = X.min(axis=0), X.max(axis=0)
+    references = [rng.uniform(low, high, size=X.shape) for _ in range(n_refs)]
+
+    gaps, errors = [], []
+    for k, w in zip(k_values, inertia):
+        log_ref = np.log([
+            KMeans(n_clusters=k, random_state=random_state, n_init='auto').fit(ref).inertia_
+            for ref in references
+        ])
+        gaps.append(log_ref.mean() - np.log(w))
+        errors.append(log_ref.std() * np.sqrt(1 + 1 / n_refs))
+
+    for i in range(len(k_values) - 1):
+        if gaps[i] >= gaps[i + 1] - errors[i + 1]:
+            return int(k_values[i])
+    return int(k_values[int(np.argmax(gaps))])
+
+
+K_SELECTION_METHODS = ('silhouette', 'elbow', 'gap')
+
+
+def select_k(sweep, method='silhouette', X=None, random_state=42):
+    """
+    Choose the number of clusters from a sweep_k() result
+
+    Args:
+        sweep: Output of sweep_k()
+        method: 'silhouette' (highest score), 'elbow' (knee of inertia)
+                or 'gap' (gap statistic, needs X)
+        X: Scaled feature matrix (only for 'gap')
+
+    Returns:
+        int: selected k (its fitted model is sweep['models'][k])
+    """
+    if method == 'silhouette':
+        return int(sweep['k'][int(np.argmax(sweep['silhouette']))])
+    if method == 'elbow':
+        return elbow_k(sweep['k'], sweep['inertia'])
+    if method == 'gap':
+        if X is None:
+            raise ValueError("The gap statistic needs the scaled feature matrix X")
+        return gap_k(X, sweep['k'], sweep['inertia'], random_state=random_state)
+    raise ValueError(f"Unknown k selection method: {method}")
+
+
+# Các cột thông tin cầu thủ được giữ lại trong file phân cụm khi chạy streaming
+ID_COLUMNS = ['Player', 'Team', 'Pos', ID_COLUMN]
+
+
+def _numeric_chunk(chunk, columns):
+    """Numeric matrix of one chunk, non-numeric cells and infinities as NaN"""
+    values = chunk.reindex(columns=columns).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    values[np.isinf(values)] = np.nan
+    return values
+
+
+def stream_cluster(input_path, output_path, k=None, k_method='silhouette', chunksize=10000,
+                   sample_size=5000, n_components=2, random_state=42, previous_model=None):
+    """
+    Cluster a large results file chunk by chunk with bounded memory
+
+    Pass 1 fits a StandardScaler incrementally (NaN-aware) and keeps a
+    reservoir sample of rows; when k is not given it is chosen by a sweep on
+    that sample. Pass 2 fits MiniBatchKMeans and IncrementalPCA with
+    partial_fit; the clusters are then aligned with previous_model and named
+    from the position prototypes of the sample. Pass 3 assigns clusters and PCA coordinates per chunk and
+    appends them to output_path. Missing values are imputed with the column
+    mean (0 after scaling) because an exact median needs the whole column.
+    Chunks are read with the compact dtypes of chunked.read_chunks()
+    (float32 statistics, categorical Team / Pos).
+
+    Args:
+        input_path: CSV in results.csv layout
+        output_path: CSV written with Player, Team, Pos, Cluster, PC1, PC2...
+        k: Number of clusters (default: selected on the sample with k_method)
+        k_method: Selection method used when k is None (see select_k())
+        chunksize: Rows read per chunk
+        sample_size: Rows kept in the reservoir sample for k selection
+        n_components: PCA components written per player
+        random_state: Seed
+        previous_model: ClusterModel of the previous run whose cluster ids are kept
+
+    Returns:
+        dict: k, feature columns with their mean/scale, aligned centroids,
+              cluster names and sizes, and the fitted scaler/kmeans/pca
+    """
+    rng = np.random.RandomState(random_state)
+    header = read_sample(input_path)
+    numeric = header.select_dtypes(include=[np.number]).columns.tolist()
+    has_pos = 'Pos' in header.columns
+
+    # Lượt 1: scaler tăng dần + mẫu reservoir (kèm vị trí để đặt tên cụm)
+    scaler = StandardScaler()
+    sample = np.empty((0, len(numeric)))
+    sample_pos = np.empty(0, dtype=object)
+    seen = 0
+    for chunk in read_chunks(input_path, chunksize, numeric + ['Pos'] * has_pos, header):
+        values = _numeric_chunk(chunk, numeric)
+        positions = chunk['Pos'].to_numpy(dtype=object) if has_pos else np.full(len(chunk), None)
+        scaler.partial_fit(values)
+
+        free = max(sample_size - len(sample), 0)
+        sample = np.vstack([sample, values[:free]])
+        sample_pos = np.concatenate([sample_pos, positions[:free]])
+        rest = values[free:]
+        if len(rest):
+            slots = rng.randint(0, seen + free + np.arange(1, len(rest) + 1))
+            keep = slots < sample_size
+            sample[slots[keep]] = rest[keep]
+            sample_pos[slots[keep]] = positions[free:][keep]
+        seen += len(values)
+
+    # Bỏ các cột hoàn toàn trống
+    valid = ~np.isnan(scaler.mean_)
+    columns = [c for c, v in zip(numeric, valid) if v]
+
+    def transform(values):
+        scaled = (values[:, valid] - scaler.mean_[valid]) / scaler.scale_[valid]
+        return np.nan_to_num(scaled, nan=0.0)
+
+    if k is None:
+        sweep = sweep_k(transform(sample), random_state=random_state)
+        k = select_k(sweep, k_method, transform(sample), random_state)
+        print(f"Selected k = {k} by {k_method} on a sample of {len(sample)} rows")
+
+    # Lượt 2: MiniBatchKMeans + IncrementalPCA
+    kmeans = MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init='auto')
+    pca = IncrementalPCA(n_components=n_components)
+    pending = np.empty((0, len(columns)))
+    for chunk in read_chunks(input_path, chunksize, numeric, header):
+        batch = np.vstack([pending, transform(_numeric_chunk(chunk, numeric))])
+        if len(batch) < max(k, n_components):
+            pending = batch
+            continue
+        kmeans.partial_fit(batch)
+        pca.partial_fit(batch)
+        pending = np.empty((0, len(columns)))
+    if len(pending) >= max(k, n_components):
+        kmeans.partial_fit(pending)
+        pca.partial_fit(pending)
+
+    # Giữ id cụm của lần chạy trước và đặt tên theo prototype vị trí
+    centroids = kmeans.cluster_centers_
+    previous = previous_centroids_in(previous_model, columns, scaler.mean_[valid], scaler.scale_[valid])
+    order = align_clusters(centroids, previous) if previous is not None else np.arange(k)
+    centroids = centroids[order]
+    names = name_clusters(centroids, *role_prototypes(transform(sample), sample_pos))
+
+    # Lượt 3: gán cụm theo từng chunk và ghi nối tiếp
+    sizes = np.zeros(k, dtype=np.int64)
+    first = True
+    for chunk in read_chunks(input_path, chunksize, sample=header):
+        X = transform(_numeric_chunk(chunk, numeric))
+        labels = relabel(kmeans.predict(X), order)
+        coords = pca.transform(X)
+        sizes += np.bincount(labels, minlength=k)
+
+        out = chunk.reindex(columns=[c for c in ID_COLUMNS if c in chunk.columns])
+        out['Cluster'] = labels
+        for i in range(n_components):
+            out[f'PC{i + 1}'] = coords[:, i]
+        out.to_csv(output_path, mode='w' if first else 'a', header=first, index=False)
+        first = False
+
+    return {
+        'k': k,
+        'columns': columns,
+        'mean': scaler.mean_[valid],
+        'scale': scaler.scale_[valid],
+        'centroids': centroids,
+        'names': names,
+        'cluster_sizes': sizes,
+        'rows': int(sizes.sum()),
+        'scaler': scaler,
+        'kmeans': kmeans,
+        'pca': pca
+    }
@@ -0,0 +1,208 @@
+"""
+Shared feature preparation for the analysis stages
+Turns a results.csv-style table into a numeric float32 matrix once per data
+version: type coercion, infinities, median imputation and standardization
+are all vectorized. The result is cached on disk under a content hash of
+the input and memory-mapped on load, so clustering (Problem_4.py) and
+valuation (problem3_2.py) reuse it instead of redoing the cleanup.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from identity import ID_COLUMN
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FEATURE_CACHE_DIR = os.path.join(SCRIPT_DIR, ".feature_cache")
+
+# Tăng khi cách chuẩn bị đặc trưng thay đổi (làm mất hiệu lực cache cũ)
+FEATURE_VERSION = 2
+
+# Chuỗi được coi là giá trị thiếu khi ép kiểu cột văn bản sang số
+MISSING_TOKENS = ['', 'N/A', 'NA', 'nan', '-', '—']
+
+
+def _coerce(column):
+    """
+    Numeric version of a column, or None if it is not numeric
+
+    Text columns are converted when every non-missing cell parses as a
+    number once thousands separators are removed ('1,234' -> 1234).
+    """
+    if pd.api.types.is_bool_dtype(column):
+        return None
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype(float)
+    text = column.astype(str).str.strip().str.replace(',', '', regex=False)
+    missing = column.isna() | text.isin(MISSING_TOKENS)
+    values = pd.to_numeric(text.mask(missing), errors='coerce')
+    if missing.all() or values[~missing].isna().any():
+        return None
+    return values
+
+
+class FeatureMatrix:
+    """
+    Prepared numeric features of every player
+
+    Attributes:
+        columns: Numeric feature columns (completely empty columns dropped)
+        values: (players x columns) float32 raw values, NaN where missing,
+                infinities set to 0
+        scaled: (players x columns) float32 standardized values after
+                median imputation (the clustering input)
+        impute_values: Median of every column (0 when undefined)
+        mean, scale: Standardization parameters (scale 1 for constant columns)
+        key: Content hash of the source data
+    """
+
+    def __init__(self, columns, values, scaled, impute_values, mean, scale, key=None):
+        self.columns = list(columns)
+        self.values = values
+        self.scaled = scaled
+        self.impute_values = np.asarray(impute_values, dtype=float)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.key = key
+        self._index = {column: i for i, column in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.values)
+
+    def column(self, name, fill=None):
+        """
+        One raw column as float64
+
+        Args:
+            name: Column name
+            fill: Value for missing cells (None keeps NaN); a column that is
+                  absent or was entirely empty is returned filled as well
+        """
+        if name not in self._index:
+            return np.full(len(self), np.nan if fill is None else fill)
+        values = self.values[:, self._index[name]].astype(float)
+        if fill is not None:
+            values[np.isnan(values)] = fill
+        return values
+
+    def frame(self, fill=None):
+        """Raw values as a DataFrame (missing cells optionally filled)"""
+        values = np.asarray(self.values, dtype=float)
+        if fill is not None:
+            values = np.where(np.isnan(values), fill, values)
+        return pd.DataFrame(values, columns=self.columns)
+
+    @classmethod
+    def from_frame(cls, df, key=None):
+        """Prepare the features of a DataFrame (no caching)"""
+        coerced = {}
+        for name in df.columns:
+            # ID fbref dạng hex (vd. '1234e567') có thể bị đọc nhầm thành số
+            if name == ID_COLUMN:
+                continue
+            values = _coerce(df[name])
+            if values is not None:
+                coerced[name] = values
+        numeric = pd.DataFrame(coerced, index=df.index)
+
+        values = numeric.to_numpy(dtype=np.float64, copy=True)
+        values[np.isinf(values)] = 0
+        present = ~np.isnan(values).all(axis=0) if len(values) else np.zeros(values.shape[1], dtype=bool)
+        columns = numeric.columns[present]
+        values = values[:, present]
+
+        # Trung vị theo cột, thay giá trị thiếu và chuẩn hóa trong một lượt
+        impute_values = np.nan_to_num(np.nanmedian(values, axis=0)) if len(values) else np.zeros(len(columns))
+        filled = np.where(np.isnan(values), impute_values, values)
+        mean = filled.mean(axis=0)
+        scale = filled.std(axis=0)
+        scale[scale == 0] = 1
+        scaled = (filled - mean) / scale
+
+        return cls(columns, values.astype(np.float32), scaled.astype(np.float32),
+                   impute_values, mean, scale, key)
+
+    def save(self, directory):
+        """Write the matrices as .npy files (memory-mappable) plus JSON metadata"""
+        np.save(os.path.join(directory, 'values.npy'), np.ascontiguousarray(self.values))
+        np.save(os.path.join(directory, 'scaled.npy'), np.ascontiguousarray(self.scaled))
+        meta = {
+            'feature_version': FEATURE_VERSION,
+            'key': self.key,
+            'columns': self.columns,
+            'impute_values': self.impute_values.tolist(),
+            'mean': self.mean.tolist(),
+            'scale': self.scale.tolist()
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory):
+        """Load a saved matrix; the arrays are memory-mapped read-only"""
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['feature_version'] != FEATURE_VERSION:
+            raise ValueError(f"Unsupported feature cache version: {meta['feature_version']}")
+        return cls(meta['columns'],
+                   np.load(os.path.join(directory, 'values.npy'), mmap_mode='r'),
+                   np.load(os.path.join(directory, 'scaled.npy'), mmap_mode='r'),
+                   meta['impute_values'], meta['mean'], meta['scale'], meta['key'])
+
+
+def content_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's bytes plus FEATURE_VERSION"""
+    digest = hashlib.sha256(f"features-v{FEATURE_VERSION}".encode())
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_features(input_path, df=None, cache_dir=FEATURE_CACHE_DIR, use_cache=True):
+    """
+    Prepared features of a CSV file, from the cache when the content is unchanged
+
+    Args:
+        input_path: CSV in results.csv layout
+        df: The same file already read (avoids reading it again on a cache miss)
+        cache_dir: Directory holding one sub-directory per content hash
+        use_cache: False always rebuilds (and does not write the cache)
+
+    Returns:
+        FeatureMatrix (memory-mapped when it comes from the cache)
+    """
+    key = content_hash(input_path)
+    directory = os.path.join(cache_dir, key)
+
+    if use_cache and os.path.exists(os.path.join(directory, 'meta.json')):
+        try:
+            return FeatureMatrix.load(directory)
+        except (OSError, KeyError, ValueError) as e:
+            # Không xóa thư mục cache của tiến trình khác; chỉ bỏ qua cache lỗi
+            print(f"Warning: Ignoring unreadable feature cache {directory} (delete it to rebuild): {e}")
+            return FeatureMatrix.from_frame(pd.read_csv(input_path) if df is None else df, key)
+
+    features = FeatureMatrix.from_frame(pd.read_csv(input_path) if df is None else df, key)
+    if not use_cache:
+        return features
+
+    # Ghi vào thư mục tạm rồi đổi tên, để tiến trình khác không đọc cache dở dang.
+    # Thư mục đích được đặt tên theo sha256 của dữ liệu nên không bao giờ bị ghi đè:
+    # nếu tiến trình khác đã công bố trước thì bỏ bản tạm và dùng bản đã có
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=cache_dir)
+    try:
+        features.save(staging)
+        os.rename(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.exists(os.path.join(directory, 'meta.json')):
+            raise
+    return FeatureMatrix.load(directory)
@@ -0,0 +1,180 @@
+"""
+Player identity layer
+fbref gives every player a stable 8-character hex ID (the data-append-csv
+attribute of the player cell and the /en/players/<id>/ link). This module
+extracts it, turns it into an integer join key, and resolves display names
+to IDs through a normalized-name alias index, so two players with the same
+name no longer overwrite each other and joins are integer hash lookups.
+"""
+
+import hashlib
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+ID_COLUMN = 'Player_ID'
+KEY_COLUMN = 'Player_Key'
+
+PLAYER_HREF_PATTERN = re.compile(r'/players/([0-9a-f]{8})/')
+PLAYER_ID_PATTERN = re.compile(r'^[0-9a-f]{8}$')
+
+# Khóa băm theo tên (khi không có ID fbref) nằm ngoài khoảng của ID fbref (< 2^32)
+NAME_KEY_OFFSET = 1 << 32
+
+
+def extract_player_id(cell):
+    """
+    fbref ID of a player cell (BeautifulSoup Tag), or None
+
+    The data-append-csv attribute is used when present, otherwise the
+    /en/players/<id>/... link inside the cell.
+    """
+    if cell is None:
+        return None
+    value = cell.get('data-append-csv')
+    if value and PLAYER_ID_PATTERN.match(value):
+        return value
+    link = cell.find('a', href=True)
+    match = PLAYER_HREF_PATTERN.search(link['href']) if link else None
+    return match.group(1) if match else None
+
+
+def normalize_name(name):
+    """Accent-, case- and punctuation-insensitive form of a name ('Díaz' -> 'diaz')"""
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return ''
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r"[^\w\s]", ' ', text).split())
+
+
+def name_key(name):
+    """Stable integer key of a name, used when a player has no fbref ID"""
+    digest = hashlib.blake2b(normalize_name(name).encode(), digest_size=7).digest()
+    return NAME_KEY_OFFSET + int.from_bytes(digest, 'big')
+
+
+def player_keys(ids, names):
+    """
+    Integer join key of every row: the fbref ID read as hex, else name_key()
+
+    Args:
+        ids: fbref IDs (NaN/None where unknown)
+        names: Display names, aligned with ids
+
+    Returns:
+        ndarray of int64
+    """
+    ids = pd.Series(ids, dtype=object).reset_index(drop=True)
+    names = pd.Series(names, dtype=object).reset_index(drop=True)
+    valid = ids.astype(str).str.fullmatch(PLAYER_ID_PATTERN.pattern)
+    keys = np.empty(len(ids), dtype=np.int64)
+    keys[valid.to_numpy()] = [int(value, 16) for value in ids[valid]]
+    keys[~valid.to_numpy()] = [name_key(name) for name in names[~valid]]
+    return keys
+
+
+class PlayerIndex:
+    """
+    Name -> player key resolution with aliases
+
+    Every known player is registered under the normalized form of its name
+    and of any alias. A name shared by several players is resolved with
+    the team when given; otherwise it stays ambiguous (None).
+    """
+
+    def __init__(self):
+        self._by_name = {}
+        self._teams = {}
+
+    def add(self, key, name, team=None, aliases=()):
+        key = int(key)
+        for alias in (name, *aliases):
+            self._by_name.setdefault(normalize_name(alias), set()).add(key)
+        if team is not None and not pd.isna(team):
+            self._teams.setdefault(key, set()).add(normalize_name(team))
+
+    def add_alias(self, alias, key):
+        """Register another spelling of a known player"""
+        self._by_name.setdefault(normalize_name(alias), set()).add(int(key))
+
+    @classmethod
+    def from_frame(cls, players, name_col='Player', team_col='Team'):
+        """Index of a player table (keys from its Player_ID column when present)"""
+        index = cls()
+        ids = players[ID_COLUMN] if ID_COLUMN in players.columns else [None] * len(players)
+        teams = players[team_col] if team_col in players.columns else [None] * len(players)
+        for key, name, team in zip(player_keys(ids, players[name_col]), players[name_col], teams):
+            index.add(key, name, team)
+        return index
+
+    def resolve(self, name, team=None):
+        """Key of a player name, or None if unknown or ambiguous"""
+        candidates = self._by_name.get(normalize_name(name))
+        if not candidates:
+            return None
+        if len(candidates) > 1 and team is not None:
+            team = normalize_name(team)
+            candidates = {key for key in candidates if team in self._teams.get(key, ())}
+        return next(iter(candidates)) if len(candidates) == 1 else None
+
+    def resolve_frame(self, df, name_col='Player', team_col='Team'):
+        """
+        Key of every row of df; rows with a Player_ID use it directly
+
+        Returns:
+            Series of nullable Int64 keys (NA where unresolved), aligned with df
+        """
+        teams = df[team_col] if team_col in df.columns else [None] * len(df)
+        resolved = [self.resolve(name, team) for name, team in zip(df[name_col], teams)]
+        keys = pd.Series(resolved, index=df.index, dtype='Int64')
+        if ID_COLUMN in df.columns:
+            has_id = df[ID_COLUMN].astype(str).str.fullmatch(PLAYER_ID_PATTERN.pattern).to_numpy()
+            keys[has_id] = player_keys(df[ID_COLUMN], df[name_col])[has_id]
+        return keys
+
+
+def add_keys(df, index):
+    """Copy of df with its resolved integer Player_Key (nullable Int64)"""
+    return df.assign(**{KEY_COLUMN: index.resolve_frame(df).to_numpy()})
+
+
+def key_table(df, columns):
+    """
+    One row of df[columns] per Player_Key (the first one), indexed by the key
+
+    Built once from a keyed table (see add_keys()), it turns repeated joins
+    into a reindex on integer keys.
+    """
+    keyed = df[df[KEY_COLUMN].notna()].drop_duplicates(KEY_COLUMN)
+    return keyed.set_index(KEY_COLUMN)[list(columns)]
+
+
+def join_players(left, right, columns, how='left', index=None):
+    """
+    Join right[columns] onto a player table through the identity index
+
+    Both sides get an integer Player_Key (fbref ID, or the name resolved
+    through the index built from `left`) and are merged on it, so players
+    sharing a display name are kept apart. A side that already has a
+    Player_Key column (see add_keys()) is not resolved again.
+
+    Args:
+        left: Player table (e.g. results.csv)
+        right: Table with a Player column (e.g. transfer_values.csv)
+        columns: Columns of right to add
+        how: Merge type
+        index: PlayerIndex (default: built from left)
+
+    Returns:
+        DataFrame with left's columns plus `columns`
+    """
+    index = index or PlayerIndex.from_frame(left)
+    keyed_left = left if KEY_COLUMN in left.columns else add_keys(left, index)
+    keyed_right = right if KEY_COLUMN in right.columns else add_keys(right, index)
+
+    extra = keyed_right.loc[keyed_right[KEY_COLUMN].notna(), list(columns) + [KEY_COLUMN]]
+    merged = keyed_left.merge(extra.drop_duplicates(KEY_COLUMN), on=KEY_COLUMN, how=how)
+    return merged if KEY_COLUMN in left.columns else merged.drop(columns=KEY_COLUMN)
@@ -0,0 +1,345 @@
+"""
+Part III.1: Incremental per-team statistics
+Keeps mergeable per-team state (count, mean, sum of squared deviations,
+minutes-weighted sums and a sorted value sketch for quantiles) so that a
+refreshed results.csv only updates the teams whose players actually changed,
+for both results2.csv and results2_distribution.csv.
+"""
+
+import pickle
+import numpy as np
+import pandas as pd
+
+from team_stats import (LEAGUE_LABEL, STATISTICS, DEFAULT_QUANTILES, MINUTES_COL,
+                        numeric_columns, count_columns)
+
+
+class GroupState:
+    """
+    Mergeable aggregate state of one group (a team or the whole league)
+
+    Count, mean and sum of squared deviations (Welford / Chan updates) give
+    the mean and standard deviation without the cancellation of a raw sum of
+    squares; the per-column sorted arrays of non-NaN values are an exact
+    quantile sketch that also supports removing a value, which a changed
+    player row requires. Minutes-weighted sums give the weighted means and
+    per-90 rates.
+    """
+
+    def __init__(self, n_columns):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.weight_sum = np.zeros(n_columns)
+        self.value_sum = np.zeros(n_columns)
+        self.product_sum = np.zeros(n_columns)
+        self.sorted_values = [np.empty(0) for _ in range(n_columns)]
+
+    @classmethod
+    def from_values(cls, values, weights=None, sketch=True):
+        """
+        Build the state of a group from its (players x columns) matrix in bulk
+
+        With sketch=False the sorted values are not kept (moments and weighted
+        sums only), for a state that is merged over batches of unbounded size.
+        """
+        state = cls(values.shape[1])
+        valid = ~np.isnan(values)
+        state.count = valid.sum(axis=0).astype(float)
+        with np.errstate(invalid='ignore'):
+            state.mean = np.where(valid, values, 0.0).sum(axis=0) / np.maximum(state.count, 1)
+        state.m2 = (np.where(valid, values - state.mean, 0.0) ** 2).sum(axis=0)
+        if weights is not None:
+            weighted = valid & ~np.isnan(weights)[:, None]
+            w = np.where(weighted, weights[:, None], 0.0)
+            x = np.where(weighted, values, 0.0)
+            state.weight_sum = w.sum(axis=0)
+            state.value_sum = x.sum(axis=0)
+            state.product_sum = (x * w).sum(axis=0)
+        if sketch:
+            state.sorted_values = [np.sort(values[valid[:, j], j]) for j in range(values.shape[1])]
+        return state
+
+    def add(self, values, sign=1, weight=np.nan):
+        """Add (sign=1) or remove (sign=-1) one player row"""
+        valid = ~np.isnan(values)
+        x = np.where(valid, values, 0.0)
+        count = self.count + sign * valid
+        delta = x - self.mean
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(valid, self.mean + sign * delta / count, self.mean)
+        self.m2 = np.where(valid, self.m2 + sign * delta * (x - mean), self.m2)
+        # Nhóm rỗng: đặt lại về 0 để tránh sai số tích lũy
+        empty = count == 0
+        self.mean = np.where(empty, 0.0, mean)
+        self.m2 = np.where(empty, 0.0, np.maximum(self.m2, 0.0))
+        self.count = count
+
+        if not np.isnan(weight):
+            self.weight_sum += sign * valid * weight
+            self.value_sum += sign * x
+            self.product_sum += sign * x * weight
+
+        for j in np.flatnonzero(valid):
+            column = self.sorted_values[j]
+            position = np.searchsorted(column, values[j])
+            if sign > 0:
+                self.sorted_values[j] = np.insert(column, position, values[j])
+            else:
+                self.sorted_values[j] = np.delete(column, position)
+
+    def remove(self, values, weight=np.nan):
+        """Remove one player row previously added"""
+        self.add(values, sign=-1, weight=weight)
+
+    def merge(self, other):
+        """Fold another state (e.g. built on another worker) into this one"""
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mean = np.where(count > 0, self.mean + delta * other.count / count, 0.0)
+            self.m2 = np.where(count > 0, self.m2 + other.m2 + delta ** 2 * self.count * other.count / count, 0.0)
+        self.count = count
+        self.weight_sum += other.weight_sum
+        self.value_sum += other.value_sum
+        self.product_sum += other.product_sum
+        self.sorted_values = [
+            np.sort(np.concatenate((mine, theirs)))
+            for mine, theirs in zip(self.sorted_values, other.sorted_values)
+        ]
+
+    def quantile(self, q):
+        """Linear-interpolated quantile of every column"""
+        result = np.full(len(self.sorted_values), np.nan)
+        for j, column in enumerate(self.sorted_values):
+            if len(column):
+                position = q * (len(column) - 1)
+                lower, upper = int(np.floor(position)), int(np.ceil(position))
+                result[j] = column[lower] + (position - lower) * (column[upper] - column[lower])
+        return result
+
+    def statistics(self):
+        """
+        Median, mean and sample standard deviation of every column
+
+        Returns:
+            dict: statistic name ('median', 'mean', 'std') -> ndarray
+        """
+        mean = np.where(self.count > 0, self.mean, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+        return {'median': self.quantile(0.5), 'mean': mean, 'std': std}
+
+    def weighted(self):
+        """
+        Minutes-weighted mean and per-90 rate of every column
+
+        Returns:
+            tuple: (weighted means, per-90 rates), NaN where no minutes were played
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weighted_means = np.where(self.weight_sum != 0, self.product_sum / self.weight_sum, np.nan)
+            per90 = np.where(self.weight_sum != 0, self.value_sum / self.weight_sum * 90, np.nan)
+        return weighted_means, per90
+
+
+class TeamStatsState:
+    """
+    Incrementally maintained league and per-team statistics
+
+    Usage:
+        state = TeamStatsState.from_frame(data)
+        affected = state.apply_changes(new_data)   # only touches changed teams
+        results_df = state.to_frame()               # same layout as compute_team_stats()
+        distribution_df = state.distribution_frame()  # same layout as compute_distribution_stats()
+    """
+
+    # Tăng khi cấu trúc trạng thái thay đổi (trạng thái cũ được tính lại từ đầu)
+    VERSION = 2
+
+    def __init__(self, columns, group_col='Team', key_cols=('Player', 'Team'), per90_columns=(),
+                 quantiles=DEFAULT_QUANTILES, weight_col=MINUTES_COL):
+        self.version = self.VERSION
+        self.columns = list(columns)
+        self.group_col = group_col
+        self.key_cols = list(key_cols)
+        self.per90_mask = np.isin(self.columns, list(per90_columns))
+        self.quantiles = tuple(quantiles)
+        self.weight_col = weight_col
+        self.has_weights = None
+        self.rows = None
+        self.groups = {}
+        self._cached_rows = {}
+
+    @classmethod
+    def from_frame(cls, data, columns=None, group_col='Team', key_cols=('Player', 'Team'),
+                   quantiles=DEFAULT_QUANTILES, weight_col=MINUTES_COL):
+        """Build the state from a full player table"""
+        if columns is None:
+            columns = numeric_columns(data)
+        per90 = count_columns(data, columns, weight_col) if weight_col in data.columns else []
+        state = cls(columns, group_col, key_cols, per90, quantiles, weight_col)
+        state.apply_changes(data)
+        return state
+
+    @property
+    def _tracked(self):
+        """Statistic columns plus the weight column when it is not one of them"""
+        extra = [self.weight_col] if self.has_weights and self.weight_col not in self.columns else []
+        return self.columns + extra
+
+    def _prepare(self, data):
+        """Index player rows by their key, keeping the group, statistic and weight columns"""
+        if self.has_weights is None:
+            self.has_weights = self.weight_col in data.columns
+        rows = data[data[self.group_col].notna()]
+        rows = rows.set_index(self.key_cols, drop=False)[[self.group_col] + self._tracked]
+        rows.index.names = [None] * len(self.key_cols)
+        rows[self._tracked] = rows[self._tracked].astype(float)
+        return rows
+
+    def _weights(self, rows):
+        if not self.has_weights:
+            return None
+        return rows[self.weight_col].to_numpy(dtype=float)
+
+    def _group(self, name):
+        if name not in self.groups:
+            self.groups[name] = GroupState(len(self.columns))
+        return self.groups[name]
+
+    def _build(self, rows):
+        """Build every group from scratch (first load)"""
+        self.groups = {LEAGUE_LABEL: GroupState.from_values(rows[self.columns].to_numpy(dtype=float),
+                                                            self._weights(rows))}
+        for team, team_rows in rows.groupby(self.group_col, sort=False):
+            self.groups[team] = GroupState.from_values(team_rows[self.columns].to_numpy(dtype=float),
+                                                       self._weights(team_rows))
+        self._cached_rows = {}
+        self.rows = rows
+        return set(self.groups) - {LEAGUE_LABEL}
+
+    def _update(self, rows, sign):
+        """Add or remove player rows from their team and from the league"""
+        teams = rows[self.group_col].to_numpy()
+        values = rows[self.columns].to_numpy(dtype=float)
+        weights = self._weights(rows)
+        if weights is None:
+            weights = np.full(len(rows), np.nan)
+        for team, row_values, weight in zip(teams, values, weights):
+            for name in (team, LEAGUE_LABEL):
+                self._group(name).add(row_values, sign, weight)
+                self._cached_rows.pop(name, None)
+
+    def apply_changes(self, data):
+        """
+        Bring the state up to date with a new version of the player table
+
+        Args:
+            data: Full player DataFrame (e.g. a refreshed results.csv)
+
+        Returns:
+            set: Names of the teams whose statistics changed
+        """
+        new_rows = self._prepare(data)
+        if self.rows is None:
+            return self._build(new_rows)
+
+        old_rows = self.rows
+        common = old_rows.index.intersection(new_rows.index)
+        old_common = old_rows.loc[common]
+        new_common = new_rows.loc[common]
+
+        # So sánh vector hóa: NaN ở cả hai phía được coi là bằng nhau
+        old_values = old_common[self._tracked].to_numpy(dtype=float)
+        new_values = new_common[self._tracked].to_numpy(dtype=float)
+        same = (old_values == new_values) | (np.isnan(old_values) & np.isnan(new_values))
+        changed = ~same.all(axis=1) | (
+            old_common[self.group_col].to_numpy() != new_common[self.group_col].to_numpy()
+        )
+
+        removed = old_rows.loc[old_rows.index.difference(new_rows.index)]
+        added = new_rows.loc[new_rows.index.difference(old_rows.index)]
+
+        self._update(pd.concat([removed, old_common[changed]]), sign=-1)
+        self._update(pd.concat([added, new_common[changed]]), sign=1)
+        self.rows = new_rows
+
+        affected = set(removed[self.group_col]) | set(added[self.group_col])
+        affected |= set(old_common[self.group_col][changed]) | set(new_common[self.group_col][changed])
+
+        # Xóa các đội không còn cầu thủ nào
+        for team in list(self.groups):
+            if team != LEAGUE_LABEL and not self.groups[team].count.any():
+                del self.groups[team]
+                self._cached_rows.pop(team, None)
+        return affected
+
+    def merge(self, other):
+        """Merge the state of a disjoint set of players (e.g. another league)"""
+        for name, group in other.groups.items():
+            self._group(name).merge(group)
+            self._cached_rows.pop(name, None)
+        self.rows = other.rows if self.rows is None else pd.concat([self.rows, other.rows])
+
+    def _rows(self, name):
+        """
+        Statistics and distribution rows of one group, recomputed only when it changed
+
+        Returns:
+            tuple: (results2.csv row, results2_distribution.csv row) as dicts
+        """
+        if name not in self._cached_rows:
+            group = self._group(name)
+            stats = group.statistics()
+            quantiles = [group.quantile(q) for q in self.quantiles]
+            weighted_means, per90 = group.weighted()
+            row, distribution = {}, {}
+            for j, column in enumerate(self.columns):
+                for stat, label in STATISTICS.items():
+                    row[f"{label} of {column}"] = stats[stat][j]
+                for q, values in zip(self.quantiles, quantiles):
+                    distribution[f"Q{q * 100:g} of {column}"] = values[j]
+                if self.has_weights:
+                    distribution[f"Weighted mean of {column}"] = weighted_means[j]
+                if self.has_weights and self.per90_mask[j]:
+                    distribution[f"Per90 of {column}"] = per90[j]
+            self._cached_rows[name] = (row, distribution)
+        return self._cached_rows[name]
+
+    def _frame(self, part):
+        teams = sorted(name for name in self.groups if name != LEAGUE_LABEL)
+        names = [LEAGUE_LABEL] + teams
+        results = pd.DataFrame([self._rows(name)[part] for name in names], dtype=float)
+        results.insert(0, self.group_col, names)
+        return results
+
+    def to_frame(self):
+        """
+        Current statistics in the layout of compute_team_stats()
+
+        Returns:
+            DataFrame of floats with the "all" row first, then one row per team
+        """
+        return self._frame(0)
+
+    def distribution_frame(self):
+        """
+        Current quantiles, minutes-weighted means and per-90 rates in the
+        layout of compute_distribution_stats()
+
+        Returns:
+            DataFrame of floats with the "all" row first, then one row per team
+        """
+        return self._frame(1)
+
+    def save(self, path):
+        """Persist the state next to results2.csv"""
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path):
+        """Load a state saved with save()"""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -4,6 +4,7 @@ Usage:
     python lookup.py --name <player_name>
     python lookup.py --club <club_name>
     python lookup.py --name "Mohamed Salah" --club "Liverpool"
+    python lookup.py --club Liverpool --db    # read football.db directly, no API server
 """
 
 import requests
@@ -12,6 +13,8 @@ import argparse
 import sys
 import os
 from tabulate import tabulate
+from storage import Storage, DATABASE_FILE, DEFAULT_SEASON
+from identity import join_players
 
 # API Configuration
 API_BASE_URL = "http://127.0.0.1:5000"
@@ -96,6 +99,62 @@ def query_club(club_name):
         print(f"\n❌ Error: {str(e)}")
         return None
 
+def records(df):
+    """DataFrame rows as API-style records (NaN shown as 'N/A')"""
+    return df.astype(object).where(df.notna(), 'N/A').to_dict('records')
+
+def query_player_db(player_name, season=DEFAULT_SEASON):
+    """
+    Query player data from the local database (same response shape as the API)
+
+    Returns:
+        dict: response data, or None if not found
+    """
+    if not os.path.exists(DATABASE_FILE):
+        print(f"\n❌ Error: {DATABASE_FILE} not found")
+        print("💡 Create it with: python storage.py import")
+        return None
+
+    storage = Storage(DATABASE_FILE)
+    players = storage.find_players(player_name, season)
+    if players.empty:
+        print(f"\n❌ Error: No player found with name: {player_name}")
+        return None
+
+    if 'transfer_values' in storage.tables():
+        values = storage.read_table('transfer_values', season)
+        value_columns = [c for c in values.columns if c.startswith('Transfer_Value')]
+        players = join_players(players, values, value_columns)
+
+    result = records(players)
+    if len(result) == 1:
+        return {'success': True, 'player': result[0]}
+    return {'success': True, 'players': result}
+
+def query_club_db(club_name, season=DEFAULT_SEASON):
+    """
+    Query a club squad with transfer values from the local database (indexed lookup)
+
+    Returns:
+        dict: response data, or None if not found
+    """
+    if not os.path.exists(DATABASE_FILE):
+        print(f"\n❌ Error: {DATABASE_FILE} not found")
+        print("💡 Create it with: python storage.py import")
+        return None
+
+    squad = Storage(DATABASE_FILE).club_squad(club_name, season)
+    if squad.empty:
+        print(f"\n❌ Error: No club found with name: {club_name}")
+        return None
+
+    return {
+        'success': True,
+        'club': squad['Team'].iloc[0],
+        'total_players': len(squad),
+        'players': records(squad)
+    }
+
 def format_table_display(data, max_cols=10):
     """
     Format data for pretty table display
@@ -112,7 +171,7 @@ def format_table_display(data, max_cols=10):
     # Select important columns first
     priority_cols = ['Player', 'Team', 'Pos', 'Age', 'Standard_Min',
                      'Standard_Gls', 'Standard_Ast', 'Standard_xG',
-                     'Standard_xAG', 'Transfer_Value_2024_25']
+                     'Standard_xAG', 'Transfer_Value_2024_25', 'Transfer_Value_EUR_M']
 
     # Get existing priority columns
     display_cols = [col for col in priority_cols if col in df.columns]
@@ -232,6 +291,8 @@ Examples:
 
     parser.add_argument('--name', type=str, help='Player name to search')
     parser.add_argument('--club', type=str, help='Club name to search')
+    parser.add_argument('--db', action='store_true', help='Query the local database instead of the API')
+    parser.add_argument('--season', type=str, default=DEFAULT_SEASON, help='Season (with --db)')
 
     args = parser.parse_args()
 
@@ -251,7 +312,7 @@ Examples:
     # Query by player name
     if args.name:
         print(f"\n🔍 Searching for player: {args.name}...")
-        data = query_player(args.name)
+        data = query_player_db(args.name, args.season) if args.db else query_player(args.name)
 
         if data and data.get('success'):
             result_df = display_player_data(data)
@@ -260,7 +321,7 @@ Examples:
     # Query by club name
     elif args.club:
         print(f"\n🔍 Searching for club: {args.club}...")
-        data = query_club(args.club)
+        data = query_club_db(args.club, args.season) if args.db else query_club(args.club)
 
         if data and data.get('success'):
             result_df = display_club_data(data)
@@ -0,0 +1,74 @@
+"""
+Shared parser for scraped market values
+Turns strings such as '€18.6M', '€24.00m', '£500K', '$2M', '€1.2bn' or
+'€500,000' into a numeric value in million EUR plus a currency code, once,
+at ingest time.
+Used by the scraper (problem_I.2.py), the API (problem_II.1.py) and the
+valuation model (value_model.py).
+"""
+
+import re
+import pandas as pd
+
+VALUE_COLUMN = 'Transfer_Value_2024_25'
+NUMERIC_VALUE_COLUMN = 'Transfer_Value_EUR_M'
+CURRENCY_COLUMN = 'Transfer_Value_Currency'
+
+CURRENCY_SYMBOLS = {'€': 'EUR', '£': 'GBP', '$': 'USD'}
+
+# Tỷ giá cố định quy đổi sang EUR (xấp xỉ, mùa giải 2024-25)
+EUR_RATES = {'EUR': 1.0, 'GBP': 1.18, 'USD': 0.92}
+
+# Hệ số đổi đơn vị sang triệu (không có đơn vị = số tiền nguyên, ví dụ '€500,000')
+UNIT_SCALE = {'bn': 1000.0, 'b': 1000.0, 'm': 1.0, 'k': 0.001, '': 1e-6}
+
+# Số tiền không có đơn vị chỉ được coi là số tiền nguyên khi có dấu phân cách hàng
+# nghìn hoặc từ mức này trở lên; '€1.2' hay '€1.2X' là giá trị không hợp lệ (NaN)
+MIN_RAW_AMOUNT = 1000
+
+# Biên dịch một lần; số tiền có dấu phẩy phân cách hàng nghìn ('500,000') được thử
+# trước, còn lại dấu phẩy là dấu thập phân ('1,5M')
+VALUE_PATTERN = re.compile(r'(?P<symbol>[€£$])\s*(?P<amount>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:[.,]\d+)?)'
+                           r'\s*(?P<unit>bn|[bmk])?', re.IGNORECASE)
+THOUSANDS_PATTERN = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?'
+
+
+def parse_values(values):
+    """
+    Parse a whole column of value strings in one vectorized pass
+
+    Args:
+        values: Series of scraped strings ('€18.6M', 'N/A', 'CAPTCHA', ...)
+
+    Returns:
+        DataFrame with NUMERIC_VALUE_COLUMN (float, million EUR, NaN when
+        unparseable) and CURRENCY_COLUMN (categorical currency code)
+    """
+    parts = values.astype(str).str.extract(VALUE_PATTERN)
+    currency = parts['symbol'].map(CURRENCY_SYMBOLS)
+    thousands = parts['amount'].str.fullmatch(THOUSANDS_PATTERN).fillna(False).astype(bool)
+    amount = parts['amount'].where(thousands, parts['amount'].str.replace(',', '.', regex=False))
+    amount = pd.to_numeric(amount.str.replace(',', '', regex=False), errors='coerce')
+    unit = parts['unit'].fillna('').str.lower()
+    unit_scale = unit.map(UNIT_SCALE).where((unit != '') | thousands | (amount >= MIN_RAW_AMOUNT))
+    rate = currency.map(EUR_RATES)
+
+    return pd.DataFrame({
+        NUMERIC_VALUE_COLUMN: (amount * unit_scale * rate).astype(float),
+        CURRENCY_COLUMN: currency.astype('category')
+    }, index=values.index)
+
+
+def add_value_columns(df, value_column=VALUE_COLUMN):
+    """
+    Add the numeric EUR and currency columns next to the raw value strings
+
+    Safe to call on data that was already parsed: existing numeric
+    columns are recomputed from the raw strings.
+    """
+    parsed = parse_values(df[value_column])
+    df = df.drop(columns=[NUMERIC_VALUE_COLUMN, CURRENCY_COLUMN], errors='ignore')
+    position = df.columns.get_loc(value_column) + 1
+    df.insert(position, NUMERIC_VALUE_COLUMN, parsed[NUMERIC_VALUE_COLUMN])
+    df.insert(position + 1, CURRENCY_COLUMN, parsed[CURRENCY_COLUMN])
+    return df
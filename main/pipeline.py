@@ -0,0 +1,297 @@
+"""
+Pipeline runner
+Knows the inputs and outputs of every stage script, fingerprints them
+(script and the sources of the local modules it imports, input file
+contents, arguments) and reruns only the stages whose fingerprint changed
+or whose outputs are missing. Stages whose inputs are ready run in parallel, e.g. aggregation,
+valuation and clustering after a crawl.
+
+Usage:
+    python pipeline.py                      # rebuild whatever is stale
+    python pipeline.py valuation clustering # only these stages (and what they need)
+    python pipeline.py --dry-run            # show what would run
+    python pipeline.py --force team_stats   # rerun a stage even if it is up to date
+    python pipeline.py --scrape             # also rerun the scrapers when stale
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_DIR = os.path.join(SCRIPT_DIR, ".pipeline")
+STATE_FILE = os.path.join(PIPELINE_DIR, "state.json")
+
+
+class Stage:
+    """
+    One step of the pipeline
+
+    Attributes:
+        name: Stage name used on the command line
+        script: Script run with the current interpreter (from SCRIPT_DIR)
+        inputs: Files read by the script (relative to SCRIPT_DIR)
+        outputs: Files written by the script
+        modules: Extra files whose source is part of the fingerprint; the local
+                 modules the script imports (directly or through other local
+                 modules) are found automatically, see local_modules()
+        args: Extra command-line arguments
+        network: Scraper stage; only run with --scrape or --force
+    """
+
+    def __init__(self, name, script, inputs=(), outputs=(), modules=(), args=(), network=False):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.modules = list(modules)
+        self.args = list(args)
+        self.network = network
+
+
+STAGES = [
+    Stage('crawl', 'problem_I.1.py', outputs=['results.csv'], network=True),
+    Stage('transfer_values', 'problem_I.2.py', inputs=['results.csv'], outputs=['transfer_values.csv'],
+          network=True),
+    Stage('team_stats', 'problem3_1_copy.py', inputs=['results.csv'],
+          outputs=['results2.csv', 'results2_distribution.csv']),
+    Stage('team_ranking', 'problem3_1_2_copy.py', inputs=['results2.csv']),
+    Stage('valuation', 'problem3_2.py', inputs=['results.csv'], outputs=['results3_2.csv']),
+    Stage('clustering', 'Problem_4.py', inputs=['results.csv'],
+          outputs=['cluster_model.npz', 'bieu_do_phan_cum_co_chu_thich.png']),
+    Stage('value_model', 'value_model.py', inputs=['results.csv', 'transfer_values.csv'],
+          outputs=['transfer_value_model.joblib', 'transfer_values_backfilled.csv']),
+    Stage('database', 'storage.py', args=['import'],
+          inputs=['results.csv', 'results2.csv', 'results2_distribution.csv', 'results3_2.csv',
+                  'transfer_values.csv'],
+          outputs=['football.db'])
+]
+
+
+def _path(name):
+    return os.path.join(SCRIPT_DIR, name)
+
+
+def dependencies(stages):
+    """{stage name: names of the stages producing its inputs}"""
+    producers = {output: stage.name for stage in stages for output in stage.outputs}
+    return {
+        stage.name: sorted({producers[f] for f in stage.inputs if f in producers and producers[f] != stage.name})
+        for stage in stages
+    }
+
+
+def _file_digest(digest, path, block_size=1 << 20):
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+
+
+def local_modules(script):
+    """
+    Helper modules of SCRIPT_DIR imported by a script, followed transitively
+
+    Returns:
+        list of file names (e.g. ['chunked.py', 'identity.py', 'team_stats.py'])
+    """
+    found = set()
+    pending = [script]
+    while pending:
+        with open(_path(pending.pop()), encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        names = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names += [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names.append(node.module)
+        for name in names:
+            filename = name.split('.')[0] + '.py'
+            if filename not in found and filename != script and os.path.exists(_path(filename)):
+                found.add(filename)
+                pending.append(filename)
+    return sorted(found)
+
+
+def fingerprint(stage):
+    """
+    SHA-256 of everything that determines a stage's outputs
+
+    Returns:
+        str, or None when an input file is missing
+    """
+    digest = hashlib.sha256(json.dumps(stage.args).encode())
+    if not os.path.exists(_path(stage.script)):
+        return None
+    modules = sorted(set(local_modules(stage.script)) | set(stage.modules))
+    for name in [stage.script] + modules + stage.inputs:
+        path = _path(name)
+        if not os.path.exists(path):
+            return None
+        digest.update(name.encode())
+        _file_digest(digest, path)
+    return digest.hexdigest()
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temporary, path)
+
+
+def run_stage(stage):
+    """
+    Run one stage script in SCRIPT_DIR, output captured to .pipeline/<stage>.log
+
+    Returns:
+        tuple: (return code, seconds)
+    """
+    os.makedirs(PIPELINE_DIR, exist_ok=True)
+    env = dict(os.environ, MPLBACKEND='Agg', PYTHONIOENCODING='utf-8')
+    start = time.perf_counter()
+    with open(os.path.join(PIPELINE_DIR, f"{stage.name}.log"), 'w', encoding='utf-8') as log:
+        result = subprocess.run([sys.executable, stage.script] + stage.args, cwd=SCRIPT_DIR,
+                                stdout=log, stderr=subprocess.STDOUT, env=env)
+    return result.returncode, time.perf_counter() - start
+
+
+def select(stages, targets=None):
+    """The target stages plus every stage they depend on (default: all)"""
+    if not targets:
+        return {stage.name for stage in stages}
+    known = {stage.name for stage in stages}
+    unknown = set(targets) - known
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {sorted(unknown)} (available: {sorted(known)})")
+
+    deps = dependencies(stages)
+    selected, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in selected:
+            selected.add(name)
+            todo.extend(deps[name])
+    return selected
+
+
+def run(stages=STAGES, targets=None, force=(), jobs=None, dry_run=False, scrape=False):
+    """
+    Bring the selected stages up to date
+
+    A stage is submitted as soon as all of its dependencies are finished, so
+    independent stages run side by side (up to `jobs` at a time). Its
+    fingerprint is taken at that moment, i.e. after upstream stages have
+    rewritten their outputs.
+
+    Args:
+        stages: Stage definitions
+        targets: Stage names to build (default: all)
+        force: Stage names to rerun even if up to date
+        jobs: Stages running at the same time (default: one per CPU)
+        dry_run: Only report what would run
+        scrape: Allow stale scraper stages to run
+
+    Returns:
+        dict: {stage name: 'fresh' | 'ran' | 'would run' | 'failed' | 'blocked' | 'skipped'}
+    """
+    by_name = {stage.name: stage for stage in stages}
+    selected = select(stages, targets)
+    deps = dependencies(stages)
+    state = load_state()
+    status = {}
+    pending = set(selected)
+    running = {}
+
+    def decide(stage):
+        upstream = [status[d] for d in deps[stage.name]]
+        if any(s in ('failed', 'blocked', 'skipped') for s in upstream):
+            return 'blocked'
+        outputs_present = all(os.path.exists(_path(f)) for f in stage.outputs)
+        if stage.network and not scrape and stage.name not in force:
+            return 'fresh' if outputs_present else 'skipped'
+        if dry_run and 'would run' in upstream:
+            return 'would run'
+        current = fingerprint(stage)
+        if current is None:
+            return 'blocked'
+        if (stage.name not in force and outputs_present
+                and state.get(stage.name, {}).get('fingerprint') == current):
+            return 'fresh'
+        return 'would run' if dry_run else current
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        while pending or running:
+            ready = sorted(name for name in pending if all(d in status for d in deps[name]))
+            for name in ready:
+                pending.remove(name)
+                decision = decide(by_name[name])
+                if decision in ('fresh', 'would run', 'blocked', 'skipped'):
+                    status[name] = decision
+                    print(f"  {name:<16} {decision}")
+                else:
+                    print(f"  {name:<16} running {by_name[name].script}")
+                    running[pool.submit(run_stage, by_name[name])] = (name, decision)
+            if ready and not running:
+                continue
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, current = running.pop(future)
+                code, seconds = future.result()
+                if code == 0:
+                    status[name] = 'ran'
+                    state[name] = {'fingerprint': current, 'seconds': round(seconds, 2),
+                                   'finished': datetime.now().isoformat(timespec='seconds')}
+                    save_state(state)
+                    print(f"  {name:<16} done in {seconds:.1f}s")
+                else:
+                    status[name] = 'failed'
+                    print(f"  {name:<16} FAILED (exit {code}, see {os.path.join(PIPELINE_DIR, name + '.log')})")
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the stale stages of the analysis pipeline')
+    parser.add_argument('targets', nargs='*', help=f"Stages to build (default: all): "
+                                                   f"{', '.join(stage.name for stage in STAGES)}")
+    parser.add_argument('--force', nargs='+', default=[], metavar='STAGE',
+                        help='Rerun these stages even if they are up to date')
+    parser.add_argument('--jobs', type=int, default=None, help='Stages run in parallel')
+    parser.add_argument('--dry-run', action='store_true', help='Only show what would run')
+    parser.add_argument('--scrape', action='store_true',
+                        help='Allow the scraper stages (crawl, transfer_values) to run when stale')
+    args = parser.parse_args()
+
+    try:
+        status = run(targets=args.targets, force=set(args.force), jobs=args.jobs,
+                     dry_run=args.dry_run, scrape=args.scrape)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+
+    if 'skipped' in status.values():
+        print("Scraper outputs are missing; run with --scrape to create them")
+    if any(s in ('failed', 'blocked') for s in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,9 @@
 import pandas as pd
 import numpy as np
 import os
-
-# Đọc dữ liệu với xử lý lỗi
-try:
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    input_path = os.path.join(script_dir, "results2.csv")
-
-    if not os.path.exists(input_path):
-        raise FileNotFoundError(f"Input file not found: {input_path}")
-
-    df = pd.read_csv(input_path)
-    print(f"Successfully loaded data from {input_path}")
-except FileNotFoundError as e:
-    print(f"Error: {e}")
-    exit(1)
-except pd.errors.EmptyDataError:
-    print("Error: The CSV file is empty")
-    exit(1)
-except pd.errors.ParserError:
-    print("Error: Failed to parse the CSV file")
-    exit(1)
-except Exception as e:
-    print(f"Unexpected error while reading file: {e}")
-    exit(1)
+import argparse
+from team_stats import load_team_stats
+from team_ranking import rank_teams
 
 # Danh sách các chỉ số để đánh giá
 chi_so_quan_trong = [
@@ -37,48 +17,92 @@ chi_so_quan_trong = [
     'Median of Goalkeeping_Save%', 'Mean of Goalkeeping_Save%'
 ]
 
-# Tìm đội dẫn đầu cho từng chỉ số và lưu giá trị thống kê
-doi_dan_dau = {}
-gia_tri_cao_nhat = {}
-for chi_so in chi_so_quan_trong:
-    max_index = df[chi_so].idxmax()
-    doi_tot_nhat = df.loc[max_index, 'Team']
-    gia_tri = df.loc[max_index, chi_so]
-    doi_dan_dau[chi_so] = doi_tot_nhat
-    gia_tri_cao_nhat[chi_so] = gia_tri
-
-# Đếm số lần mỗi đội dẫn đầu và lưu các chỉ số cụ thể
-diem_so_doi = {}
-chi_so_cua_doi = {}
-for chi_so, doi in doi_dan_dau.items():
-    if doi in diem_so_doi:
-        diem_so_doi[doi] += 1
-        chi_so_cua_doi[doi].append(chi_so)
-    else:
-        diem_so_doi[doi] = 1
-        chi_so_cua_doi[doi] = [chi_so]
-
-# Sắp xếp các đội theo điểm số
-doi_xep_hang = sorted(diem_so_doi.items(), key=lambda x: x[1], reverse=True)
-
-# Hiển thị kết quả chi tiết với giá trị thống kê
-print(f"\n{'='*60}")
-print("ĐỘI DẪN ĐẦU TỪNG CHỈ SỐ VÀ GIÁ TRỊ CỤ THỂ")
-print(f"{'='*60}")
-for chi_so, doi in doi_dan_dau.items():
-    gia_tri = gia_tri_cao_nhat[chi_so]
-    print(f"{chi_so}:")
-    print(f"  Đội dẫn đầu: {doi}")
-    print(f"  Giá trị: {gia_tri:.1f}")
-    print()
-
-print(f"\n{'='*60}")
-print("BẢNG XẾP HẠNG ĐỘI DẪN ĐẦU THEO CHỈ SỐ")
-print(f"{'='*60}")
-for i, (doi, diem) in enumerate(doi_xep_hang, 1):
-    print(f"{i}. {doi}: {diem} chỉ số")
-    print(f"   Các chỉ số dẫn đầu:")
-    for chi_so in chi_so_cua_doi[doi]:
-        gia_tri = gia_tri_cao_nhat[chi_so]
-        print(f"   - {chi_so}: {gia_tri:.1f}")
-    print()
\ No newline at end of file
+
+def rank(stats, all_metrics=False):
+    """
+    Rank the teams of a team statistics table (results2.csv layout), in memory
+
+    Args:
+        stats: Team statistics DataFrame (rows of individual teams)
+        all_metrics: Rank every statistic column instead of chi_so_quan_trong
+
+    Returns:
+        TeamRanking
+    """
+    # Xếp hạng tất cả các đội trên mọi chỉ số bằng một phép sắp xếp ma trận
+    return rank_teams(stats, columns=None if all_metrics else chi_so_quan_trong)
+
+
+def print_report(ranking, top_k=1):
+    """Print the leader of every metric and the table of leading teams"""
+    bang_dan_dau = ranking.leaders()
+    top_doi = ranking.top_k(top_k)
+
+    # Số chỉ số mỗi đội dẫn đầu (suy ra từ ma trận thứ hạng)
+    doi_xep_hang = ranking.leader_counts()
+    chi_so_cua_doi = bang_dan_dau.groupby('Team', sort=False)['Metric'].apply(list)
+    gia_tri_cao_nhat = dict(zip(bang_dan_dau['Metric'], bang_dan_dau['Value']))
+
+    # Hiển thị kết quả chi tiết với giá trị thống kê
+    print(f"\n{'='*60}")
+    print("ĐỘI DẪN ĐẦU TỪNG CHỈ SỐ VÀ GIÁ TRỊ CỤ THỂ")
+    print(f"{'='*60}")
+    for chi_so, doi, gia_tri in bang_dan_dau.itertuples(index=False):
+        print(f"{chi_so}:")
+        print(f"  Đội dẫn đầu: {doi}")
+        print(f"  Giá trị: {gia_tri:.1f}")
+        if top_k > 1:
+            top = ", ".join(f"{ten} ({gt:.1f})" for ten, gt in top_doi[chi_so])
+            print(f"  Top {top_k}: {top}")
+        print()
+
+    print(f"\n{'='*60}")
+    print("BẢNG XẾP HẠNG ĐỘI DẪN ĐẦU THEO CHỈ SỐ")
+    print(f"{'='*60}")
+    for i, (doi, diem) in enumerate(doi_xep_hang.items(), 1):
+        print(f"{i}. {doi}: {diem} chỉ số")
+        print(f"   Các chỉ số dẫn đầu:")
+        for chi_so in chi_so_cua_doi[doi]:
+            gia_tri = gia_tri_cao_nhat[chi_so]
+            print(f"   - {chi_so}: {gia_tri:.1f}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tìm đội dẫn đầu các chỉ số trong results2.csv')
+    parser.add_argument('--all-metrics', action='store_true',
+                        help='Rank every statistic column instead of the key metrics only')
+    parser.add_argument('--top-k', type=int, default=1,
+                        help='Also show the best k teams of every metric')
+    args = parser.parse_args()
+
+    # Đọc dữ liệu với xử lý lỗi
+    try:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        input_path = os.path.join(script_dir, "results2.csv")
+
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        # Chỉ đọc các cột cần thiết, giữ kiểu số và bỏ dòng "all" của toàn giải
+        df = load_team_stats(input_path, columns=None if args.all_metrics else chi_so_quan_trong,
+                             scope="team")
+        print(f"Successfully loaded data from {input_path}")
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        exit(1)
+    except pd.errors.EmptyDataError:
+        print("Error: The CSV file is empty")
+        exit(1)
+    except pd.errors.ParserError:
+        print("Error: Failed to parse the CSV file")
+        exit(1)
+    except Exception as e:
+        print(f"Unexpected error while reading file: {e}")
+        exit(1)
+
+    print_report(rank(df, args.all_metrics), args.top_k)
+
+
+if __name__ == "__main__":
+    main()
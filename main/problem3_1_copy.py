@@ -1,52 +1,111 @@
 import pandas as pd
 import numpy as np
 import os
+import argparse
+from incremental_stats import TeamStatsState
+from team_stats import numeric_columns, compute_team_stats, compute_distribution_stats, save_team_stats
+from chunked import aggregate_file
 
-# Đọc dữ liệu với xử lý lỗi
-try:
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    input_path = os.path.join(script_dir, "results.csv")
-
-    if not os.path.exists(input_path):
-        raise FileNotFoundError(f"Input file not found: {input_path}")
-
-    data = pd.read_csv(input_path)
-    print(f"Successfully loaded data from {input_path}")
-except FileNotFoundError as e:
-    print(f"Error: {e}")
-    exit(1)
-except pd.errors.EmptyDataError:
-    print("Error: The CSV file is empty")
-    exit(1)
-except pd.errors.ParserError:
-    print("Error: Failed to parse the CSV file")
-    exit(1)
-except Exception as e:
-    print(f"Unexpected error while reading file: {e}")
-    exit(1)
-
-# Chọn các cột chỉ chứa dữ liệu số (các cột chỉ số cần phải tính)
-number_attributes = data.select_dtypes(include=[float, int]).columns
-
-# Khởi tạo từ điển kết quả với cột "Team"
-results = {"Team": ["all"]}
-
-# Tính trung vị, trung bình và độ lệch chuẩn cho từng chỉ số cho cả giải đấu
-for x in number_attributes:
-    results[f"Median of {x}"] = [f"{data[x].median(skipna=True):.2f}"]
-    results[f"Mean of {x}"] = [f"{data[x].mean(skipna=True):.2f}"]
-    results[f"Std of {x}"] = [f"{data[x].std(skipna=True):.2f}"]
-
-# Nhóm dữ liệu theo từng đội bóng và tính trung vị, trung bình, độ lệch chuẩn cho từng đội
-for team, group in data.groupby('Team'):
-    results["Team"].append(team)
-    for x in number_attributes:
-        results[f"Median of {x}"].append(f"{group[x].median(skipna=True):.2f}")
-        results[f"Mean of {x}"].append(f"{group[x].mean(skipna=True):.2f}")
-        results[f"Std of {x}"].append(f"{group[x].std(skipna=True):.2f}")
-
-# Chuyển kết quả thành DataFrame
-results_df = pd.DataFrame(results)
-
-# Lưu kết quả vào file 'results2.csv'
-results_df.to_csv("results2.csv", index=False)
\ No newline at end of file
+# File lưu trạng thái tổng hợp (count, mean, M2, tổng có trọng số, giá trị đã sắp xếp)
+STATE_FILE = "results2_state.pkl"
+
+
+def aggregate(data, state=None, incremental=False):
+    """
+    Team statistics of a player table (results.csv layout), in memory
+
+    Args:
+        data: Player DataFrame
+        state: TeamStatsState of a previous run; only the teams whose players
+               changed are recomputed when its columns still match
+        incremental: Return a TeamStatsState for the next incremental run
+
+    Returns:
+        tuple: (team stats DataFrame, distribution stats DataFrame,
+                TeamStatsState or None)
+    """
+    # Chọn các cột chỉ chứa dữ liệu số (các cột chỉ số cần phải tính)
+    number_attributes = numeric_columns(data)
+
+    if state is not None and state.columns != number_attributes:
+        print("Columns changed since the last run, rebuilding all teams")
+        state = None
+    elif state is not None and getattr(state, 'version', 1) != TeamStatsState.VERSION:
+        print("State saved by an older version, rebuilding all teams")
+        state = None
+
+    # Tính trung vị, trung bình và độ lệch chuẩn cho cả giải đấu và từng đội
+    # trong một lần groupby duy nhất (kết quả giữ kiểu số)
+    if state is not None:
+        # Chỉ cập nhật các đội có cầu thủ thay đổi
+        changed_teams = state.apply_changes(data)
+        print(f"Incremental update: {len(changed_teams)} team(s) changed {sorted(changed_teams)}")
+        results_df = state.to_frame()
+        # Phân vị / trung bình có trọng số / per-90 cũng lấy từ trạng thái
+        distribution_df = state.distribution_frame()
+    else:
+        results_df = compute_team_stats(data, number_attributes)
+        if incremental:
+            state = TeamStatsState.from_frame(data, number_attributes)
+
+        # Phân vị, trung bình có trọng số theo số phút và chỉ số per-90
+        # (một lần sắp xếp cho mỗi cột)
+        distribution_df = compute_distribution_stats(data, number_attributes)
+    return results_df, distribution_df, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tính thống kê theo đội từ results.csv')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only update the teams whose players changed since the last run')
+    parser.add_argument('--chunksize', type=int,
+                        help='Read results.csv in batches of this many rows with compact dtypes (bounded memory)')
+    args = parser.parse_args()
+    if args.chunksize and args.incremental:
+        parser.error('--chunksize cannot be combined with --incremental')
+
+    # Đọc dữ liệu với xử lý lỗi
+    try:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        input_path = os.path.join(script_dir, "results.csv")
+
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        # Chế độ chunk: đọc từng phần, kết hợp kết quả từng phần thay vì nạp cả file
+        if args.chunksize:
+            results_df, distribution_df = aggregate_file(input_path, args.chunksize)
+        else:
+            data = pd.read_csv(input_path)
+            print(f"Successfully loaded data from {input_path}")
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        exit(1)
+    except pd.errors.EmptyDataError:
+        print("Error: The CSV file is empty")
+        exit(1)
+    except pd.errors.ParserError:
+        print("Error: Failed to parse the CSV file")
+        exit(1)
+    except Exception as e:
+        print(f"Unexpected error while reading file: {e}")
+        exit(1)
+
+    if not args.chunksize:
+        state = None
+        if args.incremental and os.path.exists(STATE_FILE):
+            state = TeamStatsState.load(STATE_FILE)
+
+        results_df, distribution_df, state = aggregate(data, state, incremental=args.incremental)
+
+        if args.incremental:
+            state.save(STATE_FILE)
+
+    # Lưu kết quả vào file 'results2.csv' (giữ nguyên dạng số, kèm bản .parquet)
+    save_team_stats(results_df, "results2.csv")
+    # Lưu phân vị / trung bình có trọng số / per-90 vào 'results2_distribution.csv'
+    save_team_stats(distribution_df, "results2_distribution.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,179 @@
 import pandas as pd
 import numpy as np
 import os
+import json
+import argparse
+from valuation import (load_config, build_features, score_variants,
+                       estimate_transfer_values, format_transfer_values)
+from features import load_features
+from chunked import read_chunks, read_sample, CATEGORY_COLUMNS
 
-# Đọc dữ liệu với xử lý lỗi
-try:
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    input_path = os.path.join(script_dir, "results.csv")
-
-    if not os.path.exists(input_path):
-        raise FileNotFoundError(f"Input file not found: {input_path}")
-
-    df = pd.read_csv(input_path)
-    print(f"Successfully loaded data from {input_path}")
-except FileNotFoundError as e:
-    print(f"Error: {e}")
-    exit(1)
-except pd.errors.EmptyDataError:
-    print("Error: The CSV file is empty")
-    exit(1)
-except pd.errors.ParserError:
-    print("Error: Failed to parse the CSV file")
-    exit(1)
-except Exception as e:
-    print(f"Unexpected error while reading file: {e}")
-    exit(1)
-
-df.fillna({
-    'Standard_Gls': 0,
-    'Standard_Ast': 0,
-    'Standard_xG': 0,
-    'Standard_xAG': 0,
-    'Passing_Cmp': 0,
-    'Defense_Tkl': 0,
-    'Possession_Touches': 0,
-    'Standard_Min': 0,
-    'Standard_MP': 0,
-    'Standard_Starts': 0,
-    'Standard_90s': 0,
-    'Shooting_SoT%': 'N/A',
-    'Shooting_SoT': 'N/A',
-    'Passing_Att': 'N/A',
-    'Passing_Cmp%': 'N/A',
-    'Defense_Int': 'N/A',
-    'Defense_Blocks': 'N/A',
-    'Possession_Prog': 'N/A',
-    'Playing_Time_90s': 'N/A'
-}, inplace=True)
-
-for column in df.columns:
-    if df[column].isna().any():
-        if column not in ['Standard_Gls', 'Standard_Ast', 'Standard_xG', 'Standard_xAG',
-                          'Passing_Cmp', 'Defense_Tkl', 'Possession_Touches',
-                          'Standard_Min', 'Standard_MP', 'Standard_Starts', 'Standard_90s']:
-            df[column].fillna('N/A', inplace=True)
-
-# Hàm ước tính giá trị chuyển nhượng
-def estimate_transfer_value(row):
-    base_value = 0
-
-    # Giá trị cơ bản theo vị trí
-    if "FW" in row['Pos']:
-        base_value = 15
-    elif "MF" in row['Pos']:
-        base_value = 10
-    elif 'DF' in row['Pos']:
-        base_value = 8
-    elif 'GK' in row['Pos']:
-        base_value = 5
-    else:
-        base_value = 5
-
-    age_factor = max(0.5, 1.5 - (row['Age'] - 20) * 0.03)
-
-    performance_factor = 1 + (
-        row['Standard_Gls'] * 0.2 +
-        row['Standard_Ast'] * 0.15 +
-        row['Standard_xG'] * 0.1 +
-        row['Standard_xAG'] * 0.1
-    ) / 10
-
-    return base_value * age_factor * performance_factor
-
-
-df['Transfer_Value'] = df.apply(estimate_transfer_value, axis=1)
-
-# Định dạng giá trị chuyển nhượng
-df['Transfer_Value_Str'] = df['Transfer_Value'].apply(lambda x: f"EUR {x:.1f}M")
-
-print(df[['Player', 'Team', 'Pos', 'Age', 'Standard_Gls', 'Standard_Ast', 'Transfer_Value']]
-      .sort_values('Transfer_Value', ascending=False)
-      .head(20))
-
-#Lưu File:
-columns_to_save = ['Player', 'Team', 'Pos', 'Age', 'Standard_Gls', 'Standard_Ast', 'Standard_xG', 'Standard_xAG', 'Transfer_Value', 'Transfer_Value_Str']
-df[columns_to_save].to_csv("results3_2.csv", index=False)
\ No newline at end of file
+# Các cột được ghi vào results3_2.csv
+COLUMNS_TO_SAVE = ['Player', 'Team', 'Pos', 'Age', 'Standard_Gls', 'Standard_Ast', 'Standard_xG', 'Standard_xAG',
+                   'Transfer_Value']
+
+
+def value_players(df, config=None, matrix=None):
+    """
+    Estimated transfer value of every player, in memory
+
+    Args:
+        df: Player DataFrame (results.csv layout)
+        config: Valuation config (default: DEFAULT_CONFIG)
+        matrix: Optional prepared FeatureMatrix of df (features.py)
+
+    Returns:
+        DataFrame with COLUMNS_TO_SAVE plus the formatted Transfer_Value_Str;
+        missing stats are shown as 0
+    """
+    output_df = df[COLUMNS_TO_SAVE[:-1]].copy()
+    output_df['Transfer_Value'] = estimate_transfer_values(df, config, matrix=matrix)
+    output_df = output_df.fillna({'Player': 'N/A', 'Team': 'N/A', 'Pos': 'N/A', 'Standard_Gls': 0,
+                                  'Standard_Ast': 0, 'Standard_xG': 0, 'Standard_xAG': 0})
+    # Chỉ định dạng chuỗi giá trị ở bước cuối
+    output_df['Transfer_Value_Str'] = format_transfer_values(output_df['Transfer_Value'])
+    return output_df
+
+
+def sweep_variants(df, variants, config_path=None, matrix=None):
+    """
+    Sensitivity analysis: score several weight variants over the same features
+
+    Args:
+        df: Player DataFrame
+        variants: List of config overrides, each with an optional 'name'
+        config_path: JSON config the variants are applied on top of
+        matrix: Optional prepared FeatureMatrix of df
+
+    Returns:
+        DataFrame: Player, Team, Pos, Age and one value column per variant
+    """
+    variants = [dict(variant) for variant in variants]
+    names = [variant.pop('name', f"Variant_{i + 1}") for i, variant in enumerate(variants)]
+    configs = [load_config(config_path, variant) for variant in variants]
+
+    sweep_values = score_variants(build_features(df, configs, matrix), configs)
+    return pd.concat([df[['Player', 'Team', 'Pos', 'Age']],
+                      pd.DataFrame(sweep_values, columns=names, index=df.index)], axis=1)
+
+
+def value_file(input_path, output_path, config=None, chunksize=100_000, top=20,
+               variants=None, config_path=None, sweep_path=None):
+    """
+    Estimate transfer values of a large file one batch at a time
+
+    The valuation of a player only depends on their own row, so each batch is
+    scored and appended to output_path (and to sweep_path when variants are
+    given); only the current batch and the running top players are in memory.
+
+    Args:
+        input_path: CSV in results.csv layout
+        output_path: CSV written in the results3_2.csv layout
+        config: Valuation config (default: DEFAULT_CONFIG)
+        chunksize: Rows per batch
+        top: Number of most valuable players kept for the summary
+        variants: Weight variants to score into sweep_path (see sweep_variants())
+        config_path: JSON config the variants are applied on top of
+        sweep_path: CSV written in the results3_2_sweep.csv layout
+
+    Returns:
+        tuple: (number of players, DataFrame of the top most valuable players)
+    """
+    sample = read_sample(input_path)
+    # Các cột đếm (số nguyên trong file) được ghi lại dạng số nguyên thay vì float32
+    integer_columns = [c for c in COLUMNS_TO_SAVE
+                       if c in sample.columns and pd.api.types.is_integer_dtype(sample[c])]
+
+    rows = 0
+    best = None
+    for chunk in read_chunks(input_path, chunksize, sample=sample):
+        # Cột category được đổi lại thành chuỗi để điền 'N/A' như khi đọc toàn bộ file
+        categories = [c for c in CATEGORY_COLUMNS if c in chunk.columns]
+        chunk[categories] = chunk[categories].astype(object)
+
+        output_df = value_players(chunk, config)
+        output_df[integer_columns] = output_df[integer_columns].round().astype('Int64')
+        output_df.to_csv(output_path, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+        if variants:
+            sweep_variants(chunk, variants, config_path).to_csv(
+                sweep_path, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+
+        # Giữ top cầu thủ đắt giá nhất qua các batch (thứ tự ổn định theo dòng)
+        best = pd.concat([best, output_df]) if best is not None else output_df
+        best = best.sort_values('Transfer_Value', ascending=False, kind='stable').head(top)
+        rows += len(chunk)
+    return rows, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ước tính giá trị chuyển nhượng cầu thủ')
+    parser.add_argument('--config', help='JSON file overriding the default valuation weights')
+    parser.add_argument('--sweep', help='JSON list of weight variants to score into results3_2_sweep.csv')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Rebuild the prepared feature matrix instead of loading it from the cache')
+    parser.add_argument('--chunksize', type=int,
+                        help='Read results.csv in batches of this many rows with compact dtypes (bounded memory)')
+    args = parser.parse_args()
+
+    variants = None
+    if args.sweep:
+        with open(args.sweep, encoding='utf-8') as f:
+            variants = json.load(f)
+
+    # Đọc dữ liệu với xử lý lỗi
+    try:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        input_path = os.path.join(script_dir, "results.csv")
+
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        # Chế độ chunk: chấm điểm và ghi nối tiếp từng batch, không nạp cả file
+        if args.chunksize:
+            rows, top_df = value_file(input_path, "results3_2.csv", load_config(args.config), args.chunksize,
+                                      variants=variants, config_path=args.config,
+                                      sweep_path="results3_2_sweep.csv")
+            print(top_df[['Player', 'Team', 'Pos', 'Age', 'Standard_Gls', 'Standard_Ast', 'Transfer_Value']])
+            print(f"Valued {rows} players in chunks of {args.chunksize}")
+            if variants:
+                print(f"Scored {len(variants)} valuation variants into results3_2_sweep.csv")
+            return
+
+        df = pd.read_csv(input_path)
+        print(f"Successfully loaded data from {input_path}")
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        exit(1)
+    except pd.errors.EmptyDataError:
+        print("Error: The CSV file is empty")
+        exit(1)
+    except pd.errors.ParserError:
+        print("Error: Failed to parse the CSV file")
+        exit(1)
+    except Exception as e:
+        print(f"Unexpected error while reading file: {e}")
+        exit(1)
+
+    # Đặc trưng số dùng chung (ép kiểu một lần, lấy từ cache nếu dữ liệu không đổi);
+    # giá trị thiếu của các chỉ số được tính là 0 khi ước tính
+    features = load_features(input_path, df, use_cache=not args.no_cache)
+
+    # Ước tính giá trị chuyển nhượng cho toàn bộ cầu thủ bằng phép tính mảng
+    output_df = value_players(df, load_config(args.config), features)
+
+    print(output_df[['Player', 'Team', 'Pos', 'Age', 'Standard_Gls', 'Standard_Ast', 'Transfer_Value']]
+          .sort_values('Transfer_Value', ascending=False)
+          .head(20))
+
+    # Lưu File
+    output_df.to_csv("results3_2.csv", index=False)
+
+    # Phân tích độ nhạy: chấm điểm nhiều bộ trọng số trên cùng một ma trận đặc trưng
+    if variants:
+        sweep_df = sweep_variants(df, variants, args.config, features)
+        sweep_df.to_csv("results3_2_sweep.csv", index=False)
+        print(f"Scored {len(variants)} valuation variants into results3_2_sweep.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,25 +11,34 @@ from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 import pandas as pd
 import re
+from identity import ID_COLUMN, extract_player_id
+from scrape_profile import ScrapeReport, PROFILERS, timed, count, looks_like_captcha, profiled
+import argparse
 import time
 import os
 
 #
 # 1. ChromeDriver Configuration
 #
-# Using webdriver-manager to automatically download and manage ChromeDriver
-try:
-    # Automatically download and manage the correct ChromeDriver version
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service)
-    print("ChromeDriver initialized successfully using webdriver-manager")
-except WebDriverException as e:
-    print(f"Failed to initialize ChromeDriver: {str(e)}")
-    print("Please ensure Google Chrome is installed on your system")
-    exit(1)
-except Exception as e:
-    print(f"Unexpected error initializing ChromeDriver: {str(e)}")
-    exit(1)
+def create_driver():
+    """
+    Start Chrome, using webdriver-manager to download and manage the correct
+    ChromeDriver version
+
+    Returns:
+        WebDriver, or None if Chrome could not be started
+    """
+    try:
+        service = Service(ChromeDriverManager().install())
+        driver = webdriver.Chrome(service=service)
+        print("ChromeDriver initialized successfully using webdriver-manager")
+        return driver
+    except WebDriverException as e:
+        print(f"Failed to initialize ChromeDriver: {str(e)}")
+        print("Please ensure Google Chrome is installed on your system")
+    except Exception as e:
+        print(f"Unexpected error initializing ChromeDriver: {str(e)}")
+    return None
 
 #
 # 2. URLs for different statistical categories
@@ -141,11 +150,17 @@ COLUMN_MAP = {
 #
 # 4. Helper functions to get HTML and parse values
 #
-def get_html(url):
-    """Navigates to a URL and returns the page source after the stats table has loaded."""
-    driver.get(url)
-    WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'table.stats_table')))
-    time.sleep(3)  # Additional wait to ensure all dynamic content is loaded
+def get_html(driver, url, record=None):
+    """
+    Navigates to a URL and returns the page source after the stats table has loaded.
+    Navigation and waiting times are added to record (scrape_profile) when given.
+    """
+    with timed(record, 'fetch'):
+        driver.get(url)
+    with timed(record, 'wait'):
+        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, 'table.stats_table')))
+    with timed(record, 'throttle'):
+        time.sleep(3)  # Additional wait to ensure all dynamic content is loaded
     return driver.page_source
 
 def parse_value(raw_value, dtype):
@@ -168,122 +183,202 @@ def parse_value(raw_value, dtype):
         return 'N/A'
 
 #
-# 5. Main data crawling loop - IMPROVED
+# 5. Table parsing and crawling loop - IMPROVED
 #
-players_data = {}
-debug_info = {stat_type: {'found_players': 0, 'missing_stats': 0} for stat_type in STATS_URLS.keys()}
+def parse_stats_table(html, stat_type, players_data, debug_info=None):
+    """
+    Parse one fbref stats page into players_data
+
+    Args:
+        html: Page source
+        stat_type: Key of STATS_URLS (selects the table id)
+        players_data: {(fbref player ID or name, team): {column: value}} dict
+                      updated in place; a player who moved mid-season has one
+                      entry per team, and namesakes no longer overwrite each other
+        debug_info: Optional {stat_type: counters} dict updated in place
+
+    Returns:
+        bool: True if a stats table was found and parsed
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    if debug_info is None:
+        debug_info = {}
+    counters = debug_info.setdefault(stat_type, {'found_players': 0, 'missing_stats': 0})
+
+    # Try to find the table with standard ID pattern
+    table_id = f'stats_{stat_type}'
+    table = soup.find("table", id=table_id)
+    if not table:
+        print(f"  Warning: Table with id '{table_id}' not found")
+        # Try alternative table finding method
+        table = soup.find("table", {"class": "stats_table"})
+
+    if not table:
+        print(f"  Error: No stats table found for {stat_type}")
+        return False
+
+    tbody = table.find('tbody')
+    if not tbody:
+        print(f"  Warning: No tbody found in {stat_type} table")
+        return False
+
+    for row in tbody.find_all('tr'):
+        player_cell = row.find("th", {'data-stat': 'player'}) or row.find("td", {'data-stat': 'player'})
+        if not player_cell:
+            continue
 
-for stat_type, url in STATS_URLS.items():
-    print(f"Crawling: {stat_type}...")
-    try:
-        html = get_html(url)
-        soup = BeautifulSoup(html, 'html.parser')
-
-        # Try to find the table with standard ID pattern
-        table_id = f'stats_{stat_type}'
-        table = soup.find("table", id=table_id)
-        if not table:
-            print(f"  Warning: Table with id '{table_id}' not found")
-            # Try alternative table finding method
-            table = soup.find("table", {"class": "stats_table"})
-
-        if not table:
-            print(f"  Error: No stats table found for {stat_type}")
+        player_name = player_cell.text.strip()
+        player_id = extract_player_id(player_cell)
+        team_cell = row.find("td", {'data-stat': 'team'})
+        key = (player_id or player_name, team_cell.text.strip() if team_cell else '')
+        counters['found_players'] += 1
+
+        if key not in players_data:
+            players_data[key] = {col: 'N/A' for col, _ in COLUMN_MAP.values()}
+            players_data[key]['Player'] = player_name
+            players_data[key][ID_COLUMN] = player_id or 'N/A'
+
+        stats_found_in_row = 0
+        for cell in row.find_all(['th', 'td']):
+            stat = cell.get('data-stat')
+            if stat in COLUMN_MAP:
+                col_name, dtype = COLUMN_MAP[stat]
+                raw_value = cell.text.strip()
+
+                # Special handling for specific columns
+                if stat == 'age' and '-' in raw_value:
+                    raw_value = raw_value.split('-')[0]
+                if stat == 'nationality':
+                    match = re.search(r'(\w+)\s+([A-Z]{3})', raw_value)
+                    if match:
+                        raw_value = f"{match.group(2)}" # Only keep the 3-letter code
+
+                parsed_value = parse_value(raw_value, dtype)
+                players_data[key][col_name] = parsed_value
+                stats_found_in_row += 1
+
+        if stats_found_in_row == 0:
+            counters['missing_stats'] += 1
+
+    return True
+
+
+def crawl(driver, urls=STATS_URLS, report=None):
+    """
+    Crawl every stats page
+
+    Args:
+        driver: WebDriver
+        urls: {stat_type: url}
+        report: Optional ScrapeReport receiving one timing record per page
+
+    Returns:
+        tuple: (players_data, debug_info)
+    """
+    players_data = {}
+    debug_info = {stat_type: {'found_players': 0, 'missing_stats': 0} for stat_type in urls.keys()}
+
+    for stat_type, url in urls.items():
+        print(f"Crawling: {stat_type}...")
+        record = report.record(stat_type, url=url) if report is not None else None
+        try:
+            html = get_html(driver, url, record)
+            with timed(record, 'parse'):
+                parsed = parse_stats_table(html, stat_type, players_data, debug_info)
+            if parsed:
+                print(f"  Processed data from {stat_type} table")
+            elif looks_like_captcha(html):
+                count(record, 'captcha')
+            if record is not None:
+                record.update(status='ok' if parsed else 'no_table', **debug_info[stat_type])
+        except Exception as e:
+            print(f"Error crawling {stat_type}: {str(e)}")
+            if record is not None:
+                record.update(status='error', error=str(e)[:200])
             continue
 
-        tbody = table.find('tbody')
-        if not tbody:
-            print(f"  Warning: No tbody found in {stat_type} table")
+    return players_data, debug_info
+
+
+#
+# 6. Filter and format the data - IMPROVED
+#
+def build_results(players_data, min_minutes=90):
+    """
+    Players with more than min_minutes played, as a results.csv table
+    (COLUMN_MAP columns followed by the fbref Player_ID)
+
+    Returns:
+        tuple: (DataFrame sorted by player name, number of excluded players)
+    """
+    filtered_data = []
+    players_with_insufficient_data = 0
+
+    columns = [col for col, _ in COLUMN_MAP.values()] + [ID_COLUMN]
+    for player_data in players_data.values():
+        try:
+            # Filter for players with more than 90 minutes
+            minutes_played = player_data.get('Standard_Min', 0)
+            if minutes_played != 'N/A' and int(minutes_played) > min_minutes:
+                ordered_row = [player_data.get(col, 'N/A') for col in columns]
+                filtered_data.append(ordered_row)
+            else:
+                players_with_insufficient_data += 1
+        except (ValueError, TypeError):
+            players_with_insufficient_data += 1
             continue
 
-        rows_processed = 0
-        for row in tbody.find_all('tr'):
-            player_cell = row.find("th", {'data-stat': 'player'}) or row.find("td", {'data-stat': 'player'})
-            if not player_cell:
-                continue
+    df = pd.DataFrame(filtered_data, columns=columns)
+    df.fillna('N/A', inplace=True)
 
-            player_name = player_cell.text.strip()
-            debug_info[stat_type]['found_players'] += 1
+    # Sort players alphabetically by first name
+    df.sort_values(by='Player', inplace=True)
+    return df, players_with_insufficient_data
 
-            if player_name not in players_data:
-                players_data[player_name] = {col: 'N/A' for col, _ in COLUMN_MAP.values()}
-                players_data[player_name]['Player'] = player_name
 
-            stats_found_in_row = 0
-            for cell in row.find_all(['th', 'td']):
-                stat = cell.get('data-stat')
-                if stat in COLUMN_MAP:
-                    col_name, dtype = COLUMN_MAP[stat]
-                    raw_value = cell.text.strip()
+#
+# 7. Command-line entry point: crawl and save results.csv
+#
+def main():
+    parser = argparse.ArgumentParser(description='Crawl Premier League player statistics from fbref into results.csv')
+    parser.add_argument('--report', help='Timing report JSON (default: .scrape_reports/problem_I.1-<time>.json)')
+    parser.add_argument('--profile', choices=PROFILERS, help='Also profile the whole crawl')
+    args = parser.parse_args()
 
-                    # Special handling for specific columns
-                    if stat == 'age' and '-' in raw_value:
-                        raw_value = raw_value.split('-')[0]
-                    if stat == 'nationality':
-                        match = re.search(r'(\w+)\s+([A-Z]{3})', raw_value)
-                        if match:
-                            raw_value = f"{match.group(2)}" # Only keep the 3-letter code
+    driver = create_driver()
+    if driver is None:
+        exit(1)
 
-                    parsed_value = parse_value(raw_value, dtype)
-                    players_data[player_name][col_name] = parsed_value
-                    stats_found_in_row += 1
+    report = ScrapeReport('problem_I.1')
+    try:
+        with profiled(args.profile, report.default_path()):
+            players_data, debug_info = crawl(driver, report=report)
+    finally:
+        driver.quit()
 
-            if stats_found_in_row == 0:
-                debug_info[stat_type]['missing_stats'] += 1
+    df, players_with_insufficient_data = build_results(players_data)
 
-        print(f"  Processed data from {stat_type} table")
+    # Get the directory where the script is located
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    output_file = os.path.join(script_dir, "results.csv")
+    df.to_csv(output_file, index=False, encoding='utf-8')
 
-    except Exception as e:
-        print(f"Error crawling {stat_type}: {str(e)}")
-        continue
+    print(f"\n=== SUMMARY ===")
+    print(f"Data for {len(df)} players saved to {output_file}")
+    print(f"Players excluded due to insufficient minutes (< 90): {players_with_insufficient_data}")
 
-#
-# 6. Filter, format, and save the data - IMPROVED
-#
-filtered_data = []
-players_with_insufficient_data = 0
+    # Thời gian tải / chờ / phân tích từng trang (kèm số cầu thủ tìm thấy mỗi bảng)
+    report.print_summary()
+    print(f"Timing report saved to {report.save(args.report)}")
 
-for player_name, player_data in players_data.items():
-    try:
-        # Filter for players with more than 90 minutes
-        minutes_played = player_data.get('Standard_Min', 0)
-        if minutes_played != 'N/A' and int(minutes_played) > 90:
-            ordered_row = [player_data.get(col, 'N/A') for col, _ in COLUMN_MAP.values()]
-            filtered_data.append(ordered_row)
-        else:
-            players_with_insufficient_data += 1
-    except (ValueError, TypeError):
-        players_with_insufficient_data += 1
-        continue
-
-# Create DataFrame and save to CSV
-columns = [col for col, _ in COLUMN_MAP.values()]
-df = pd.DataFrame(filtered_data, columns=columns)
-df.fillna('N/A', inplace=True)
-
-# Sort players alphabetically by first name
-df.sort_values(by='Player', inplace=True)
-
-# Get the directory where the script is located
-script_dir = os.path.dirname(os.path.abspath(__file__))
-output_file = os.path.join(script_dir, "results.csv")
-df.to_csv(output_file, index=False, encoding='utf-8')
-
-print(f"\n=== SUMMARY ===")
-print(f"Data for {len(df)} players saved to {output_file}")
-print(f"Players excluded due to insufficient minutes (< 90): {players_with_insufficient_data}")
-
-# Print debug information
-# print(f"\n=== DEBUG INFO ===")
-# for stat_type, info in debug_info.items():
-#     print(f"{stat_type}: {info['found_players']} players processed, {info['missing_stats']} rows with no matching stats")
-
-# Count non-N/A values for each column
-# print(f"\n=== DATA COMPLETENESS ===")
-# for col in columns:
-#     non_na_count = df[col].value_counts().get('N/A', 0)
-#     available_count = len(df) - non_na_count
-#     percentage = (available_count / len(df) * 100) if len(df) > 0 else 0
-#     print(f"{col}: {available_count}/{len(df)} ({percentage:.1f}%) available")
-
-driver.quit()
\ No newline at end of file
+    # Count non-N/A values for each column
+    # print(f"\n=== DATA COMPLETENESS ===")
+    # for col in df.columns:
+    #     non_na_count = df[col].value_counts().get('N/A', 0)
+    #     available_count = len(df) - non_na_count
+    #     percentage = (available_count / len(df) * 100) if len(df) > 0 else 0
+    #     print(f"{col}: {available_count}/{len(df)} ({percentage:.1f}%) available")
+
+
+if __name__ == "__main__":
+    main()
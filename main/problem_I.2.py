@@ -18,6 +18,10 @@ import random
 import os
 import re
 import requests
+from market_values import add_value_columns, NUMERIC_VALUE_COLUMN
+from identity import ID_COLUMN
+from scrape_profile import ScrapeReport, PROFILERS, timed, count, profiled
+import argparse
 
 #
 # 1. Setup ChromeDriver with enhanced anti-detection
@@ -58,10 +62,11 @@ def setup_driver():
 #
 # 2. Alternative: Use Transfermarkt as backup source
 #
-def get_transfermarkt_value(player_name, team_name):
+def get_transfermarkt_value(player_name, team_name, record=None):
     """
     Backup method: Get value from Transfermarkt using requests
     This is more reliable and less likely to trigger CAPTCHA
+    (request and parsing times are added to record when given)
     """
     try:
         # Clean player name
@@ -75,13 +80,15 @@ def get_transfermarkt_value(player_name, team_name):
             'Accept-Language': 'en-US,en;q=0.9',
         }
 
-        response = requests.get(search_url, headers=headers, timeout=10)
+        with timed(record, 'fetch'):
+            response = requests.get(search_url, headers=headers, timeout=10)
 
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
+            with timed(record, 'parse'):
+                soup = BeautifulSoup(response.text, 'html.parser')
 
-            # Look for market value
-            value_elem = soup.find('td', class_='rechts hauptlink')
+                # Look for market value
+                value_elem = soup.find('td', class_='rechts hauptlink')
             if value_elem:
                 value = value_elem.get_text(strip=True)
                 return value
@@ -93,7 +100,7 @@ def get_transfermarkt_value(player_name, team_name):
 #
 # 3. Improved search with better CAPTCHA detection
 #
-def search_player_value(driver, player_name, team_name, use_backup=False):
+def search_player_value(driver, player_name, team_name, use_backup=False, record=None):
     """
     Search for a player's transfer value
 
@@ -102,6 +109,8 @@ def search_player_value(driver, player_name, team_name, use_backup=False):
         player_name: Name of the player
         team_name: Team name for verification
         use_backup: If True, use Transfermarkt instead
+        record: Optional scrape_profile record receiving fetch / parse / throttle
+                times, CAPTCHAs and retries
 
     Returns:
         str: Transfer value or 'N/A' if not found
@@ -110,7 +119,7 @@ def search_player_value(driver, player_name, team_name, use_backup=False):
     # Use backup source if requested
     if use_backup:
         print(f"  Using Transfermarkt for: {player_name}...", end=' ')
-        value = get_transfermarkt_value(player_name, team_name)
+        value = get_transfermarkt_value(player_name, team_name, record)
         if value != 'N/A':
             print(f"✓ Found: {value}")
         else:
@@ -130,20 +139,26 @@ def search_player_value(driver, player_name, team_name, use_backup=False):
             direct_url = f"https://www.footballtransfers.com/en/players/{url_name}"
 
             try:
-                driver.get(direct_url)
-                time.sleep(random.uniform(3, 5))
+                with timed(record, 'fetch'):
+                    driver.get(direct_url)
+                with timed(record, 'throttle'):
+                    time.sleep(random.uniform(3, 5))
 
                 # Check if page loaded successfully (not 404)
-                if "404" not in driver.title and "not found" not in driver.page_source.lower()[:1000]:
-                    soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-                    # Extract value from player page
-                    value = extract_value_from_page(soup)
-                    if value:
-                        print(f"  {clean_name}: ✓ {value}")
-                        return value
+                with timed(record, 'parse'):
+                    value = None
+                    if "404" not in driver.title and "not found" not in driver.page_source.lower()[:1000]:
+                        soup = BeautifulSoup(driver.page_source, 'html.parser')
+
+                        # Extract value from player page
+                        value = extract_value_from_page(soup)
+                if value:
+                    print(f"  {clean_name}: ✓ {value}")
+                    return value
             except:
                 pass
+            # Trang trực tiếp không có giá trị: thử lại bằng tìm kiếm
+            count(record, 'retries')
 
         # Method 2: Use search if direct URL fails
         print(f"  Searching: {clean_name}...", end=' ')
@@ -151,18 +166,24 @@ def search_player_value(driver, player_name, team_name, use_backup=False):
         search_query = clean_name.replace(' ', '+')
         search_url = f"https://www.footballtransfers.com/en/search?q={search_query}"
 
-        driver.get(search_url)
-        time.sleep(random.uniform(3, 5))
+        with timed(record, 'fetch'):
+            driver.get(search_url)
+        with timed(record, 'throttle'):
+            time.sleep(random.uniform(3, 5))
 
         # Check for CAPTCHA immediately
-        if check_for_captcha(driver):
+        with timed(record, 'parse'):
+            captcha = check_for_captcha(driver)
+        if captcha:
             print("⚠ CAPTCHA detected!")
+            count(record, 'captcha')
             return 'CAPTCHA'
 
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        with timed(record, 'parse'):
+            soup = BeautifulSoup(driver.page_source, 'html.parser')
 
-        # Look for player links in search results
-        player_links = soup.find_all('a', href=re.compile(r'/en/players/[^/]+/?$'))
+            # Look for player links in search results
+            player_links = soup.find_all('a', href=re.compile(r'/en/players/[^/]+/?$'))
 
         if not player_links:
             print("✗ No results")
@@ -174,16 +195,22 @@ def search_player_value(driver, player_name, team_name, use_backup=False):
         if not player_url.startswith('http'):
             player_url = f"https://www.footballtransfers.com{player_url}"
 
-        driver.get(player_url)
-        time.sleep(random.uniform(3, 5))
+        with timed(record, 'fetch'):
+            driver.get(player_url)
+        with timed(record, 'throttle'):
+            time.sleep(random.uniform(3, 5))
 
         # Check for CAPTCHA again
-        if check_for_captcha(driver):
+        with timed(record, 'parse'):
+            captcha = check_for_captcha(driver)
+        if captcha:
             print("⚠ CAPTCHA detected!")
+            count(record, 'captcha')
             return 'CAPTCHA'
 
-        player_soup = BeautifulSoup(driver.page_source, 'html.parser')
-        value = extract_value_from_page(player_soup)
+        with timed(record, 'parse'):
+            player_soup = BeautifulSoup(driver.page_source, 'html.parser')
+            value = extract_value_from_page(player_soup)
 
         if value:
             print(f"✓ {value}")
@@ -278,6 +305,11 @@ def wait_for_captcha_solve(driver):
 # 5. Main execution with improved error handling
 #
 def main():
+    parser = argparse.ArgumentParser(description='Collect transfer values of the players in results.csv')
+    parser.add_argument('--report', help='Timing report JSON (default: .scrape_reports/problem_I.2-<time>.json)')
+    parser.add_argument('--profile', choices=PROFILERS, help='Also profile the whole run')
+    args = parser.parse_args()
+
     script_dir = os.path.dirname(os.path.abspath(__file__))
     input_file = os.path.join(script_dir, "results.csv")
     output_file = os.path.join(script_dir, "transfer_values.csv")
@@ -307,78 +339,89 @@ def main():
 
     # Initialize driver
     driver = setup_driver()
+    report = ScrapeReport('problem_I.2')
 
-    try:
-        for idx in range(start_idx, len(df)):
-            row = df.iloc[idx]
-            player_name = row['Player']
-            team_name = row.get('Team', 'Unknown')
-
-            print(f"[{idx + 1}/{len(df)}]", end=' ')
-
-            # Always try FootballTransfers first (use_backup=False)
-            transfer_value = search_player_value(driver, player_name, team_name, use_backup=False)
-
-            # Handle CAPTCHA - switch to Transfermarkt for THIS player only
-            if transfer_value == 'CAPTCHA':
-                print("⚠ CAPTCHA! Switching to Transfermarkt for this player...")
-                print(f"[{idx + 1}/{len(df)}] Using Transfermarkt for: {player_name}...", end=' ')
-                transfer_value = get_transfermarkt_value(player_name, team_name)
-                if transfer_value != 'N/A':
-                    print(f"✓ {transfer_value}")
-                else:
-                    print("✗ Not found")
-
-                # Add extra delay before returning to FootballTransfers
-                print("  Waiting before returning to FootballTransfers...")
-                time.sleep(random.uniform(10, 20))
-
-            # Store result
-            transfer_data.append({
-                'Player': player_name,
-                'Team': team_name,
-                'Transfer_Value_2024_25': transfer_value
-            })
-
-            # Save checkpoint every 10 players
-            if (idx + 1) % 10 == 0:
-                checkpoint_df = pd.DataFrame(transfer_data)
-                checkpoint_df.to_csv(checkpoint_file, index=False, encoding='utf-8')
-                print(f"  [Checkpoint saved]")
-
-            # Random delay between requests
-            time.sleep(random.uniform(1, 3))
-
-            # Longer pause every 15 players
-            if (idx + 1) % 15 == 0:
-                pause_time = random.uniform(15, 30)
-                print(f"\n--- Break ({pause_time:.1f}s) ---\n")
-                time.sleep(pause_time)
-
-        # Save final results
-        transfer_df = pd.DataFrame(transfer_data)
-        transfer_df.to_csv(output_file, index=False, encoding='utf-8')
-
-        # Remove checkpoint file
-        if os.path.exists(checkpoint_file):
-            os.remove(checkpoint_file)
-
-        print(f"\n{'='*60}")
-        print(f"✓ Transfer values saved to: {output_file}")
-        print(f"{'='*60}")
-        print(f"Total players: {len(transfer_data)}")
-        print(f"Values found: {sum(1 for d in transfer_data if d['Transfer_Value_2024_25'] != 'N/A')}")
-        print(f"Not found: {sum(1 for d in transfer_data if d['Transfer_Value_2024_25'] == 'N/A')}")
-
-    except KeyboardInterrupt:
-        print("\n\n⚠ Interrupted. Saving progress...")
-        transfer_df = pd.DataFrame(transfer_data)
-        transfer_df.to_csv(checkpoint_file, index=False, encoding='utf-8')
-        print(f"Progress saved to: {checkpoint_file}")
-        print("Run script again to resume.")
-
-    finally:
-        driver.quit()
+    with profiled(args.profile, report.default_path()):
+        try:
+            for idx in range(start_idx, len(df)):
+                row = df.iloc[idx]
+                player_name = row['Player']
+                team_name = row.get('Team', 'Unknown')
+                record = report.record(player_name, team=team_name)
+
+                print(f"[{idx + 1}/{len(df)}]", end=' ')
+
+                # Always try FootballTransfers first (use_backup=False)
+                transfer_value = search_player_value(driver, player_name, team_name, use_backup=False, record=record)
+
+                # Handle CAPTCHA - switch to Transfermarkt for THIS player only
+                if transfer_value == 'CAPTCHA':
+                    print("⚠ CAPTCHA! Switching to Transfermarkt for this player...")
+                    print(f"[{idx + 1}/{len(df)}] Using Transfermarkt for: {player_name}...", end=' ')
+                    count(record, 'retries')
+                    transfer_value = get_transfermarkt_value(player_name, team_name, record)
+                    if transfer_value != 'N/A':
+                        print(f"✓ {transfer_value}")
+                    else:
+                        print("✗ Not found")
+
+                    # Add extra delay before returning to FootballTransfers
+                    print("  Waiting before returning to FootballTransfers...")
+                    with timed(record, 'throttle'):
+                        time.sleep(random.uniform(10, 20))
+                record['status'] = 'found' if transfer_value not in ('N/A', 'CAPTCHA') else 'not_found'
+
+                # Store result
+                transfer_data.append({
+                    'Player': player_name,
+                    'Team': team_name,
+                    'Transfer_Value_2024_25': transfer_value,
+                    ID_COLUMN: row.get(ID_COLUMN, 'N/A')
+                })
+
+                # Save checkpoint every 10 players
+                if (idx + 1) % 10 == 0:
+                    checkpoint_df = pd.DataFrame(transfer_data)
+                    checkpoint_df.to_csv(checkpoint_file, index=False, encoding='utf-8')
+                    print(f"  [Checkpoint saved]")
+
+                # Random delay between requests
+                with timed(record, 'throttle'):
+                    time.sleep(random.uniform(1, 3))
+
+                    # Longer pause every 15 players
+                    if (idx + 1) % 15 == 0:
+                        pause_time = random.uniform(15, 30)
+                        print(f"\n--- Break ({pause_time:.1f}s) ---\n")
+                        time.sleep(pause_time)
+
+            # Save final results (raw strings + numeric EUR value and currency)
+            transfer_df = add_value_columns(pd.DataFrame(transfer_data))
+            transfer_df.to_csv(output_file, index=False, encoding='utf-8')
+
+            # Remove checkpoint file
+            if os.path.exists(checkpoint_file):
+                os.remove(checkpoint_file)
+
+            print(f"\n{'='*60}")
+            print(f"✓ Transfer values saved to: {output_file}")
+            print(f"{'='*60}")
+            print(f"Total players: {len(transfer_data)}")
+            print(f"Values found: {transfer_df[NUMERIC_VALUE_COLUMN].notna().sum()}")
+            print(f"Not found: {transfer_df[NUMERIC_VALUE_COLUMN].isna().sum()}")
+
+        except KeyboardInterrupt:
+            print("\n\n⚠ Interrupted. Saving progress...")
+            transfer_df = pd.DataFrame(transfer_data)
+            transfer_df.to_csv(checkpoint_file, index=False, encoding='utf-8')
+            print(f"Progress saved to: {checkpoint_file}")
+            print("Run script again to resume.")
+
+        finally:
+            driver.quit()
+            # Thời gian tải / chờ / phân tích của từng cầu thủ, CAPTCHA và số lần thử lại
+            report.print_summary()
+            print(f"Timing report saved to {report.save(args.report)}")
 
 if __name__ == "__main__":
     print("="*60)
@@ -3,60 +3,146 @@ Part II.1: Flask RESTful API for querying player statistics
 Endpoints:
   - /api/player/<player_name> : Get all stats for a specific player
   - /api/club/<club_name> : Get all stats for players in a club
+  - /api/values : Transfer value leaderboard with value/club filters
+  - /api/player/<player_name>/cluster : Cluster and role label of a player
+  - /api/player/<player_name>/similar : Most similar players (position/minutes filters)
+  - /metrics : Request metrics in the Prometheus text format
 """
 
 from flask import Flask, jsonify, request
+import numpy as np
 import pandas as pd
 import os
+from market_values import VALUE_COLUMN, NUMERIC_VALUE_COLUMN, CURRENCY_COLUMN, add_value_columns
+from cluster_model import ClusterModel, CLUSTER_MODEL_FILE
+from similarity import SimilarityIndex
+from storage import Storage, DATABASE_FILE, DEFAULT_SEASON
+from identity import PlayerIndex, add_keys, key_table
+from api_metrics import Metrics
 
 app = Flask(__name__)
 
+# Độ trễ, kích thước phản hồi, kiểu khớp tên... theo endpoint (xem /metrics)
+metrics = Metrics()
+metrics.init_app(app)
+
 # Configuration
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PLAYER_STATS_FILE = os.path.join(SCRIPT_DIR, "results.csv")
 TRANSFER_VALUES_FILE = os.path.join(SCRIPT_DIR, "transfer_values.csv")
+SEASON = os.environ.get('FOOTBALL_SEASON', DEFAULT_SEASON)
 
 # Load data into memory
 player_stats_df = None
 transfer_values_df = None
+cluster_model = None
+similarity_index = None
+player_index = None
+player_keys = None
+value_table = None
+
+def load_data(stats_file=PLAYER_STATS_FILE, values_file=TRANSFER_VALUES_FILE, database=DATABASE_FILE):
+    """
+    Load player data into pandas DataFrames (from the database when it exists, else the CSV files)
 
-def load_data():
-    """Load CSV data into pandas DataFrames"""
-    global player_stats_df, transfer_values_df
+    Args:
+        stats_file: Player statistics CSV
+        values_file: Transfer values CSV
+        database: SQLite database (None = CSV files only)
+    """
+    global player_stats_df, transfer_values_df, cluster_model, similarity_index, player_index
+    global player_keys, value_table
 
     try:
-        if os.path.exists(PLAYER_STATS_FILE):
-            player_stats_df = pd.read_csv(PLAYER_STATS_FILE)
-            print(f"✓ Loaded {len(player_stats_df)} players from {PLAYER_STATS_FILE}")
+        tables = Storage(database).tables() if database and os.path.exists(database) else []
+        if 'players' in tables:
+            player_stats_df = Storage(database).read_table('players', SEASON)
+            print(f"✓ Loaded {len(player_stats_df)} players from {database} ({SEASON})")
+        elif os.path.exists(stats_file):
+            player_stats_df = pd.read_csv(stats_file)
+            print(f"✓ Loaded {len(player_stats_df)} players from {stats_file}")
         else:
-            print(f"⚠ Warning: {PLAYER_STATS_FILE} not found")
+            print(f"⚠ Warning: {stats_file} not found")
             player_stats_df = pd.DataFrame()
 
-        if os.path.exists(TRANSFER_VALUES_FILE):
-            transfer_values_df = pd.read_csv(TRANSFER_VALUES_FILE)
-            print(f"✓ Loaded {len(transfer_values_df)} transfer values from {TRANSFER_VALUES_FILE}")
+        if 'transfer_values' in tables:
+            # Giá trị số (EUR) đã được tách khi nhập vào cơ sở dữ liệu
+            transfer_values_df = Storage(database).read_table('transfer_values', SEASON)
+            print(f"✓ Loaded {len(transfer_values_df)} transfer values from {database} ({SEASON})")
+        elif os.path.exists(values_file):
+            transfer_values_df = pd.read_csv(values_file)
+            # Parse value strings once at load time into a numeric EUR column
+            transfer_values_df = add_value_columns(transfer_values_df)
+            print(f"✓ Loaded {len(transfer_values_df)} transfer values from {values_file}")
         else:
-            print(f"⚠ Warning: {TRANSFER_VALUES_FILE} not found")
+            print(f"⚠ Warning: {values_file} not found")
             transfer_values_df = pd.DataFrame()
 
+        # Chỉ mục định danh cầu thủ (fbref ID / tên -> khóa số nguyên) dùng cho mọi phép nối
+        # Khóa của mỗi dòng được tính một lần; giá trị chuyển nhượng thành bảng tra theo khóa
+        player_keys, value_table = None, None
+        if not player_stats_df.empty:
+            player_index = PlayerIndex.from_frame(player_stats_df)
+            player_keys = player_index.resolve_frame(player_stats_df)
+            if not transfer_values_df.empty:
+                transfer_values_df = add_keys(transfer_values_df, player_index)
+                value_table = key_table(transfer_values_df, [VALUE_COLUMN, NUMERIC_VALUE_COLUMN, CURRENCY_COLUMN])
+
     except Exception as e:
         print(f"Error loading data: {str(e)}")
         player_stats_df = pd.DataFrame()
         transfer_values_df = pd.DataFrame()
+        player_keys, value_table = None, None
+
+    # Mô hình phân cụm đã huấn luyện bởi Problem_4.py (không bắt buộc)
+    try:
+        if os.path.exists(CLUSTER_MODEL_FILE):
+            cluster_model = ClusterModel.load(CLUSTER_MODEL_FILE)
+            print(f"✓ Loaded cluster model {cluster_model.version} ({len(cluster_model.names)} clusters)")
+        else:
+            print(f"⚠ Warning: {CLUSTER_MODEL_FILE} not found (run Problem_4.py)")
+    except Exception as e:
+        print(f"Error loading cluster model: {str(e)}")
+        cluster_model = None
+
+    # Chỉ mục cầu thủ tương tự, dùng cùng thang chuẩn hóa với mô hình phân cụm
+    similarity_index = None
+    if not player_stats_df.empty:
+        try:
+            similarity_index = SimilarityIndex.from_model(player_stats_df, cluster_model)
+            print(f"✓ Built similarity index ({similarity_index.X.shape[1]} features)")
+        except Exception as e:
+            print(f"Error building similarity index: {str(e)}")
 
 def merge_player_data(stats_data):
-    """Merge player stats with transfer values"""
-    if transfer_values_df is not None and not transfer_values_df.empty:
-        # Merge on Player name
-        merged = pd.merge(
-            stats_data,
-            transfer_values_df[['Player', 'Transfer_Value_2024_25']],
-            on='Player',
-            how='left'
-        )
-        return merged
+    """
+    Merge player stats with transfer values (joined on the player identity key, not the name)
+
+    Args:
+        stats_data: Rows of player_stats_df (its index picks the precomputed keys)
+    """
+    if value_table is not None:
+        values = value_table.reindex(player_keys.loc[stats_data.index].to_numpy())
+        values.index = stats_data.index
+        return pd.concat([stats_data, values], axis=1)
     return stats_data
 
+def find_players(player_name):
+    """Players matching a name: exact (case-insensitive) match first, then partial"""
+    player_data = player_stats_df[
+        player_stats_df['Player'].str.lower() == player_name.lower()
+        ]
+    match = 'exact'
+
+    if player_data.empty:
+        # Try partial match
+        player_data = player_stats_df[
+            player_stats_df['Player'].str.contains(player_name, case=False, na=False)
+        ]
+        match = 'partial' if not player_data.empty else 'not_found'
+    metrics.record_match(match)
+    return player_data
+
 @app.route('/')
 def index():
     """API documentation endpoint"""
@@ -78,6 +164,26 @@ def index():
                 'method': 'GET',
                 'description': 'Get statistics summary',
                 'example': '/api/stats'
+            },
+            '/api/player/<player_name>/cluster': {
+                'method': 'GET',
+                'description': 'Get the cluster and role label of a player',
+                'example': '/api/player/Mohamed Salah/cluster'
+            },
+            '/api/player/<player_name>/similar': {
+                'method': 'GET',
+                'description': 'Most similar players (query: k, position e.g. FW or DF,MF, min_minutes)',
+                'example': '/api/player/Mohamed Salah/similar?k=5&position=FW&min_minutes=900'
+            },
+            '/api/values': {
+                'method': 'GET',
+                'description': 'Transfer value leaderboard (query: min_value, max_value in million EUR, club, limit)',
+                'example': '/api/values?min_value=50&limit=10'
+            },
+            '/metrics': {
+                'method': 'GET',
+                'description': 'Request metrics in the Prometheus text format',
+                'example': '/metrics'
             }
         },
         'total_players': len(player_stats_df) if player_stats_df is not None else 0,
@@ -102,45 +208,154 @@ def get_player(player_name):
         }), 500
 
     # Case-insensitive search
-    player_data = player_stats_df[
-        player_stats_df['Player'].str.lower() == player_name.lower()
-        ]
+    with metrics.phase('filter'):
+        player_data = find_players(player_name)
 
     if player_data.empty:
-        # Try partial match
-        player_data = player_stats_df[
-            player_stats_df['Player'].str.contains(player_name, case=False, na=False)
-        ]
-
-        if player_data.empty:
-            return jsonify({
-                'error': 'Player not found',
-                'message': f'No player found with name: {player_name}',
-                'suggestion': 'Try using exact player name or check spelling'
-            }), 404
+        return jsonify({
+            'error': 'Player not found',
+            'message': f'No player found with name: {player_name}',
+            'suggestion': 'Try using exact player name or check spelling'
+        }), 404
 
     # Merge with transfer values
-    merged_data = merge_player_data(player_data)
+    with metrics.phase('merge'):
+        merged_data = merge_player_data(player_data)
 
     # Convert to dictionary and handle NaN values
-    result = merged_data.to_dict('records')
+    with metrics.phase('serialize'):
+        result = merged_data.to_dict('records')
 
     # Replace NaN with 'N/A'
-    for record in result:
-        for key, value in record.items():
-            if pd.isna(value):
-                record[key] = 'N/A'
+    with metrics.phase('nan_scrub'):
+        for record in result:
+            for key, value in record.items():
+                if pd.isna(value):
+                    record[key] = 'N/A'
+
+    with metrics.phase('serialize'):
+        if len(result) == 1:
+            return jsonify({
+                'success': True,
+                'player': result[0]
+            })
+        else:
+            return jsonify({
+                'success': True,
+                'message': f'Found {len(result)} players matching "{player_name}"',
+                'players': result
+            })
+
+@app.route('/api/player/<player_name>/cluster', methods=['GET'])
+def get_player_cluster(player_name):
+    """
+    Cluster and role label of a player, from the saved clustering model
+
+    Args:
+        player_name: Name of the player (case-insensitive, partial match allowed)
 
-    if len(result) == 1:
+    Returns:
+        JSON with cluster id, role label and 2D PCA coordinates per player
+    """
+    if player_stats_df is None or player_stats_df.empty:
         return jsonify({
-            'success': True,
-            'player': result[0]
-        })
-    else:
+            'error': 'No data available',
+            'message': 'Player statistics database is empty'
+        }), 500
+
+    if cluster_model is None:
+        return jsonify({
+            'error': 'No cluster model',
+            'message': 'Run Problem_4.py to create the clustering model'
+        }), 500
+
+    player_data = find_players(player_name)
+    if player_data.empty:
+        return jsonify({
+            'error': 'Player not found',
+            'message': f'No player found with name: {player_name}',
+            'suggestion': 'Try using exact player name or check spelling'
+        }), 404
+
+    labels, names, coords = cluster_model.assign(player_data)
+    result = [
+        {
+            'Player': player,
+            'Team': team,
+            'Cluster': int(label),
+            'Cluster_Name': name,
+            'PCA': [float(x) for x in coord]
+        }
+        for player, team, label, name, coord in zip(
+            player_data['Player'], player_data['Team'], labels, names, coords)
+    ]
+
+    return jsonify({
+        'success': True,
+        'model_version': cluster_model.version,
+        'players': result
+    })
+
+@app.route('/api/player/<player_name>/similar', methods=['GET'])
+def get_similar_players(player_name):
+    """
+    Players with the most similar statistical profile
+
+    Args:
+        player_name: Name of the player (case-insensitive, partial match allowed;
+                     the first match is used)
+
+    Query parameters:
+        k: Number of similar players (default 10)
+        position: Position codes to keep, comma-separated (e.g. FW or DF,MF)
+        min_minutes: Minimum minutes played
+
+    Returns:
+        JSON with the similar players, nearest first, and their distance
+    """
+    if player_stats_df is None or player_stats_df.empty or similarity_index is None:
+        return jsonify({
+            'error': 'No data available',
+            'message': 'Player statistics database is empty'
+        }), 500
+
+    with metrics.phase('filter'):
+        player_data = find_players(player_name)
+    if player_data.empty:
+        return jsonify({
+            'error': 'Player not found',
+            'message': f'No player found with name: {player_name}',
+            'suggestion': 'Try using exact player name or check spelling'
+        }), 404
+
+    k = request.args.get('k', default=10, type=int)
+    position = request.args.get('position', type=str)
+    min_minutes = request.args.get('min_minutes', type=float)
+    positions = [p.strip().upper() for p in position.split(',')] if position else None
+
+    with metrics.phase('query'):
+        row = player_stats_df.index.get_loc(player_data.index[0])
+        rows, distances = similarity_index.query(row, k=k, positions=positions, min_minutes=min_minutes)
+
+    columns = [c for c in ['Player', 'Team', 'Pos', 'Age', 'Standard_Min'] if c in player_stats_df.columns]
+    with metrics.phase('merge'):
+        similar = merge_player_data(player_stats_df.iloc[rows][columns])
+        similar['Distance'] = np.round(distances.astype(float), 4)
+    with metrics.phase('serialize'):
+        result = similar.to_dict('records')
+    with metrics.phase('nan_scrub'):
+        for record in result:
+            for key, value in record.items():
+                if pd.isna(value):
+                    record[key] = 'N/A'
+
+    with metrics.phase('serialize'):
         return jsonify({
             'success': True,
-            'message': f'Found {len(result)} players matching "{player_name}"',
-            'players': result
+            'player': player_data['Player'].iloc[0],
+            'team': player_data['Team'].iloc[0],
+            'matches': len(player_data),
+            'similar': result
         })
 
 @app.route('/api/club/<club_name>', methods=['GET'])
@@ -161,46 +376,54 @@ def get_club(club_name):
         }), 500
 
     # Case-insensitive search
-    club_data = player_stats_df[
-        player_stats_df['Team'].str.lower() == club_name.lower()
-        ]
-
-    if club_data.empty:
-        # Try partial match
+    with metrics.phase('filter'):
         club_data = player_stats_df[
-            player_stats_df['Team'].str.contains(club_name, case=False, na=False)
-        ]
+            player_stats_df['Team'].str.lower() == club_name.lower()
+            ]
+        match = 'exact'
 
         if club_data.empty:
-            # Get list of available clubs
-            available_clubs = sorted(player_stats_df['Team'].unique().tolist())
-            return jsonify({
-                'error': 'Club not found',
-                'message': f'No club found with name: {club_name}',
-                'available_clubs': available_clubs
-            }), 404
+            # Try partial match
+            club_data = player_stats_df[
+                player_stats_df['Team'].str.contains(club_name, case=False, na=False)
+            ]
+            match = 'partial' if not club_data.empty else 'not_found'
+    metrics.record_match(match)
+
+    if club_data.empty:
+        # Get list of available clubs
+        available_clubs = sorted(player_stats_df['Team'].unique().tolist())
+        return jsonify({
+            'error': 'Club not found',
+            'message': f'No club found with name: {club_name}',
+            'available_clubs': available_clubs
+        }), 404
 
     # Merge with transfer values
-    merged_data = merge_player_data(club_data)
+    with metrics.phase('merge'):
+        merged_data = merge_player_data(club_data)
 
-    # Sort by player name
-    merged_data = merged_data.sort_values('Player')
+        # Sort by player name
+        merged_data = merged_data.sort_values('Player')
 
     # Convert to dictionary and handle NaN values
-    result = merged_data.to_dict('records')
+    with metrics.phase('serialize'):
+        result = merged_data.to_dict('records')
 
     # Replace NaN with 'N/A'
-    for record in result:
-        for key, value in record.items():
-            if pd.isna(value):
-                record[key] = 'N/A'
+    with metrics.phase('nan_scrub'):
+        for record in result:
+            for key, value in record.items():
+                if pd.isna(value):
+                    record[key] = 'N/A'
 
-    return jsonify({
-        'success': True,
-        'club': club_data['Team'].iloc[0],
-        'total_players': len(result),
-        'players': result
-    })
+    with metrics.phase('serialize'):
+        return jsonify({
+            'success': True,
+            'club': club_data['Team'].iloc[0],
+            'total_players': len(result),
+            'players': result
+        })
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
@@ -228,6 +451,69 @@ def get_stats():
 
     return jsonify(stats)
 
+@app.route('/api/values', methods=['GET'])
+def get_values():
+    """
+    Transfer value leaderboard
+
+    Query parameters:
+        min_value: Minimum value in million EUR
+        max_value: Maximum value in million EUR
+        club: Club name (case-insensitive)
+        limit: Number of players to return (default 20)
+
+    Returns:
+        JSON with players sorted by transfer value (highest first)
+    """
+    if player_stats_df is None or player_stats_df.empty:
+        return jsonify({
+            'error': 'No data available',
+            'message': 'Player statistics database is empty'
+        }), 500
+
+    with metrics.phase('merge'):
+        merged_data = merge_player_data(player_stats_df[['Player', 'Team', 'Pos', 'Age']])
+    if NUMERIC_VALUE_COLUMN not in merged_data.columns:
+        return jsonify({
+            'error': 'No data available',
+            'message': 'Transfer values are not loaded'
+        }), 500
+
+    min_value = request.args.get('min_value', type=float)
+    max_value = request.args.get('max_value', type=float)
+    club = request.args.get('club', type=str)
+    limit = request.args.get('limit', default=20, type=int)
+
+    # Lọc và sắp xếp trực tiếp trên mảng số
+    with metrics.phase('filter'):
+        values = merged_data[NUMERIC_VALUE_COLUMN].to_numpy(dtype=float)
+        mask = ~np.isnan(values)
+        if min_value is not None:
+            mask &= values >= min_value
+        if max_value is not None:
+            mask &= values <= max_value
+        if club:
+            mask &= (merged_data['Team'].str.lower() == club.lower()).to_numpy()
+
+        selected = np.flatnonzero(mask)
+        selected = selected[np.argsort(-values[selected], kind='stable')][:max(limit, 0)]
+    with metrics.phase('serialize'):
+        result = merged_data.iloc[selected].to_dict('records')
+
+    # Replace NaN with 'N/A' (e.g. a missing Age or currency)
+    with metrics.phase('nan_scrub'):
+        for record in result:
+            for key, value in record.items():
+                if pd.isna(value):
+                    record[key] = 'N/A'
+
+    with metrics.phase('serialize'):
+        return jsonify({
+            'success': True,
+            'total_matching': int(mask.sum()),
+            'players': result
+        })
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -236,8 +522,12 @@ def not_found(error):
         'message': 'The requested endpoint does not exist',
         'available_endpoints': [
             '/api/player/<player_name>',
+            '/api/player/<player_name>/cluster',
+            '/api/player/<player_name>/similar',
             '/api/club/<club_name>',
-            '/api/stats'
+            '/api/stats',
+            '/api/values',
+            '/metrics'
         ]
     }), 404
 
@@ -263,12 +553,17 @@ if __name__ == '__main__':
     print("="*60)
     print("\nAvailable endpoints:")
     print("  • GET /api/player/<player_name>")
+    print("  • GET /api/player/<player_name>/cluster")
+    print("  • GET /api/player/<player_name>/similar?k=&position=&min_minutes=")
     print("  • GET /api/club/<club_name>")
     print("  • GET /api/stats")
+    print("  • GET /api/values?min_value=&max_value=&club=&limit=")
+    print("  • GET /metrics (set API_PHASE_TIMING=1 for per-phase timings)")
     print("\nExamples:")
     print("  • http://127.0.0.1:5000/api/player/Mohamed%20Salah")
     print("  • http://127.0.0.1:5000/api/club/Liverpool")
     print("  • http://127.0.0.1:5000/api/stats")
+    print("  • http://127.0.0.1:5000/api/values?min_value=50&limit=10")
     print("\nPress Ctrl+C to stop the server")
     print("="*60 + "\n")
 
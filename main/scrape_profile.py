@@ -0,0 +1,159 @@
+"""
+Timing instrumentation for the scrapers
+Every page (problem_I.1) or player (problem_I.2) gets a record with the
+seconds spent in each stage -- fetch (navigation / HTTP request), wait
+(waiting for page content to appear), parse (BeautifulSoup and extraction),
+throttle (fixed sleeps and pauses between requests) -- plus CAPTCHA and
+retry counts. The run report is written as JSON and summarized in a table
+that says whether the run was fetch-bound or parse-bound (throttle time is
+left out of that comparison). A cProfile or pyinstrument capture of the
+whole run can be switched on as well.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_DIR = os.path.join(SCRIPT_DIR, ".scrape_reports")
+STAGES = ('fetch', 'wait', 'parse', 'throttle')
+PROFILERS = ('cprofile', 'pyinstrument')
+CAPTCHA_MARKERS = ('captcha', 'just a moment', 'checking your browser', 'verify you are human')
+
+
+@contextmanager
+def timed(record, stage):
+    """Add the duration of the block to record[stage] (no-op when record is None)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if record is not None:
+            record[stage] = record.get(stage, 0.0) + time.perf_counter() - start
+
+
+def looks_like_captcha(html):
+    """True if a page is a CAPTCHA / bot-check page"""
+    text = html.lower()
+    return any(marker in text for marker in CAPTCHA_MARKERS)
+
+
+def count(record, field, n=1):
+    """Increment a counter of a record (no-op when record is None)"""
+    if record is not None:
+        record[field] = record.get(field, 0) + n
+
+
+class ScrapeReport:
+    """Per-item timing records of one scraper run"""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.started = datetime.now()
+        self.records = []
+        self._start = time.perf_counter()
+
+    def record(self, item, **fields):
+        """New record for one page or player (filled in with timed() / count())"""
+        record = {'item': item, **fields}
+        self.records.append(record)
+        return record
+
+    def summary(self):
+        """
+        Totals of the run
+
+        Returns:
+            dict: per-stage count / total / mean / max seconds, CAPTCHA, retry
+                  and error counts, wall time and the bottleneck
+        """
+        stages = {}
+        for stage in STAGES:
+            values = [r[stage] for r in self.records if stage in r]
+            if values:
+                stages[stage] = {'items': len(values), 'total': sum(values),
+                                 'mean': sum(values) / len(values), 'max': max(values)}
+        # Các khoảng ngủ cố định (throttle) không tính vào so sánh fetch / parse
+        network = sum(stages.get(s, {}).get('total', 0.0) for s in ('fetch', 'wait'))
+        parse = stages.get('parse', {}).get('total', 0.0)
+        return {
+            'items': len(self.records),
+            'wall_time': time.perf_counter() - self._start,
+            'stages': stages,
+            'captchas': sum(r.get('captcha', 0) for r in self.records),
+            'retries': sum(r.get('retries', 0) for r in self.records),
+            'errors': sum(1 for r in self.records if r.get('status') == 'error'),
+            'bottleneck': 'fetch-bound' if network >= parse else 'parse-bound'
+        }
+
+    def default_path(self, extension=''):
+        """.scrape_reports/<scraper>-<start time><extension>"""
+        return os.path.join(REPORT_DIR, f"{self.scraper}-{self.started:%Y%m%d-%H%M%S}{extension}")
+
+    def save(self, path=None):
+        """Write the records and summary as JSON (default: .scrape_reports/<scraper>-<time>.json)"""
+        path = path or self.default_path('.json')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'scraper': self.scraper, 'started': self.started.isoformat(timespec='seconds'),
+                       'summary': self.summary(), 'records': self.records}, f, indent=2, ensure_ascii=False)
+        return path
+
+    def print_summary(self):
+        summary = self.summary()
+        measured = sum(stage['total'] for stage in summary['stages'].values()) or 1.0
+        print(f"\n=== TIMING ({self.scraper}) ===")
+        print(f"{'Stage':<10}{'Items':>7}{'Total (s)':>12}{'Mean (s)':>11}{'Max (s)':>10}{'Share':>8}")
+        for name, stage in summary['stages'].items():
+            print(f"{name:<10}{stage['items']:>7}{stage['total']:>12.2f}{stage['mean']:>11.3f}"
+                  f"{stage['max']:>10.2f}{stage['total'] / measured:>8.0%}")
+        print(f"Items: {summary['items']}  CAPTCHAs: {summary['captchas']}  Retries: {summary['retries']}  "
+              f"Errors: {summary['errors']}  Wall time: {summary['wall_time']:.1f}s")
+        print(f"Bottleneck: {summary['bottleneck']}")
+
+
+@contextmanager
+def profiled(kind, path_prefix):
+    """
+    Profile the block with cProfile or pyinstrument (kind None = off)
+
+    cProfile writes <path_prefix>.prof and prints the 20 most expensive
+    calls; pyinstrument writes <path_prefix>.html.
+    """
+    if kind is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path_prefix)), exist_ok=True)
+
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise SystemExit("pyinstrument is not installed (pip install pyinstrument)")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(f"{path_prefix}.html", 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+            print(f"Profile saved to {path_prefix}.html")
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{path_prefix}.prof")
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(20)
+        print(stream.getvalue())
+        print(f"Profile saved to {path_prefix}.prof")
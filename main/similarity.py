@@ -0,0 +1,116 @@
+"""
+Part IV: Similar-player search
+Exact nearest-neighbour index over the standardized feature matrix of the
+clustering stage (features.FeatureMatrix). With a few hundred to a few
+thousand players, brute force with one matrix-vector multiply per query
+(|x - q|² = |x|² - 2 x·q + |q|²) is exact and faster than a tree index in
+60+ dimensions.
+"""
+
+import numpy as np
+import pandas as pd
+
+from features import FeatureMatrix
+
+MINUTES_COL = 'Standard_Min'
+
+
+class SimilarityIndex:
+    """
+    Nearest players in feature space, with position and minutes filters
+
+    Attributes:
+        players: Player DataFrame (rows aligned with X)
+        X: (players x features) standardized float32 matrix
+    """
+
+    def __init__(self, players, X):
+        self.players = players.reset_index(drop=True)
+        self.X = np.ascontiguousarray(X, dtype=np.float32)
+        self._norms = (self.X ** 2).sum(axis=1)
+
+        # Ma trận vị trí (cầu thủ x mã vị trí) để lọc 'FW', 'DF,MF'... không cần so chuỗi
+        codes = self.players['Pos'].fillna('').astype(str).str.split(',')
+        self.position_codes = sorted({c.strip() for row in codes for c in row if c.strip()})
+        self._positions = np.array([
+            [code in {c.strip() for c in row} for code in self.position_codes] for row in codes
+        ], dtype=bool).reshape(len(self.players), len(self.position_codes))
+
+        minutes = self.players[MINUTES_COL] if MINUTES_COL in self.players.columns else 0
+        self._minutes = pd.to_numeric(pd.Series(minutes, index=self.players.index),
+                                      errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    @classmethod
+    def from_model(cls, players, model=None, features=None):
+        """
+        Index built with a ClusterModel's scaling, or with the shared feature
+        preparation (features.FeatureMatrix) when no model exists
+
+        Args:
+            players: Player DataFrame
+            model: ClusterModel of the clustering stage (optional)
+            features: Prepared FeatureMatrix of players (default: built from players)
+        """
+        if model is not None:
+            return cls(players, model.transform(players))
+        if features is None:
+            features = FeatureMatrix.from_frame(players)
+        return cls(players, features.scaled)
+
+    def _mask(self, positions=None, min_minutes=None):
+        """Candidate rows: any of the given position codes, at least min_minutes played"""
+        mask = np.ones(len(self.players), dtype=bool)
+        if positions:
+            wanted = [self.position_codes.index(p) for p in positions if p in self.position_codes]
+            mask &= self._positions[:, wanted].any(axis=1)
+        if min_minutes is not None:
+            mask &= self._minutes >= min_minutes
+        return mask
+
+    def _top_k(self, distances, mask, k):
+        if k <= 0:
+            return np.empty(0, dtype=int)
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(distances[candidates], k - 1)[:k]]
+        return candidates[np.argsort(distances[candidates], kind='stable')]
+
+    def query(self, row, k=10, positions=None, min_minutes=None):
+        """
+        The k players closest to the player at position `row`
+
+        Args:
+            row: Row number of the query player in self.players
+            k: Number of neighbours
+            positions: Position codes to keep (e.g. ['FW', 'MF']); any match counts
+            min_minutes: Minimum minutes played
+
+        Returns:
+            tuple: (row numbers, Euclidean distances), nearest first; the query
+                   player itself is excluded
+        """
+        q = self.X[row]
+        distances = np.maximum(self._norms - 2 * (self.X @ q) + self._norms[row], 0)
+        mask = self._mask(positions, min_minutes)
+        mask[row] = False
+        rows = self._top_k(distances, mask, k)
+        return rows, np.sqrt(distances[rows])
+
+    def query_batch(self, rows, k=10, positions=None, min_minutes=None):
+        """
+        Neighbours of several players with one matrix multiply
+
+        Returns:
+            list of (row numbers, distances) tuples, one per query row
+        """
+        rows = np.asarray(rows)
+        distances = np.maximum(
+            self._norms[rows][:, None] - 2 * (self.X[rows] @ self.X.T) + self._norms[None, :], 0)
+        mask = self._mask(positions, min_minutes)
+        results = []
+        for i, row in enumerate(rows):
+            candidates = mask.copy()
+            candidates[row] = False
+            top = self._top_k(distances[i], candidates, k)
+            results.append((top, np.sqrt(distances[i][top])))
+        return results
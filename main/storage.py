@@ -0,0 +1,224 @@
+"""
+Embedded database for all pipeline outputs
+One SQLite file replaces the scattered CSV outputs. Every table carries a
+'season' column that leads its indexes, so each season is stored and
+replaced as its own partition, and player/club lookups such as "club squad
+with values" are index seeks instead of full CSV loads.
+
+Usage:
+    python storage.py import                       # load the CSV outputs of this folder
+    python storage.py import --season 2023-2024
+    python storage.py squad Liverpool              # club squad with transfer values
+"""
+
+import argparse
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from market_values import VALUE_COLUMN, NUMERIC_VALUE_COLUMN, CURRENCY_COLUMN, add_value_columns
+from identity import ID_COLUMN
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_FILE = os.path.join(SCRIPT_DIR, "football.db")
+DEFAULT_SEASON = "2024-2025"
+SEASON_COLUMN = "season"
+
+# Bảng trong cơ sở dữ liệu và file CSV nguồn tương ứng
+TABLE_FILES = {
+    'players': "results.csv",
+    'team_stats': "results2.csv",
+    'team_distribution': "results2_distribution.csv",
+    'valuations': "results3_2.csv",
+    'transfer_values': "transfer_values.csv"
+}
+
+# Các cột được đánh chỉ mục (kèm season) khi có trong bảng
+INDEXED_COLUMNS = ['Player', 'Team', 'Player_ID']
+
+
+def _quote(name):
+    """SQL identifier quoting (column names contain '%', '/', spaces...)"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class Storage:
+    """
+    Access layer over the SQLite database
+
+    Every read and write goes through this class; tables are created on
+    first write with an index on (season, Player) and (season, Team).
+    """
+
+    def __init__(self, path=DATABASE_FILE):
+        self.path = path
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def tables(self):
+        with closing(self.connect()) as connection:
+            rows = connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        return sorted(name for name, in rows)
+
+    def _columns(self, connection, table):
+        return [row[1] for row in connection.execute(f"PRAGMA table_info({_quote(table)})")]
+
+    def write_table(self, table, df, season=DEFAULT_SEASON):
+        """
+        Replace one season of a table with df (in a single transaction)
+
+        Columns missing from the table are added, so the schema can grow
+        between seasons.
+        """
+        df = df.copy()
+        for column in df.select_dtypes(include=['category']).columns:
+            df[column] = df[column].astype(object)
+        df.insert(0, SEASON_COLUMN, season)
+
+        with closing(self.connect()) as connection, connection:
+            existing = self._columns(connection, table)
+            if existing:
+                for column in df.columns:
+                    if column not in existing:
+                        connection.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}")
+                connection.execute(f"DELETE FROM {_quote(table)} WHERE {SEASON_COLUMN} = ?", (season,))
+            df.to_sql(table, connection, if_exists='append', index=False, chunksize=1000)
+
+            for column in INDEXED_COLUMNS:
+                if column in df.columns:
+                    connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_{column}')} "
+                        f"ON {_quote(table)} ({SEASON_COLUMN}, {_quote(column)} COLLATE NOCASE)")
+
+    def read_table(self, table, season=DEFAULT_SEASON, columns=None, where=None, params=()):
+        """
+        Rows of one season
+
+        Args:
+            table: Table name
+            season: Season partition (None = all seasons, with the season column)
+            columns: Columns to read (default: all)
+            where: Extra SQL condition on the rows
+            params: Parameters of the condition
+
+        Returns:
+            DataFrame (without the season column when one season is read)
+        """
+        selected = ', '.join(_quote(c) for c in columns) if columns else '*'
+        conditions, values = [], []
+        if season is not None:
+            conditions.append(f"{SEASON_COLUMN} = ?")
+            values.append(season)
+        if where:
+            conditions.append(f"({where})")
+            values.extend(params)
+        query = f"SELECT {selected} FROM {_quote(table)}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        with closing(self.connect()) as connection:
+            df = pd.read_sql_query(query, connection, params=values)
+        if season is not None and SEASON_COLUMN in df.columns:
+            df = df.drop(columns=SEASON_COLUMN)
+        return df
+
+    def seasons(self, table='players'):
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                f"SELECT DISTINCT {SEASON_COLUMN} FROM {_quote(table)} ORDER BY 1").fetchall()
+        return [season for season, in rows]
+
+    def find_players(self, name, season=DEFAULT_SEASON):
+        """Players by name: exact (case-insensitive, indexed) match first, then partial"""
+        players = self.read_table('players', season, where="Player = ? COLLATE NOCASE", params=(name,))
+        if players.empty:
+            players = self.read_table('players', season, where="Player LIKE ?", params=(f"%{name}%",))
+        return players
+
+    def club_squad(self, team, season=DEFAULT_SEASON):
+        """
+        Players of a club with their transfer values (indexed on season, Team)
+
+        An exact (case-insensitive) club name is tried first, then a partial one.
+
+        Returns:
+            DataFrame sorted by player name; the value columns are NaN when
+            no transfer value was stored
+        """
+        squad = self._club_squad("= ? COLLATE NOCASE", team, season)
+        if squad.empty:
+            squad = self._club_squad("LIKE ?", f"%{team}%", season)
+        return squad
+
+    def _club_squad(self, team_condition, team, season):
+        value_columns = [VALUE_COLUMN, NUMERIC_VALUE_COLUMN, CURRENCY_COLUMN]
+        join = 'transfer_values' in self.tables()
+        with closing(self.connect()) as connection:
+            if join:
+                available = self._columns(connection, 'transfer_values')
+                value_columns = [c for c in value_columns if c in available]
+                selected = ', '.join(['p.*'] + [f"v.{_quote(c)}" for c in value_columns])
+                # Nối theo fbref Player_ID khi cả hai bảng có cột này, nếu không thì theo tên
+                both_ids = ID_COLUMN in available and ID_COLUMN in self._columns(connection, 'players')
+                key = ID_COLUMN if both_ids else 'Player'
+                query = (f"SELECT {selected} FROM players p LEFT JOIN transfer_values v "
+                         f"ON v.{SEASON_COLUMN} = p.{SEASON_COLUMN} AND v.{key} = p.{key} COLLATE NOCASE "
+                         f"WHERE p.{SEASON_COLUMN} = ? AND p.Team {team_condition} ORDER BY p.Player")
+            else:
+                query = f"SELECT * FROM players WHERE {SEASON_COLUMN} = ? AND Team {team_condition} ORDER BY Player"
+            squad = pd.read_sql_query(query, connection, params=(season, team))
+        return squad.drop(columns=SEASON_COLUMN)
+
+
+def import_outputs(storage, directory=SCRIPT_DIR, season=DEFAULT_SEASON):
+    """
+    Load the CSV outputs of a folder into the database (one season)
+
+    Returns:
+        dict: {table: number of rows} of the files that were found
+    """
+    imported = {}
+    for table, filename in TABLE_FILES.items():
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            continue
+        df = pd.read_csv(path)
+        if table == 'transfer_values':
+            df = add_value_columns(df)
+        storage.write_table(table, df, season)
+        imported[table] = len(df)
+    return imported
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=DATABASE_FILE, help='Database file')
+    common.add_argument('--season', default=DEFAULT_SEASON, help='Season partition')
+    parser = argparse.ArgumentParser(description='Football statistics database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('import', parents=[common], help='Load the CSV outputs of this folder')
+    squad_parser = commands.add_parser('squad', parents=[common], help='Club squad with transfer values')
+    squad_parser.add_argument('club')
+    args = parser.parse_args()
+
+    storage = Storage(args.db)
+    if args.command == 'import':
+        imported = import_outputs(storage, season=args.season)
+        for table, rows in imported.items():
+            print(f"✓ {table}: {rows} rows ({args.season})")
+        if not imported:
+            print("No CSV outputs found")
+    elif args.command == 'squad':
+        squad = storage.club_squad(args.club, args.season)
+        columns = [c for c in ['Player', 'Pos', 'Age', 'Standard_Min', VALUE_COLUMN, NUMERIC_VALUE_COLUMN]
+                   if c in squad.columns]
+        print(squad[columns].to_string(index=False) if not squad.empty else f"No players found for {args.club}")
+
+
+if __name__ == "__main__":
+    main()
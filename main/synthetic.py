@@ -0,0 +1,266 @@
+"""
+Synthetic dataset generator
+Produces results.csv / transfer_values.csv pairs of any size (millions of
+player rows) with the columns of the real results.csv, which problem_I.1
+writes from COLUMN_MAP, followed by Player_ID.
+
+The statistics are drawn per position group (GK / DF / MF / FW, from the
+first listed position) from a multivariate normal fitted on the real season,
+in log space for the non-negative columns. Correlations between columns
+(e.g. minutes and passes), the share of missing values (goalkeeping columns
+of outfield players, unknown transfer values) and the observed ranges are
+kept. Rows are generated and written in chunks, so memory use depends on
+the chunk size only.
+
+Usage:
+    python synthetic.py --rows 1000000                 # into synthetic_data/
+    python synthetic.py --rows 5000000 --chunk-size 200000 --output-dir /data/big
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from identity import ID_COLUMN, join_players
+from market_values import VALUE_COLUMN, add_value_columns, NUMERIC_VALUE_COLUMN
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "synthetic_data")
+POSITION_GROUPS = ['GK', 'DF', 'MF', 'FW']
+
+# Cỡ đội hình trung bình (số cầu thủ mỗi đội) để suy ra số đội khi sinh nhiều dòng
+SQUAD_SIZE = 25
+# Hệ số co hiệp phương sai về đường chéo (nhóm GK chỉ có vài chục cầu thủ)
+SHRINKAGE = 0.1
+
+
+class SyntheticModel:
+    """
+    Per-position distributions of a player table
+
+    One multivariate normal per position group over every numeric column
+    plus the transfer value (log space for non-negative columns), with
+    per-column missing rates and value ranges.
+    """
+
+    def __init__(self, columns, numeric_columns, integer_columns, log_columns, groups,
+                 nations, teams, first_names, last_names, single_name_rate):
+        self.columns = list(columns)
+        self.numeric_columns = list(numeric_columns)
+        self.integer_columns = set(integer_columns)
+        self.log_columns = np.asarray(log_columns, dtype=bool)
+        self.groups = groups
+        self.nations = nations
+        self.teams = list(teams)
+        self.first_names = first_names
+        self.last_names = last_names
+        self.single_name_rate = single_name_rate
+
+    @classmethod
+    def fit(cls, players, values=None):
+        """
+        Fit the model on a real season
+
+        Args:
+            players: results.csv DataFrame
+            values: transfer_values.csv DataFrame (optional)
+
+        Returns:
+            SyntheticModel
+        """
+        players = players.reset_index(drop=True)
+        columns = [c for c in players.columns if c != ID_COLUMN]
+        numeric = players[columns].select_dtypes(include=[np.number]).astype(float)
+
+        # Giá trị chuyển nhượng (triệu EUR) là một chiều nữa của phân phối
+        if values is not None and VALUE_COLUMN in values.columns:
+            joined = join_players(players, add_value_columns(values), [NUMERIC_VALUE_COLUMN])
+            numeric[NUMERIC_VALUE_COLUMN] = joined[NUMERIC_VALUE_COLUMN].to_numpy(dtype=float)
+        else:
+            numeric[NUMERIC_VALUE_COLUMN] = np.nan
+
+        data = numeric.to_numpy(dtype=np.float64)
+        integer_columns = [name for name in numeric.columns[:-1]
+                           if np.all(np.mod(numeric[name].dropna(), 1) == 0)]
+        log_columns = np.where(np.isnan(data), np.inf, data).min(axis=0) >= 0
+        transformed = np.where(log_columns, np.log1p(np.clip(data, 0, None)), data)
+
+        primary = players['Pos'].astype(str).str.split(',').str[0]
+        groups = {}
+        for group in POSITION_GROUPS:
+            mask = (primary == group).to_numpy()
+            if not mask.any():
+                continue
+            rows = transformed[mask]
+            missing = np.isnan(rows)
+            mean = np.nan_to_num(np.nanmean(np.where(missing.all(axis=0), 0, rows), axis=0))
+            filled = np.where(missing, mean, rows)
+            cov = np.cov(filled, rowvar=False) if len(filled) > 1 else np.zeros((rows.shape[1],) * 2)
+            cov = (1 - SHRINKAGE) * cov + SHRINKAGE * np.diag(np.diag(cov))
+            eigenvalues, eigenvectors = np.linalg.eigh(cov)
+            raw = data[mask]
+            positions = players.loc[mask, 'Pos'].value_counts(normalize=True)
+            groups[group] = {
+                'share': mask.mean(),
+                'positions': (positions.index.to_numpy(), positions.to_numpy()),
+                'mean': mean,
+                'root': eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None)),
+                'missing': missing.mean(axis=0),
+                'low': np.nan_to_num(np.where(np.isnan(raw), np.inf, raw).min(axis=0), posinf=0),
+                'high': np.nan_to_num(np.where(np.isnan(raw), -np.inf, raw).max(axis=0), neginf=0),
+            }
+
+        nations = players['Nation'].value_counts(normalize=True)
+        names = players['Player'].astype(str).str.split()
+        single = names.str.len() == 1
+        return cls(columns, numeric.columns, integer_columns, log_columns, groups,
+                   (nations.index.to_numpy(), nations.to_numpy()),
+                   sorted(players['Team'].dropna().unique()),
+                   names[~single].str[0].to_numpy(), names.str[-1].to_numpy(), single.mean())
+
+    def team_names(self, count):
+        """The real clubs, then 'Club <n>' up to count clubs"""
+        extra = [f"Club {i}" for i in range(len(self.teams) + 1, count + 1)]
+        return self.teams[:count] + extra
+
+    def sample(self, rows, rng, start=0, teams=None):
+        """
+        Draw one chunk of synthetic players
+
+        Args:
+            rows: Number of players
+            rng: numpy Generator
+            start: Index of the first player (Player_ID = start, start + 1... as hex)
+            teams: Club names to spread the players over (default: the real clubs)
+
+        Returns:
+            tuple: (results.csv DataFrame, transfer_values.csv DataFrame)
+        """
+        teams = np.asarray(teams if teams is not None else self.teams)
+        group_names = list(self.groups)
+        shares = np.array([self.groups[g]['share'] for g in group_names])
+        assigned = rng.choice(len(group_names), rows, p=shares / shares.sum())
+
+        values = np.empty((rows, len(self.numeric_columns)))
+        positions = np.empty(rows, dtype=object)
+        for i, group in enumerate(group_names):
+            mask = assigned == i
+            n = int(mask.sum())
+            if n == 0:
+                continue
+            model = self.groups[group]
+            drawn = model['mean'] + rng.standard_normal((n, len(model['mean']))) @ model['root'].T
+            drawn = np.where(self.log_columns, np.expm1(drawn), drawn)
+            drawn = np.clip(drawn, model['low'], model['high'])
+            drawn[rng.random(drawn.shape) < model['missing']] = np.nan
+            values[mask] = drawn
+            labels, probabilities = model['positions']
+            positions[mask] = rng.choice(labels, n, p=probabilities)
+
+        first = rng.choice(self.first_names, rows)
+        last = rng.choice(self.last_names, rows)
+        single = rng.random(rows) < self.single_name_rate
+        players = pd.DataFrame({
+            'Player': np.where(single, last, np.char.add(np.char.add(first.astype(str), ' '), last.astype(str))),
+            'Nation': rng.choice(self.nations[0], rows, p=self.nations[1]),
+            'Pos': positions,
+            'Team': teams[rng.integers(0, len(teams), rows)],
+        })
+
+        stats = pd.DataFrame(values[:, :-1], columns=self.numeric_columns[:-1])
+        for name in stats.columns:
+            if name in self.integer_columns:
+                column = stats[name].round()
+                stats[name] = column.astype(np.int64) if column.notna().all() else column
+            else:
+                stats[name] = stats[name].round(3)
+        players = pd.concat([players, stats], axis=1)[self.columns]
+        players[ID_COLUMN] = [f"{i:08x}" for i in range(start, start + rows)]
+
+        transfer_values = players[['Player', 'Team']].copy()
+        transfer_values[VALUE_COLUMN] = [format_value(v) for v in values[:, -1]]
+        transfer_values[ID_COLUMN] = players[ID_COLUMN]
+        return players, transfer_values
+
+
+def format_value(millions):
+    """Transfer value string in the scraped format ('€12.5M', '€800K'), NaN when unknown"""
+    if np.isnan(millions):
+        return np.nan
+    if millions < 1:
+        return f"€{millions * 1000:.0f}K"
+    return f"€{millions:.1f}M"
+
+
+def iter_chunks(model, rows, chunk_size=100_000, seed=0, teams=None):
+    """
+    Generate rows players in chunks
+
+    Args:
+        model: SyntheticModel
+        rows: Total number of players
+        chunk_size: Players per chunk
+        seed: Random seed (the same seed and chunk size give the same data)
+        teams: Number of clubs (default: one per SQUAD_SIZE players, at least the real clubs)
+
+    Yields:
+        tuple: (results.csv chunk, transfer_values.csv chunk)
+    """
+    teams = teams or max(len(model.teams), round(rows / SQUAD_SIZE))
+    team_names = model.team_names(teams)
+    for index, start in enumerate(range(0, rows, chunk_size)):
+        rng = np.random.default_rng([seed, index])
+        yield model.sample(min(chunk_size, rows - start), rng, start, team_names)
+
+
+def generate(model, rows, output_dir=OUTPUT_DIR, chunk_size=100_000, seed=0, teams=None):
+    """
+    Write a synthetic results.csv / transfer_values.csv pair chunk by chunk
+
+    Returns:
+        tuple: (players file, transfer values file)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    players_file = os.path.join(output_dir, "results.csv")
+    values_file = os.path.join(output_dir, "transfer_values.csv")
+
+    written = 0
+    for players, values in iter_chunks(model, rows, chunk_size, seed, teams):
+        mode, header = ('w', True) if written == 0 else ('a', False)
+        players.to_csv(players_file, mode=mode, header=header, index=False, encoding='utf-8')
+        values.to_csv(values_file, mode=mode, header=header, index=False, encoding='utf-8')
+        written += len(players)
+        print(f"  {written}/{rows} rows")
+    return players_file, values_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic dataset with the results.csv schema')
+    parser.add_argument('--rows', type=int, required=True, help='Number of players to generate')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Rows generated and written at a time')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--teams', type=int, help=f'Number of clubs (default: rows / {SQUAD_SIZE})')
+    parser.add_argument('--source', default=os.path.join(SCRIPT_DIR, "results.csv"),
+                        help='Real results.csv the distributions are fitted on')
+    parser.add_argument('--values', default=os.path.join(SCRIPT_DIR, "transfer_values.csv"),
+                        help='Real transfer_values.csv')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='Folder of the generated files')
+    args = parser.parse_args()
+
+    players = pd.read_csv(args.source)
+    values = pd.read_csv(args.values) if os.path.exists(args.values) else None
+    model = SyntheticModel.fit(players, values)
+    print(f"Fitted {len(model.groups)} position groups on {len(players)} players from {args.source}")
+
+    start = time.perf_counter()
+    players_file, values_file = generate(model, args.rows, args.output_dir, args.chunk_size,
+                                         args.seed, args.teams)
+    print(f"✓ {args.rows} players written to {players_file} and {values_file} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
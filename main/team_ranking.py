@@ -0,0 +1,109 @@
+"""
+Part III.1: Team ranking engine
+Ranks every team on every statistic column of results2.csv with one
+matrix sort: leader (argmax), top-k and full rank positions.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class TeamRanking:
+    """
+    Rankings of all teams on all statistic columns
+
+    Attributes:
+        teams: Team names (row order of the statistics table)
+        columns: Ranked statistic columns
+        values: (teams x columns) float matrix of statistic values
+        order: (teams x columns) team indices, best first, for every column
+        ranks: (teams x columns) rank of each team (1 = best)
+        valid: Columns that have at least one non-NaN value
+    """
+
+    def __init__(self, teams, columns, values, order, ranks, valid):
+        self.teams = teams
+        self.columns = columns
+        self.values = values
+        self.order = order
+        self.ranks = ranks
+        self.valid = valid
+
+    def leaders(self):
+        """
+        Leading team and value of every column
+
+        Returns:
+            DataFrame with columns Metric, Team, Value (all-NaN columns skipped)
+        """
+        best = self.order[0]
+        columns = np.arange(len(self.columns))
+        return pd.DataFrame({
+            'Metric': self.columns,
+            'Team': self.teams[best],
+            'Value': self.values[best, columns]
+        })[self.valid].reset_index(drop=True)
+
+    def top_k(self, k=3):
+        """
+        Best k teams of every column
+
+        Returns:
+            dict: column -> list of (team, value), best first
+        """
+        k = min(k, len(self.teams))
+        top = {}
+        for j in np.flatnonzero(self.valid):
+            rows = self.order[:k, j]
+            rows = rows[~np.isnan(self.values[rows, j])]
+            top[self.columns[j]] = list(zip(self.teams[rows], self.values[rows, j]))
+        return top
+
+    def leader_counts(self):
+        """
+        Number of columns each team leads, derived from the rank matrix
+
+        Returns:
+            Series indexed by team, sorted by count (desc) then team name
+        """
+        counts = (self.ranks[:, self.valid] == 1).sum(axis=1)
+        scores = pd.Series(counts, index=self.teams, name='Leads')
+        scores = scores[scores > 0]
+        return scores.iloc[np.lexsort((scores.index.to_numpy(), -scores.to_numpy()))]
+
+    def rank_table(self):
+        """Full (teams x columns) rank positions as a DataFrame"""
+        return pd.DataFrame(self.ranks, index=self.teams, columns=self.columns)
+
+
+def rank_teams(stats, columns=None, group_col='Team'):
+    """
+    Rank all teams on all statistic columns in one matrix operation
+
+    Higher values rank first. Ties are broken deterministically by row order
+    (teams are sorted by name in results2.csv), NaN values always rank last.
+
+    Args:
+        stats: Team statistics (one row per team, no "all" row)
+        columns: Columns to rank (default: every column except group_col)
+        group_col: Column holding the team name
+
+    Returns:
+        TeamRanking
+    """
+    if columns is None:
+        columns = [c for c in stats.columns if c != group_col]
+
+    teams = stats[group_col].to_numpy(dtype=object)
+    values = stats[columns].to_numpy(dtype=float)
+    n_teams, n_columns = values.shape
+
+    # Sắp xếp giảm dần, ổn định theo thứ tự dòng; NaN được đẩy xuống cuối
+    keys = np.where(np.isnan(values), np.inf, -values)
+    order = np.argsort(keys, axis=0, kind='stable')
+
+    ranks = np.empty_like(order)
+    ranks[order, np.arange(n_columns)] = np.arange(1, n_teams + 1)[:, None]
+
+    valid = ~np.isnan(values).all(axis=0) if n_teams else np.zeros(n_columns, dtype=bool)
+    return TeamRanking(teams, list(columns), values, order, ranks, valid)
@@ -0,0 +1,270 @@
+"""
+Part III.1: Per-team statistics engine
+Computes median, mean and standard deviation of every numeric column,
+for the whole league ("all") and for each team, in one grouped pass.
+Also computes quantiles, minutes-weighted means and per-90 rates from a
+single sort per column.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+# Thống kê cần tính và nhãn tương ứng trong tên cột của results2.csv
+STATISTICS = {
+    'median': 'Median',
+    'mean': 'Mean',
+    'std': 'Std'
+}
+
+LEAGUE_LABEL = "all"
+
+# Phân vị mặc định và cột số phút dùng làm trọng số / chuẩn hóa per-90
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+MINUTES_COL = "Standard_Min"
+
+# Cột phân biệt dòng toàn giải ("league") với các dòng của đội ("team")
+# trong file nhị phân results2.parquet
+SCOPE_COL = "Scope"
+
+
+def numeric_columns(data):
+    """Return the numeric (statistic) columns of a player table"""
+    return data.select_dtypes(include=[float, int]).columns.tolist()
+
+
+def _aggregate(data, columns, group_col):
+    """
+    Aggregate all columns and statistics with a single groupby().agg() call
+
+    Returns:
+        DataFrame indexed by group with columns "<Stat> of <column>"
+    """
+    stats = data.groupby(group_col, sort=True)[columns].agg(list(STATISTICS))
+    stats.columns = [f"{STATISTICS[stat]} of {column}" for column, stat in stats.columns]
+    return stats
+
+
+def compute_team_stats(data, columns=None, group_col='Team'):
+    """
+    Compute league-wide and per-team statistics
+
+    Args:
+        data: Player DataFrame (one row per player)
+        columns: Numeric columns to aggregate (default: all numeric columns)
+        group_col: Column to group by
+
+    Returns:
+        DataFrame of floats with the "all" row first, then one row per team
+    """
+    if columns is None:
+        columns = numeric_columns(data)
+
+    league = _aggregate(data[columns].assign(**{group_col: LEAGUE_LABEL}), columns, group_col)
+    teams = _aggregate(data, columns, group_col)
+
+    results = pd.concat([league, teams]).astype(float)
+    results.index.name = group_col
+    return results.reset_index()
+
+
+def count_columns(data, columns, weight_col=MINUTES_COL):
+    """Columns holding raw counts (integer stats) that make sense per 90 minutes"""
+    return [
+        column for column in columns
+        if column not in (weight_col, 'Age') and pd.api.types.is_integer_dtype(data[column])
+    ]
+
+
+def _segment_quantiles(sorted_values, starts, counts, quantiles):
+    """
+    Linear-interpolated quantiles of every group from one sorted column
+
+    Args:
+        sorted_values: Column values sorted by (group, value), NaN last in each group
+        starts: Index of the first row of each group in sorted_values
+        counts: Number of non-NaN values of each group
+        quantiles: Quantiles to compute (0..1)
+
+    Returns:
+        ndarray of shape (groups, quantiles)
+    """
+    q = np.asarray(quantiles, dtype=float)[None, :]
+    position = q * np.maximum(counts - 1, 0)[:, None]
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+
+    low_values = sorted_values[starts[:, None] + lower]
+    high_values = sorted_values[starts[:, None] + upper]
+    values = low_values + (position - lower) * (high_values - low_values)
+    values[counts == 0] = np.nan
+    return values
+
+
+def _distribution(values, weights, codes, n_groups, quantiles, per90_mask):
+    """
+    Quantiles, minutes-weighted means and per-90 rates for every group
+
+    Each column is sorted once by (group, value); every quantile is then read
+    from that sort, and the weighted sums come from np.bincount.
+    """
+    group_sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+    n_rows, n_cols = values.shape
+
+    quantile_values = np.full((n_groups, n_cols, len(quantiles)), np.nan)
+    weighted_means = np.full((n_groups, n_cols), np.nan)
+    per90_values = np.full((n_groups, n_cols), np.nan)
+
+    for j in range(n_cols):
+        column = values[:, j]
+        valid = ~np.isnan(column)
+        order = np.lexsort((column, codes))
+        counts = np.bincount(codes[valid], minlength=n_groups)
+        quantile_values[:, j, :] = _segment_quantiles(column[order], starts, counts, quantiles)
+
+        if weights is None:
+            continue
+        weighted = valid & ~np.isnan(weights)
+        weight_sum = np.bincount(codes[weighted], weights=weights[weighted], minlength=n_groups)
+        value_sum = np.bincount(codes[weighted], weights=column[weighted], minlength=n_groups)
+        product_sum = np.bincount(codes[weighted], weights=(column * weights)[weighted], minlength=n_groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weighted_means[:, j] = product_sum / weight_sum
+            if per90_mask[j]:
+                per90_values[:, j] = value_sum / weight_sum * 90
+        weighted_means[weight_sum == 0, j] = np.nan
+        per90_values[weight_sum == 0, j] = np.nan
+
+    return quantile_values, weighted_means, per90_values
+
+
+def compute_distribution_stats(data, columns=None, quantiles=DEFAULT_QUANTILES,
+                               weight_col=MINUTES_COL, group_col='Team', per90_columns=None):
+    """
+    Compute quantiles, minutes-weighted means and per-90 rates in one pass
+
+    Args:
+        data: Player DataFrame (one row per player)
+        columns: Numeric columns to aggregate (default: all numeric columns)
+        quantiles: Quantiles to compute, e.g. (0.1, 0.5, 0.9)
+        weight_col: Minutes column used as weight and per-90 denominator
+                    (weighted means and per-90 rates are skipped if missing)
+        group_col: Column to group by
+        per90_columns: Columns given per-90 rates (default: the integer count
+                       columns of data, see count_columns())
+
+    Returns:
+        DataFrame of floats with the "all" row first, then one row per team.
+        Columns are "Q<pct> of <column>", "Weighted mean of <column>" and
+        "Per90 of <column>" (per-90 only for count columns)
+    """
+    if columns is None:
+        columns = numeric_columns(data)
+
+    data = data[data[group_col].notna()]
+    teams, codes = np.unique(data[group_col].to_numpy(dtype=str), return_inverse=True)
+    values = data[columns].to_numpy(dtype=float)
+    has_weights = weight_col in data.columns
+    weights = data[weight_col].to_numpy(dtype=float) if has_weights else None
+    if not has_weights:
+        per90_columns = []
+    elif per90_columns is None:
+        per90_columns = count_columns(data, columns, weight_col)
+    per90_mask = np.isin(columns, per90_columns)
+
+    # Toàn giải là một nhóm duy nhất, các đội dùng mã nhóm từ np.unique
+    league = _distribution(values, weights, np.zeros(len(data), dtype=np.int64), 1,
+                           quantiles, per90_mask)
+    by_team = _distribution(values, weights, codes, len(teams), quantiles, per90_mask)
+    quantile_values, weighted_means, per90_values = (
+        np.concatenate(parts) for parts in zip(league, by_team)
+    )
+
+    results = {group_col: [LEAGUE_LABEL] + teams.tolist()}
+    for j, column in enumerate(columns):
+        for k, q in enumerate(quantiles):
+            results[f"Q{q * 100:g} of {column}"] = quantile_values[:, j, k]
+        if has_weights:
+            results[f"Weighted mean of {column}"] = weighted_means[:, j]
+        if per90_mask[j]:
+            results[f"Per90 of {column}"] = per90_values[:, j]
+    return pd.DataFrame(results)
+
+
+def split_league(results, group_col='Team'):
+    """
+    Separate the league-wide row from the team rows
+
+    Returns:
+        tuple: (league Series or None, DataFrame of team rows)
+    """
+    is_league = results[group_col] == LEAGUE_LABEL
+    league = results[is_league].iloc[0] if is_league.any() else None
+    return league, results[~is_league].reset_index(drop=True)
+
+
+def parquet_path(output_path):
+    """Path of the typed binary copy that sits next to a results2.csv file"""
+    return os.path.splitext(output_path)[0] + ".parquet"
+
+
+def save_team_stats(results, output_path, group_col='Team'):
+    """
+    Save statistics as numbers, never as pre-formatted strings
+
+    Writes the CSV at full float precision and a typed Parquet copy
+    (with a Scope column separating the league row) when pyarrow is installed.
+
+    Args:
+        results: DataFrame returned by compute_team_stats()
+        output_path: Path of the CSV file (e.g. results2.csv)
+        group_col: Column holding the team name
+    """
+    results.to_csv(output_path, index=False)
+
+    typed = results.copy()
+    scope = typed[group_col].eq(LEAGUE_LABEL).map({True: "league", False: "team"})
+    typed.insert(1, SCOPE_COL, scope.astype("category"))
+    try:
+        typed.to_parquet(parquet_path(output_path), index=False)
+    except ImportError:
+        print("Warning: pyarrow not installed, only the CSV output was written")
+
+
+def load_team_stats(input_path, columns=None, scope=None, group_col='Team'):
+    """
+    Load statistics saved by save_team_stats()
+
+    Reads the Parquet copy when it exists (only the requested columns are
+    read from disk), otherwise falls back to the CSV file.
+
+    Args:
+        input_path: Path of the CSV file (e.g. results2.csv)
+        columns: Statistic columns to load (default: all)
+        scope: "league", "team" or None for both
+        group_col: Column holding the team name
+
+    Returns:
+        DataFrame of floats with the group column first
+    """
+    usecols = None if columns is None else [group_col] + [c for c in columns if c != group_col]
+    typed_path = parquet_path(input_path)
+
+    results = None
+    if os.path.exists(typed_path):
+        try:
+            results = pd.read_parquet(typed_path, columns=usecols)
+        except ImportError:
+            pass
+    if results is None:
+        results = pd.read_csv(input_path, usecols=usecols, float_precision='round_trip')
+        if usecols is not None:
+            results = results[usecols]
+
+    results = results.drop(columns=SCOPE_COL, errors='ignore')
+    if scope is None:
+        return results
+    is_league = results[group_col] == LEAGUE_LABEL
+    selected = is_league if scope == "league" else ~is_league
+    return results[selected].reset_index(drop=True)
@@ -0,0 +1,213 @@
+"""
+Part III.2: Vectorized transfer value estimator
+Implements the valuation formula from "Hàm ước tính giá trị chuyển nhượng.txt":
+
+    transfer_value = base_value * age_factor * performance_factor * minutes_factor
+                     (rounded, never below 0.5 million EUR)
+
+Every factor is a component computed with NumPy over all players at once.
+Weights come from a config dict, and several configs can be scored over the
+same feature matrix in one pass (players x variants) for sensitivity sweeps.
+"""
+
+import copy
+import json
+import numpy as np
+import pandas as pd
+
+# Cấu hình mặc định theo tài liệu thiết kế (giá trị tính bằng triệu EUR)
+DEFAULT_CONFIG = {
+    # Giá trị cơ bản theo vị trí, xét theo thứ tự FW > MF > DF > GK
+    'base_values': [['FW', 15], ['MF', 10], ['DF', 8], ['GK', 5]],
+    'default_base_value': 5,
+    # age_factor = max(min_factor, start - (Age - peak_age) * decline)
+    'age': {'peak_age': 20, 'start': 1.5, 'decline': 0.03, 'min_factor': 0.5},
+    # performance_factor = 1 + sum(stat * weight) / scale
+    'performance_weights': {
+        'Standard_Gls': 0.2,
+        'Standard_Ast': 0.15,
+        'Standard_xG': 0.1,
+        'Standard_xAG': 0.1
+    },
+    'performance_scale': 10,
+    # minutes_factor = min_factor + (1 - min_factor) * min(Standard_Min, cap) / cap
+    'minutes': {'column': 'Standard_Min', 'cap': 2000, 'min_factor': 0.5},
+    # Làm tròn và giá trị tối thiểu của transfer_value
+    'round_decimals': 1,
+    'min_value': 0.5
+}
+
+
+def load_config(path=None, overrides=None):
+    """
+    Build a valuation config from the defaults, a JSON file and/or a dict
+
+    Nested sections ('age', 'minutes', 'performance_weights') are merged key
+    by key, so a config only needs to list the values it changes.
+    """
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    layers = []
+    if path:
+        with open(path, encoding='utf-8') as f:
+            layers.append(json.load(f))
+    if overrides:
+        layers.append(overrides)
+
+    for layer in layers:
+        for key, value in layer.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+    return config
+
+
+class ValuationFeatures:
+    """
+    Numeric feature matrix shared by every valuation variant
+
+    Attributes:
+        positions: Distinct position strings
+        position_codes: Index into positions for every player
+        age: Player ages
+        stats: {column: ndarray} of the numeric stat columns (NaN -> 0)
+    """
+
+    def __init__(self, positions, position_codes, age, stats):
+        self.positions = positions
+        self.position_codes = position_codes
+        self.age = age
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.age)
+
+    def matrix(self, columns):
+        """(players x columns) matrix of the requested stat columns"""
+        return np.column_stack([self.stats[c] for c in columns]) if columns else np.zeros((len(self), 0))
+
+
+def build_features(df, configs=None, matrix=None):
+    """
+    Extract the valuation features of all players once
+
+    Args:
+        df: Player DataFrame (e.g. results.csv)
+        configs: Configs that will be scored (default: DEFAULT_CONFIG); their
+                 performance and minutes columns are extracted
+        matrix: Prepared FeatureMatrix of df (features.py); numeric columns are
+                taken from it instead of being coerced again
+
+    Returns:
+        ValuationFeatures
+    """
+    configs = configs or [DEFAULT_CONFIG]
+    codes, uniques = pd.factorize(df['Pos'].fillna('').astype(str))
+
+    columns = set()
+    for config in configs:
+        columns.update(config['performance_weights'])
+        columns.add(config['minutes']['column'])
+
+    if matrix is not None:
+        stats = {column: matrix.column(column, fill=0) for column in sorted(columns)}
+        return ValuationFeatures(list(uniques), codes, matrix.column('Age'), stats)
+
+    stats = {
+        column: pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy(dtype=float)
+        for column in sorted(columns)
+    }
+    age = pd.to_numeric(df['Age'], errors='coerce').to_numpy(dtype=float)
+    return ValuationFeatures(list(uniques), codes, age, stats)
+
+
+def _params(configs, section, key):
+    """Row vector (1 x variants) of one scalar parameter across configs"""
+    return np.array([[config[section][key] for config in configs]], dtype=float)
+
+
+def base_value_component(features, configs):
+    """Base value by position: each distinct Pos string is resolved once per config"""
+    table = np.empty((len(features.positions), len(configs)))
+    for v, config in enumerate(configs):
+        for p, position in enumerate(features.positions):
+            table[p, v] = next(
+                (value for code, value in config['base_values'] if code in position),
+                config['default_base_value']
+            )
+    return table[features.position_codes]
+
+
+def age_component(features, configs):
+    """Younger players are worth more; value declines after peak_age (a missing Age counts as peak_age)"""
+    age = features.age[:, None]
+    start = _params(configs, 'age', 'start')
+    peak_age = _params(configs, 'age', 'peak_age')
+    decline = _params(configs, 'age', 'decline')
+    age = np.where(np.isnan(age), peak_age, age)
+    return np.fmax(_params(configs, 'age', 'min_factor'), start - (age - peak_age) * decline)
+
+
+def performance_component(features, configs):
+    """Weighted goals/assists/xG/xAG: one matrix multiply for all configs"""
+    columns = sorted({c for config in configs for c in config['performance_weights']})
+    weights = np.array([[config['performance_weights'].get(c, 0.0) for config in configs] for c in columns])
+    scale = np.array([[config['performance_scale'] for config in configs]], dtype=float)
+    return 1 + features.matrix(columns) @ weights.reshape(len(columns), len(configs)) / scale
+
+
+def minutes_component(features, configs):
+    """Playing time, capped (2000 minutes by default) so regulars are not over-rewarded"""
+    minutes = np.column_stack([features.stats[config['minutes']['column']] for config in configs])
+    cap = _params(configs, 'minutes', 'cap')
+    min_factor = _params(configs, 'minutes', 'min_factor')
+    return min_factor + (1 - min_factor) * np.clip(minutes, 0, cap) / cap
+
+
+DEFAULT_COMPONENTS = [base_value_component, age_component, performance_component, minutes_component]
+
+
+def score_variants(features, configs, components=None):
+    """
+    Score every player under every config in one pass
+
+    Args:
+        features: ValuationFeatures from build_features()
+        configs: List of configs (see load_config())
+        components: Factor functions (features, configs) -> (players x variants)
+                    multiplied together (default: DEFAULT_COMPONENTS)
+
+    Returns:
+        ndarray of shape (players, variants), rounded and floored per config
+    """
+    components = components or DEFAULT_COMPONENTS
+    values = np.ones((len(features), len(configs)))
+    for component in components:
+        values *= component(features, configs)
+
+    # fmax: giá trị NaN (thiếu dữ liệu) cũng nhận mức sàn min_value
+    for v, config in enumerate(configs):
+        values[:, v] = np.fmax(np.round(values[:, v], config['round_decimals']), config['min_value'])
+    return values
+
+
+def estimate_transfer_values(df, config=None, components=None, matrix=None):
+    """
+    Estimate the transfer value (million EUR) of every player
+
+    Args:
+        df: Player DataFrame with Pos, Age and the configured stat columns
+        config: Valuation config (default: DEFAULT_CONFIG)
+        components: Optional replacement factor functions
+        matrix: Optional prepared FeatureMatrix of df (see build_features())
+
+    Returns:
+        ndarray of transfer values, aligned with df rows
+    """
+    configs = [config or DEFAULT_CONFIG]
+    return score_variants(build_features(df, configs, matrix), configs, components)[:, 0]
+
+
+def format_transfer_values(values):
+    """Format transfer values as 'EUR x.xM' strings (only needed when writing output)"""
+    return np.char.mod("EUR %.1fM", np.asarray(values, dtype=float))
@@ -0,0 +1,193 @@
+"""
+Part III.2: Learned transfer value model
+Trains a regression model on the market values scraped by problem_I.2.py
+(transfer_values.csv) using the player statistics in results.csv, then
+backfills the players whose value could not be scraped ('N/A', 'CAPTCHA').
+
+Usage:
+    python value_model.py                # train, save model, write backfilled values
+    python value_model.py --folds 10 --jobs 4
+"""
+
+import argparse
+import os
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import RidgeCV
+from sklearn.model_selection import KFold, cross_val_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from market_values import VALUE_COLUMN, NUMERIC_VALUE_COLUMN, CURRENCY_COLUMN, add_value_columns
+from identity import ID_COLUMN, KEY_COLUMN, join_players
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PLAYER_STATS_FILE = os.path.join(SCRIPT_DIR, "results.csv")
+TRANSFER_VALUES_FILE = os.path.join(SCRIPT_DIR, "transfer_values.csv")
+MODEL_FILE = os.path.join(SCRIPT_DIR, "transfer_value_model.joblib")
+BACKFILLED_FILE = os.path.join(SCRIPT_DIR, "transfer_values_backfilled.csv")
+
+MODEL_VERSION = 2
+
+# Các cột giá trị chuyển nhượng (nhãn) và khóa định danh không bao giờ là đặc trưng
+NON_FEATURE_COLUMNS = [VALUE_COLUMN, NUMERIC_VALUE_COLUMN, CURRENCY_COLUMN, 'Predicted_Value_EUR_M',
+                       ID_COLUMN, KEY_COLUMN]
+
+
+def candidate_models():
+    """Regression models compared by cross-validation"""
+    return {
+        'hist_gradient_boosting': HistGradientBoostingRegressor(max_iter=300, learning_rate=0.05,
+                                                                random_state=42),
+        'ridge': make_pipeline(SimpleImputer(strategy='median'), StandardScaler(),
+                               RidgeCV(alphas=np.logspace(-2, 3, 20)))
+    }
+
+
+def feature_matrix(stats, feature_columns=None, positions=None):
+    """
+    Build the model inputs: numeric stats plus one-hot primary position
+
+    Args:
+        stats: Player DataFrame (results.csv layout)
+        feature_columns: Numeric columns used at training time (default: every numeric
+                         stat column, without the value and identity columns)
+        positions: Position codes used at training time (default: those in stats)
+
+    Returns:
+        tuple: (float32 matrix, feature_columns, positions)
+    """
+    if feature_columns is None:
+        feature_columns = [c for c in stats.select_dtypes(include=[np.number]).columns
+                           if c not in NON_FEATURE_COLUMNS]
+    primary_position = stats['Pos'].fillna('').astype(str).str.split(',').str[0]
+    if positions is None:
+        positions = sorted(p for p in primary_position.unique() if p)
+
+    numeric = stats.reindex(columns=feature_columns).apply(pd.to_numeric, errors='coerce')
+    one_hot = (primary_position.to_numpy()[:, None] == np.array(positions)[None, :])
+    X = np.hstack([numeric.to_numpy(dtype=np.float32), one_hot.astype(np.float32)])
+    return X, feature_columns, positions
+
+
+def load_training_data(stats_file=PLAYER_STATS_FILE, values_file=TRANSFER_VALUES_FILE):
+    """Join player stats with scraped values (parsed to million EUR) on the player identity key"""
+    stats = pd.read_csv(stats_file)
+    values = add_value_columns(pd.read_csv(values_file))
+    return join_players(stats, values, [VALUE_COLUMN, NUMERIC_VALUE_COLUMN])
+
+
+def train(data, folds=5, n_jobs=-1):
+    """
+    Cross-validate every candidate model in parallel and fit the best one
+
+    The target is log1p(value in million EUR), which keeps a few very
+    expensive players from dominating the squared error.
+
+    Args:
+        data: Output of load_training_data()
+        folds: Number of cross-validation folds
+        n_jobs: Parallel workers for cross-validation (-1 = all cores)
+
+    Returns:
+        dict: model artifact (model, feature layout, CV scores)
+    """
+    labelled = data[data[NUMERIC_VALUE_COLUMN].notna()]
+    X, feature_columns, positions = feature_matrix(labelled)
+    y = np.log1p(labelled[NUMERIC_VALUE_COLUMN].to_numpy())
+
+    cv = KFold(n_splits=folds, shuffle=True, random_state=42)
+    cv_scores = {}
+    for name, model in candidate_models().items():
+        scores = cross_val_score(model, X, y, cv=cv, scoring='neg_mean_absolute_error', n_jobs=n_jobs)
+        cv_scores[name] = float(-scores.mean())
+        print(f"  {name}: MAE(log1p) = {cv_scores[name]:.3f}")
+
+    best_name = min(cv_scores, key=cv_scores.get)
+    best_model = candidate_models()[best_name].fit(X, y)
+    print(f"✓ Selected model: {best_name} (trained on {len(labelled)} players)")
+
+    return {
+        'version': MODEL_VERSION,
+        'model_name': best_name,
+        'model': best_model,
+        'feature_columns': feature_columns,
+        'positions': positions,
+        'cv_mae_log1p': cv_scores
+    }
+
+
+def save_model(artifact, path=MODEL_FILE):
+    """Save the model artifact (compressed joblib file)"""
+    joblib.dump(artifact, path, compress=3)
+
+
+def load_model(path=MODEL_FILE):
+    """Load a model artifact saved with save_model()"""
+    return joblib.load(path)
+
+
+def predict_values(artifact, stats):
+    """
+    Predict market values (million EUR) for a batch of players
+
+    Args:
+        artifact: Model artifact from train() or load_model()
+        stats: Player DataFrame (results.csv layout)
+
+    Returns:
+        ndarray of predicted values, aligned with stats rows
+    """
+    X, _, _ = feature_matrix(stats, artifact['feature_columns'], artifact['positions'])
+    return np.round(np.expm1(artifact['model'].predict(X)), 2)
+
+
+def backfill_values(artifact, data):
+    """
+    Fill missing scraped values with model predictions
+
+    Returns:
+        DataFrame: Player, Team, scraped value string, value in million EUR
+                   and its source ('scraped' or 'model')
+    """
+    predicted = predict_values(artifact, data)
+    scraped = data[NUMERIC_VALUE_COLUMN]
+    return pd.DataFrame({
+        'Player': data['Player'],
+        'Team': data['Team'],
+        VALUE_COLUMN: data[VALUE_COLUMN].fillna('N/A'),
+        NUMERIC_VALUE_COLUMN: scraped.fillna(pd.Series(predicted, index=data.index)),
+        'Predicted_Value_EUR_M': predicted,
+        'Value_Source': np.where(scraped.notna(), 'scraped', 'model')
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train a transfer value model on scraped market values')
+    parser.add_argument('--folds', type=int, default=5, help='Cross-validation folds')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel workers (-1 = all cores)')
+    args = parser.parse_args()
+
+    for path in (PLAYER_STATS_FILE, TRANSFER_VALUES_FILE):
+        if not os.path.exists(path):
+            print(f"Error: {path} not found!")
+            return
+
+    data = load_training_data()
+    print(f"Loaded {len(data)} players, {data[NUMERIC_VALUE_COLUMN].notna().sum()} with a scraped value")
+
+    print("Cross-validating models...")
+    artifact = train(data, folds=args.folds, n_jobs=args.jobs)
+    save_model(artifact)
+    print(f"✓ Model saved to: {MODEL_FILE}")
+
+    backfilled = backfill_values(artifact, data)
+    backfilled.to_csv(BACKFILLED_FILE, index=False, encoding='utf-8')
+    print(f"✓ Backfilled {int((backfilled['Value_Source'] == 'model').sum())} players -> {BACKFILLED_FILE}")
+
+
+if __name__ == "__main__":
+    main()